@@ -3,8 +3,10 @@ Register blueprints defined in app/views/* into the server app.
 """
 from flask import Flask
 
+from app.config import Config
 from app.views import employees
 from app.views import health
+from app.views import metrics
 
 
 def views_setup(app: Flask):
@@ -13,3 +15,5 @@ def views_setup(app: Flask):
     """
     app.register_blueprint(health.BLUEPRINT)
     app.register_blueprint(employees.BLUEPRINT)
+    if Config.Metrics.ENABLED:
+        app.register_blueprint(metrics.BLUEPRINT)
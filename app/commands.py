@@ -0,0 +1,61 @@
+"""
+Command line commands, available through `flask <command>` (i.e. `FLASK_APP=run.py flask rebuild-totals`).
+"""
+import click
+
+from flask import Flask
+from flask.cli import with_appcontext
+
+from app.controllers.employees import EmployeeController
+from app.database import create_schema, DATABASE, get_missing_tables
+
+
+@click.command('rebuild-totals')
+@with_appcontext
+def rebuild_totals_command():
+    """
+    Rebuilds the payroll period totals from the raw work units.
+    """
+    EmployeeController(db_session=DATABASE.session).rebuild_period_totals()
+    click.echo('Payroll period totals rebuilt')
+
+
+@click.command('rebuild-columnar')
+@with_appcontext
+def rebuild_columnar_command():
+    """
+    Rebuilds the columnar snapshot of the work units from the database.
+    """
+    EmployeeController(db_session=DATABASE.session).rebuild_columnar_store()
+    click.echo('Columnar snapshot rebuilt')
+
+
+@click.command('create-schema')
+@click.option('--check', is_flag=True, help='Only verifies that every table exists, failing otherwise.')
+@with_appcontext
+def create_schema_command(check: bool):
+    """
+    Creates the missing database tables and recomputes stale payroll period totals (see `create_schema`). Meant to be
+    run once per deploy, with `Config.Database.CREATE_SCHEMA` off so workers skip the schema work on boot.
+    """
+    if check:
+        missing = get_missing_tables()
+        if missing:
+            raise click.ClickException(f'Missing tables: {", ".join(missing)}')
+        click.echo('Database schema is up to date')
+        return
+
+    created = create_schema()
+    click.echo(f'Created tables: {", ".join(created)}' if created else 'Database schema is up to date')
+
+
+def commands_setup(app: Flask):
+    """
+    Registers the command line commands into the application.
+
+    Args:
+        - app (Flask): Current application instance.
+    """
+    app.cli.add_command(rebuild_totals_command)
+    app.cli.add_command(rebuild_columnar_command)
+    app.cli.add_command(create_schema_command)
@@ -10,11 +10,83 @@ class Config:
     LOG_LEVEL = os.getenv('LOG_LEVEL') or config_constants.Defaults.LOG_LEVEL
     ENVIRONMENT = os.getenv('ENVIRONMENT') or config_constants.Defaults.ENVIRONMENT
     SECRET_KEY = os.getenv('SECRET_KEY') or config_constants.Defaults.SECRET_KEY
+    WORKERS = int(os.getenv('WORKERS') or config_constants.Defaults.WORKERS)
     DEBUG = ENVIRONMENT != config_constants.Environments.PRODUCTION
+    LOG_FORMAT = os.getenv('LOG_FORMAT') or (
+        config_constants.LogFormats.CONSOLE if DEBUG else config_constants.LogFormats.JSON
+    )
+    LOG_QUEUE = (os.getenv('LOG_QUEUE') or str(not DEBUG)).lower() == 'true'
+    LOG_BODY_MAX_SIZE = int(os.getenv('LOG_BODY_MAX_SIZE') or config_constants.Defaults.LOG_BODY_MAX_SIZE)
+    LOG_BODY_SAMPLE_RATE = float(os.getenv('LOG_BODY_SAMPLE_RATE') or config_constants.Defaults.LOG_BODY_SAMPLE_RATE)
 
     class Database:
+        URI = os.getenv('DB_URI') or config_constants.Defaults.DB.URI
         HOST = os.getenv('DB_HOST') or config_constants.Defaults.DB.HOST
         PORT = os.getenv('DB_PORT') or config_constants.Defaults.DB.PORT
         NAME = os.getenv('DB_NAME') or config_constants.Defaults.DB.NAME
         USER = os.getenv('DB_USER') or config_constants.Defaults.DB.USER
         PASS = os.getenv('DB_PASS') or config_constants.Defaults.DB.PASS
+        POOL_SIZE = int(os.getenv('DB_POOL_SIZE') or config_constants.Defaults.DB.POOL_SIZE)
+        MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW') or config_constants.Defaults.DB.MAX_OVERFLOW)
+        POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT') or config_constants.Defaults.DB.POOL_TIMEOUT)
+        POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE') or config_constants.Defaults.DB.POOL_RECYCLE)
+        POOL_PRE_PING = (os.getenv('DB_POOL_PRE_PING') or config_constants.Defaults.DB.POOL_PRE_PING).lower() == 'true'
+        PARTITIONING = (
+            os.getenv('DB_PARTITIONING') or config_constants.Defaults.DB.PARTITIONING
+        ).lower() == 'true'
+        CREATE_SCHEMA = (
+            os.getenv('DB_CREATE_SCHEMA') or config_constants.Defaults.DB.CREATE_SCHEMA
+        ).lower() == 'true'
+        REPLICA_URIS = [
+            uri.strip()
+            for uri in (os.getenv('DB_REPLICA_URIS') or config_constants.Defaults.DB.REPLICA_URIS).split(',')
+            if uri.strip()
+        ]
+
+    class Ingest:
+        BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE') or config_constants.Defaults.Ingest.BATCH_SIZE)
+        CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE') or config_constants.Defaults.Ingest.CHUNK_SIZE)
+        ASYNC = (os.getenv('INGEST_ASYNC') or config_constants.Defaults.Ingest.ASYNC).lower() == 'true'
+        SPOOL_DIRECTORY = os.getenv('INGEST_SPOOL_DIRECTORY') or config_constants.Defaults.Ingest.SPOOL_DIRECTORY
+        JOB_WORKERS = int(os.getenv('INGEST_JOB_WORKERS') or config_constants.Defaults.Ingest.JOB_WORKERS)
+        JOB_TTL = int(os.getenv('INGEST_JOB_TTL') or config_constants.Defaults.Ingest.JOB_TTL)
+        # Every gunicorn worker has a pool of its own, so each one defaults to its share of the CPUs
+        PROCESSES = int(os.getenv('INGEST_PROCESSES') or max(
+            (os.cpu_count() or 1) // int(os.getenv('WORKERS') or config_constants.Defaults.WORKERS), 1,
+        ))
+        UPLOAD_CHUNK_MAX_SIZE = int(
+            os.getenv('INGEST_UPLOAD_CHUNK_MAX_SIZE') or config_constants.Defaults.Ingest.UPLOAD_CHUNK_MAX_SIZE
+        )
+        MAX_HOURS = float(os.getenv('INGEST_MAX_HOURS') or config_constants.Defaults.Ingest.MAX_HOURS)
+        MAX_REPORTED_ERRORS = int(
+            os.getenv('INGEST_MAX_REPORTED_ERRORS') or config_constants.Defaults.Ingest.MAX_REPORTED_ERRORS
+        )
+
+    class Report:
+        ENGINE = os.getenv('REPORT_ENGINE') or config_constants.Defaults.Report.ENGINE
+        STREAM = (os.getenv('REPORT_STREAM') or config_constants.Defaults.Report.STREAM).lower() == 'true'
+        CHUNK_SIZE = int(os.getenv('REPORT_CHUNK_SIZE') or config_constants.Defaults.Report.CHUNK_SIZE)
+        MAX_PAGE_SIZE = int(os.getenv('REPORT_MAX_PAGE_SIZE') or config_constants.Defaults.Report.MAX_PAGE_SIZE)
+        GZIP_LEVEL = int(os.getenv('REPORT_GZIP_LEVEL') or config_constants.Defaults.Report.GZIP_LEVEL)
+        PAY_SCHEDULE = os.getenv('REPORT_PAY_SCHEDULE') or config_constants.Defaults.Report.PAY_SCHEDULE
+        PAY_SCHEDULE_ANCHOR = (
+            os.getenv('REPORT_PAY_SCHEDULE_ANCHOR') or config_constants.Defaults.Report.PAY_SCHEDULE_ANCHOR
+        )
+
+    class ReportCache:
+        ENABLED = (os.getenv('REPORT_CACHE_ENABLED') or config_constants.Defaults.ReportCache.ENABLED).lower() == 'true'
+        DIRECTORY = os.getenv('REPORT_CACHE_DIRECTORY') or config_constants.Defaults.ReportCache.DIRECTORY
+        MAX_ENTRIES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES') or config_constants.Defaults.ReportCache.MAX_ENTRIES)
+
+    class Columnar:
+        ENABLED = (os.getenv('COLUMNAR_ENABLED') or config_constants.Defaults.Columnar.ENABLED).lower() == 'true'
+        DIRECTORY = os.getenv('COLUMNAR_DIRECTORY') or config_constants.Defaults.Columnar.DIRECTORY
+
+    class Metrics:
+        ENABLED = (os.getenv('METRICS_ENABLED') or config_constants.Defaults.Metrics.ENABLED).lower() == 'true'
+        DIRECTORY = os.getenv('METRICS_DIRECTORY') or config_constants.Defaults.Metrics.DIRECTORY
+
+    class Profiling:
+        ENABLED = (os.getenv('PROFILING_ENABLED') or config_constants.Defaults.Profiling.ENABLED).lower() == 'true'
+        DIRECTORY = os.getenv('PROFILING_DIRECTORY') or config_constants.Defaults.Profiling.DIRECTORY
+        TOKEN = os.getenv('PROFILING_TOKEN') or config_constants.Defaults.Profiling.TOKEN
@@ -1,6 +1,8 @@
 """
 Config-level constants.
 """
+import os
+import tempfile
 
 
 class Environments:
@@ -9,14 +11,76 @@ class Environments:
     TESTING = 'test'
 
 
+class LogFormats:
+    CONSOLE = 'console'
+    JSON = 'json'
+
+
 class Defaults:
     ENVIRONMENT = Environments.DEVELOPMENT
     LOG_LEVEL = 'DEBUG'
+    # Gunicorn worker processes
+    WORKERS = 4
+    LOG_BODY_MAX_SIZE = 4 * 1024
+    LOG_BODY_SAMPLE_RATE = 1
     SECRET_KEY = 'dummy-secret'
 
     class DB:
+        URI = ''  # Full connection string, overriding the settings below (and the SQLite database in dev/test)
         HOST = 'localhost'
         PORT = '5432'
         NAME = 'wavedb'
         USER = 'test'
         PASS = 'test'
+        # Per worker process: gunicorn workers * (POOL_SIZE + MAX_OVERFLOW) must fit in Postgres' max_connections
+        POOL_SIZE = 5
+        MAX_OVERFLOW = 5
+        POOL_TIMEOUT = 30
+        POOL_RECYCLE = 30 * 60
+        POOL_PRE_PING = 'true'
+        # Range-partitions the work units by month (PostgreSQL only). Has to be set before the tables are created
+        PARTITIONING = 'false'
+        # Comma-separated connection strings of read replicas, serving reports once they caught up with the primary
+        REPLICA_URIS = ''
+        # Creates the missing tables on boot. Off by default: `flask create-schema` runs once per deploy instead
+        CREATE_SCHEMA = 'false'
+
+    class Ingest:
+        BATCH_SIZE = 5000
+        CHUNK_SIZE = 64 * 1024
+        ASYNC = 'false'
+        SPOOL_DIRECTORY = os.path.join(tempfile.gettempdir(), 'wave-ingest-spool')
+        JOB_WORKERS = 2
+        JOB_TTL = 24 * 60 * 60
+        UPLOAD_CHUNK_MAX_SIZE = 64 * 1024 * 1024
+        # Most hours a single work unit may report
+        MAX_HOURS = 24
+        # Invalid rows are all counted, but only this many errors are detailed back
+        MAX_REPORTED_ERRORS = 100
+
+    class Report:
+        ENGINE = 'totals'
+        STREAM = 'true'
+        CHUNK_SIZE = 1000
+        MAX_PAGE_SIZE = 1000
+        GZIP_LEVEL = 6  # 0 disables the compression of reports
+        PAY_SCHEDULE = 'semi-monthly'
+        PAY_SCHEDULE_ANCHOR = '1970-01-05'  # A Monday; only used by the weekly and bi-weekly schedules
+
+    class ReportCache:
+        ENABLED = 'true'
+        DIRECTORY = os.path.join(tempfile.gettempdir(), 'wave-report-cache')
+        MAX_ENTRIES = 64
+
+    class Columnar:
+        ENABLED = 'false'
+        DIRECTORY = os.path.join(tempfile.gettempdir(), 'wave-columnar')
+
+    class Metrics:
+        ENABLED = 'true'
+        DIRECTORY = os.path.join(tempfile.gettempdir(), 'wave-metrics')
+
+    class Profiling:
+        ENABLED = 'false'
+        DIRECTORY = os.path.join(tempfile.gettempdir(), 'wave-profiles')
+        TOKEN = ''  # Required to profile requests when set; inline results are only returned when it is
@@ -0,0 +1,197 @@
+"""
+Batch CSV ingest: several time reports in one request, either as multiple files or inside a zip/tar archive.
+
+Every file is spooled to disk and ingested by a pool of worker processes, each one running
+`EmployeeController.process_csv` in its own transaction, so reports are committed atomically and independently.
+"""
+import multiprocessing
+import multiprocessing.pool
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+from flask import Flask
+from typing import Dict, List, Tuple
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from app.config import Config
+from app.controllers.employees import EmployeeController, EmployeeControllerException
+from app.database import DATABASE
+
+
+SpooledFile = Tuple[str, str]
+
+_WORKER_APP = None
+_POOL = None
+
+
+def _init_worker():
+    """
+    Creates the application used by a pool worker process.
+    """
+    global _WORKER_APP
+    from app.setup import create_app
+    _WORKER_APP = create_app()
+
+
+def _ingest_spooled_file(app: Flask, path: str, filename: str) -> Dict[str, any]:
+    """
+    Ingests a spooled file. Rows shared with concurrent ingests are upserted, so there is no conflict to retry.
+
+    Args:
+        - app (Flask): Application to run the ingest in;
+        - path (str): Path of the spooled file;
+        - filename (str): Original filename, used to resolve the report id.
+
+    Returns:
+        - (Dict[str, any]): Outcome of the ingest for the file.
+    """
+    result = {'filename': filename, 'status': 'processed', 'message': 'Employee work hours saved'}
+    try:
+        with app.app_context(), open(path, 'rb') as stream:
+            EmployeeController(db_session=DATABASE.session).process_csv(FileStorage(stream, filename=filename))
+    except EmployeeControllerException as err:
+        result.update(status='failed', message=str(err))
+    except Exception as err:
+        result.update(status='failed', message=f'Unexpected error: {err}')
+    return result
+
+
+def _ingest_in_worker(path: str, filename: str) -> Dict[str, any]:
+    """
+    Ingests a spooled file from a pool worker process.
+    """
+    return _ingest_spooled_file(_WORKER_APP, path, filename)
+
+
+def get_pool() -> multiprocessing.pool.Pool:
+    """
+    Returns the ingest process pool of the current process, created on first use.
+    Workers are spawned rather than forked, so they never inherit database connections.
+
+    Returns:
+        - (multiprocessing.pool.Pool): Process pool.
+    """
+    global _POOL
+    if _POOL is None:
+        context = multiprocessing.get_context('spawn')
+        _POOL = context.Pool(processes=Config.Ingest.PROCESSES, initializer=_init_worker)
+    return _POOL
+
+
+def terminate_pool():
+    """
+    Stops the ingest process pool of the current process, if any (i.e. gunicorn's `worker_exit`), so its processes do
+    not outlive the worker that spawned them.
+    """
+    global _POOL
+    if _POOL is not None:
+        _POOL.terminate()
+        _POOL.join()
+        _POOL = None
+
+
+class BatchIngestController(object):
+    """
+    Controller to ingest several time reports at once.
+    """
+    ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+    def __init__(self, app: Flask):
+        """
+        Class constructor.
+
+        Args:
+            - app (Flask): Application used when files are ingested in the current process.
+        """
+        self.app = app
+
+    @classmethod
+    def is_batch(cls, sources: List[FileStorage]) -> bool:
+        """
+        Tells whether the uploaded sources need the batch ingest.
+
+        Args:
+            - sources (List[FileStorage]): Uploaded source files.
+
+        Returns:
+            - (bool): True for several files or an archive.
+        """
+        return len(sources) > 1 or any(cls._is_archive(source) for source in sources)
+
+    @classmethod
+    def _is_archive(cls, source: FileStorage) -> bool:
+        return (source.filename or '').lower().endswith(cls.ARCHIVE_EXTENSIONS)
+
+    def _spool_archive(self, source: FileStorage, directory: str) -> List[SpooledFile]:
+        """
+        Extracts the regular files of an archive into a directory.
+        Member paths are flattened, so archives can not write outside of the directory.
+
+        Raises:
+            - EmployeeControllerException: IF the archive can not be read.
+
+        Args:
+            - source (FileStorage): Zip or tar archive;
+            - directory (str): Directory to extract the files into.
+
+        Returns:
+            - (List[SpooledFile]): (path, filename) of the extracted files.
+        """
+        spooled = []
+        try:
+            if zipfile.is_zipfile(source.stream):
+                source.stream.seek(0)
+                with zipfile.ZipFile(source.stream) as archive:
+                    for member in archive.infolist():
+                        if not member.is_dir():
+                            spooled.append(self._spool(archive.open(member), member.filename, directory))
+            else:
+                source.stream.seek(0)
+                with tarfile.open(fileobj=source.stream, mode='r:*') as archive:
+                    for member in archive:
+                        if member.isfile():
+                            spooled.append(self._spool(archive.extractfile(member), member.name, directory))
+        except (zipfile.BadZipFile, tarfile.TarError):
+            raise EmployeeControllerException(f'Unable to read archive "{source.filename}"')
+        return spooled
+
+    @staticmethod
+    def _spool(stream, name: str, directory: str) -> SpooledFile:
+        filename = secure_filename(os.path.basename(name))
+        fd, path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as spooled, stream:
+            shutil.copyfileobj(stream, spooled)
+        return path, filename
+
+    def process(self, sources: List[FileStorage]) -> List[Dict[str, any]]:
+        """
+        Ingests several source files (or archives of source files) in parallel.
+        Each report is committed on its own; a failing report does not affect the others.
+
+        Raises:
+            - EmployeeControllerException: IF an archive can not be read.
+
+        Args:
+            - sources (List[FileStorage]): Uploaded .csv files and/or archives.
+
+        Returns:
+            - (List[Dict[str, any]]): Outcome of the ingest for each file, in upload order.
+        """
+        directory = tempfile.mkdtemp(prefix='wave-batch-')
+        try:
+            spooled = []
+            for source in sources:
+                if self._is_archive(source):
+                    spooled.extend(self._spool_archive(source, directory))
+                else:
+                    spooled.append(self._spool(source.stream, source.filename, directory))
+
+            if len(spooled) <= 1 or Config.Ingest.PROCESSES <= 1:
+                return [_ingest_spooled_file(self.app, path, filename) for path, filename in spooled]
+            return get_pool().starmap(_ingest_in_worker, spooled, chunksize=1)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
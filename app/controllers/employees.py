@@ -1,20 +1,65 @@
 """
 Employee-related controller.
 """
-import calendar
 import csv
 import datetime
-
-import io
+import itertools
+import pickle
+import tempfile
+import time
 
 from flask import g
-from typing import Dict, List, Optional
+from structlog import get_logger
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm.scoping import scoped_session
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+from app.config import Config
 from app.constants.employees import JOB_GROUP_WAGES
-from app.models.employees import Employee, EmployeeWorkReport, EmployeeWorkUnit
+from app.database import get_dialect_insert, get_replica_session
+from app.metrics import record_ingest
+from app.models.employees import (
+    Employee, EmployeeWorkReport, EmployeeWorkReportIngest, EmployeeWorkUnit, PayrollPeriodTotal,
+    PayrollPeriodTotalsSchedule, WORK_UNITS_PARTITIONED,
+)
+from app.models.partitions import ensure_work_unit_partitions
+from app.reports.columnar import ColumnarStore, ColumnarWriter, get_columnar_store
+from app.reports.engines import get_report_engine, ReportEngine, ReportEngineException, SQLReportEngine
+from app.reports.pay_calendar import get_pay_calendar
+from app.reports.query import ReportQuery
+from app.utils.streams import (
+    COMPRESSION_ALIASES, DECOMPRESSION_ERRORS, iter_text_lines, open_decompressed,
+)
+
+
+# Namespace of the per-report advisory locks taken while ingesting. Two-key locks never collide with single-key ones,
+# such as `app.models.partitions.PARTITION_LOCK_KEY`
+REPORT_LOCK_NAMESPACE = 0x72657074
+
+# Advisory lock held from the moment an ingest takes its sequence number until it commits
+INGEST_SEQUENCE_LOCK_KEY = 0x73657175
+
+
+class WorkUnitRow(NamedTuple):
+    """ Work unit parsed from a time report row """
+    employee_id: int
+    date: datetime.date
+    hours_worked: float
+    job_group: str
+
+
+class RowError(NamedTuple):
+    """ Problem found in a field of a time report row """
+    line: int
+    field: str
+    value: str
+    message: str
+
+    def __str__(self) -> str:
+        return f'Line {self.line}, {self.field} "{self.value}": {self.message}'
 
 
 class EmployeeControllerException(Exception):
@@ -22,6 +67,115 @@ class EmployeeControllerException(Exception):
     pass
 
 
+class InvalidRowsException(EmployeeControllerException):
+    """ Exception raised when a time report has invalid rows, detailing them """
+    def __init__(self, errors: List[RowError], invalid_rows: int):
+        first = errors[0]
+        super().__init__(f'{invalid_rows} invalid row(s), first on line {first.line}: {first.message}')
+        self.errors = errors
+        self.invalid_rows = invalid_rows
+
+    def to_dict(self) -> Dict[str, any]:
+        """
+        Describes the invalid rows, to be sent back to the client.
+
+        Returns:
+            - (Dict[str, any]): Error message, amount of invalid rows and the errors found (up to
+                                `Config.Ingest.MAX_REPORTED_ERRORS`).
+        """
+        return {
+            'message': str(self),
+            'invalidRows': self.invalid_rows,
+            'errors': [dict(error._asdict()) for error in self.errors],
+        }
+
+
+class RowValidator(object):
+    """
+    Validates time report rows in a single pass, collecting every problem instead of stopping at the first one.
+    Besides the format of each field, checks that hours are in the `[0, Config.Ingest.MAX_HOURS]` range, job groups
+    have a wage, and every employee keeps a single job group, both within the file and against the stored employees.
+    The months of the valid rows are collected along the way, so their partitions can be created before writing.
+    """
+    def __init__(self, employee_groups: Optional[Dict[int, str]] = None):
+        """
+        Class constructor.
+
+        Args:
+            - employee_groups (Optional[Dict[int, str]]): Job group of the employees stored in the database, by id.
+        """
+        self.employee_groups = dict(employee_groups or {})
+        self.months = set()
+        self.errors = []
+        self.invalid_rows = 0
+
+    def validate(self, line: int, row: List[str]) -> Optional[WorkUnitRow]:
+        """
+        Validates and parses a raw CSV row, recording its problems.
+
+        Args:
+            - line (int): Line number of the row in the file, reported along with its problems;
+            - row (List[str]): Raw CSV row, as "date,hours worked,employee id,job group".
+
+        Returns:
+            - (Optional[WorkUnitRow]): Parsed work unit, or None when the row is invalid.
+        """
+        if len(row) != 4:
+            return self._reject([RowError(line, 'row', ','.join(row), 'Expected 4 fields: date, hours worked, '
+                                                                       'employee id, job group')])
+
+        date_str, hours_str, employee_str, job_group = row
+        errors = []
+        try:
+            date = EmployeeController._parse_date(date_str)
+        except (TypeError, ValueError):
+            errors.append(RowError(line, 'date', date_str, 'Invalid date, expected dd/mm/yyyy'))
+
+        try:
+            hours_worked = float(hours_str)
+        except ValueError:
+            hours_worked = None
+        if hours_worked is None or not 0 <= hours_worked <= Config.Ingest.MAX_HOURS:
+            errors.append(RowError(line, 'hours worked', hours_str,
+                                   f'Hours worked must be a number from 0 up to {Config.Ingest.MAX_HOURS:g}'))
+
+        try:
+            employee_id = int(employee_str)
+        except ValueError:
+            employee_id = None
+        if employee_id is None or employee_id <= 0:
+            errors.append(RowError(line, 'employee id', employee_str, 'Employee id must be a positive integer'))
+
+        if job_group not in JOB_GROUP_WAGES:
+            errors.append(RowError(line, 'job group', job_group,
+                                   f'Unknown job group, expected one of {", ".join(sorted(JOB_GROUP_WAGES))}'))
+        elif employee_id is not None:
+            known_group = self.employee_groups.setdefault(employee_id, job_group)
+            if known_group != job_group:
+                errors.append(RowError(line, 'job group', job_group,
+                                       f'Employee {employee_id} belongs to job group {known_group}'))
+
+        if errors:
+            return self._reject(errors)
+        self.months.add(date.replace(day=1))
+        return WorkUnitRow(employee_id, date, hours_worked, job_group)
+
+    def _reject(self, errors: List[RowError]) -> None:
+        """ Counts an invalid row, keeping its errors up to `Config.Ingest.MAX_REPORTED_ERRORS` in total """
+        self.invalid_rows += 1
+        self.errors.extend(errors[:max(Config.Ingest.MAX_REPORTED_ERRORS - len(self.errors), 0)])
+
+    def check(self):
+        """
+        Fails when any of the rows validated so far is invalid.
+
+        Raises:
+            - InvalidRowsException: IF any of the rows validated so far is invalid.
+        """
+        if self.invalid_rows:
+            raise InvalidRowsException(self.errors, self.invalid_rows)
+
+
 class EmployeeController(object):
     """
     Controller to encapsulate employee-related data/logic manipulations.
@@ -70,9 +224,76 @@ class EmployeeController(object):
 
         return report_id
 
-    def process_csv(self, source: FileStorage):
+    @staticmethod
+    def _parse_date(date_str: str) -> datetime.date:
         """
-        Processes a CSV file in order to extract employee's work information.
+        Parses a date in the "dd/mm/yyyy" format used by the time reports.
+
+        Args:
+            - date_str (str): Date string to parse.
+
+        Returns:
+            - (datetime.date): Parsed date.
+        """
+        return datetime.date(*[int(part) for part in reversed(date_str.split('/'))])
+
+    @staticmethod
+    def _iter_batches(rows: Iterable[List[str]], batch_size: int) -> Iterator[List[List[str]]]:
+        """
+        Groups rows into lists of at most `batch_size` items, without consuming more than one batch at a time.
+
+        Args:
+            - rows (Iterable[List[str]]): Rows to group;
+            - batch_size (int): Maximum amount of rows per batch.
+
+        Returns:
+            - (Iterator[List[List[str]]]): Batches of rows.
+        """
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _write_batch(self, report_id: int, batch: List[WorkUnitRow], employee_groups: Dict[int, str],
+                     totals: Dict[Tuple[int, int], float], columnar_writer: Optional[ColumnarWriter] = None):
+        """
+        Writes a batch of work units into the database, with a single executemany insert.
+
+        Args:
+            - report_id (int): Id of the report the rows belong to;
+            - batch (List[WorkUnitRow]): Parsed work units to be written;
+            - employee_groups (Dict[int, str]): Job group of the employees of the batch, already in the database, by id;
+            - totals (Dict[Tuple[int, int], float]): Amount added to each (employee_id, period_key). Updated in place;
+            - columnar_writer (Optional[ColumnarWriter]): Writer staging the rows for the columnar snapshot, if any.
+        """
+        pay_calendar = get_pay_calendar()
+        work_units = []
+        columnar_rows = []
+        for employee_id, date, hours_worked, _ in batch:
+            work_units.append({
+                'employee_id': employee_id,
+                'report_id': report_id,
+                'hours_worked': hours_worked,
+                'date': date,
+            })
+
+            job_group = employee_groups[employee_id]
+            key = (employee_id, pay_calendar.get_key(date))
+            totals[key] = totals.get(key, 0) + JOB_GROUP_WAGES.get(job_group, 0) * hours_worked
+            if columnar_writer:
+                columnar_rows.append((employee_id, date, hours_worked, job_group))
+
+        if work_units:
+            self.db_session.execute(EmployeeWorkUnit.__table__.insert(), work_units)
+
+        if columnar_writer:
+            columnar_writer.append(columnar_rows)
+
+    def resolve_new_report_id(self, source: FileStorage) -> int:
+        """
+        Resolves the report id from a certain source file, making sure it has not been processed yet.
 
         Raises:
             - EmployeeControllerException:
@@ -80,45 +301,394 @@ class EmployeeController(object):
                 - IF the report file has already been processed.
 
         Args:
-            - source (FileStorage): Source .csv file to process.
+            - source (FileStorage): Source file to extract report id.
+
+        Returns:
+            - report_id (int): Id of the report.
         """
         report_id = self._resolve_report_id(source)
-        if EmployeeWorkReport.query.filter_by(id=report_id).count() != 0:
+        if self.db_session.query(EmployeeWorkReport).filter_by(id=report_id).count() != 0:
             raise EmployeeControllerException('Source file already processed')
+        return report_id
+
+    def process_csv(self, source: FileStorage, progress: Optional[Callable[[int], None]] = None):
+        """
+        Processes a CSV file in order to extract employee's work information.
+        The file is decompressed (when gzip, bzip2 or xz compressed), decoded and parsed as a stream, so memory usage is
+        bounded by `Config.Ingest.CHUNK_SIZE` and `Config.Ingest.BATCH_SIZE` regardless of the file size. Every row is
+        validated before anything is written (see `validate_rows`), then rows are committed once at the end, and
+        appended to the columnar snapshot when `Config.Columnar.ENABLED` is set.
+
+        Raises:
+            - EmployeeControllerException:
+                - IF unable to extract the report id from the filename;
+                - IF the report file has already been processed;
+                - IF the file is compressed in an unsupported format, or can not be decompressed.
+            - InvalidRowsException: IF any of the rows is invalid. Nothing is written then.
+
+        Args:
+            - source (FileStorage): Source .csv file to process;
+            - progress (Optional[Callable[[int], None]]): Called with the amount of rows written so far, after each
+                                                          batch.
+        """
+        report_id = self.resolve_new_report_id(source)
+        started = time.monotonic()
+
+        # Compression is taken from the Content-Encoding or Content-Type of the file when set, or detected otherwise
+        encoding = source.headers.get('Content-Encoding')
+        if not encoding and (source.mimetype or '').lower() in COMPRESSION_ALIASES:
+            encoding = source.mimetype
+        if encoding and encoding.lower() not in COMPRESSION_ALIASES and encoding.lower() != 'identity':
+            raise EmployeeControllerException(f'Unsupported encoding "{encoding}"')
+        with tempfile.TemporaryFile() as spool:
+            try:
+                stream = open_decompressed(source.stream, encoding)
+                validator = self.validate_rows(
+                    csv.reader(iter_text_lines(stream, chunk_size=Config.Ingest.CHUNK_SIZE)), spool,
+                )
+            except DECOMPRESSION_ERRORS:
+                self.db_session.rollback()
+                raise EmployeeControllerException('Unable to decompress the source file')
+            except InvalidRowsException:
+                self.db_session.rollback()
+                raise
+            rows_processed = self.process_rows(report_id, self._iter_spooled_rows(spool), progress, validator.months,
+                                               validator.employee_groups)
+
+        try:
+            size = source.stream.tell()
+        except (AttributeError, OSError):
+            size = 0
+        record_ingest(rows_processed, size, time.monotonic() - started)
+
+    def validate_rows(self, csv_reader: Iterator[List[str]], spool: BinaryIO) -> RowValidator:
+        """
+        Validates every row of a time report in a single pass, only reading from the database, and stages the parsed
+        work units into a file so they are written without parsing the source again.
+
+        Raises:
+            - InvalidRowsException: IF any of the rows is invalid, detailing the problems with their line numbers.
+
+        Args:
+            - csv_reader (Iterator[List[str]]): Reader of the time report, header row included;
+            - spool (BinaryIO): Binary file the batches of parsed work units are pickled into. Rewound at the end.
+
+        Returns:
+            - (RowValidator): Validator of the rows, holding the employees and months they refer to.
+        """
+        validator = RowValidator(dict(self.db_session.query(Employee.id, Employee.job_group)))
+        next(csv_reader, None)  # Get rid of the header row
+        rows = (
+            validator.validate(csv_reader.line_num, row) for row in csv_reader if row  # Blank lines are ignored
+        )
+        for batch in self._iter_batches(rows, Config.Ingest.BATCH_SIZE):
+            # Once a row is invalid, the rest of the file is only validated
+            if not validator.invalid_rows:
+                pickle.dump(batch, spool, protocol=pickle.HIGHEST_PROTOCOL)
+        validator.check()
+        spool.seek(0)
+        return validator
+
+    @staticmethod
+    def _iter_spooled_rows(spool: BinaryIO) -> Iterator[WorkUnitRow]:
+        """
+        Reads back the work units staged by `validate_rows`.
+
+        Args:
+            - spool (BinaryIO): File holding the pickled batches of work units.
+
+        Returns:
+            - (Iterator[WorkUnitRow]): Work units, in file order.
+        """
+        while True:
+            try:
+                yield from pickle.load(spool)
+            except EOFError:
+                return
+
+    def process_rows(self, report_id: int, rows: Iterable[WorkUnitRow],
+                     progress: Optional[Callable[[int], None]] = None,
+                     months: Optional[Iterable[datetime.date]] = None,
+                     employee_groups: Optional[Dict[int, str]] = None) -> int:
+        """
+        Writes the work units of a new report in a single transaction, in batches of `Config.Ingest.BATCH_SIZE`, and
+        then appends them to the columnar snapshot when `Config.Columnar.ENABLED` is set.
+        Reports can be ingested concurrently by several processes: each one is claimed first (see `_claim_report`),
+        and the rows shared with other reports (employees and period totals) are upserted.
+
+        Raises:
+            - EmployeeControllerException: IF the report was already processed, or is being processed, or IF a new
+                                           employee was stored in another job group by a concurrent ingest.
+
+        Args:
+            - report_id (int): Id of the report;
+            - rows (Iterable[WorkUnitRow]): Parsed work units, consumed lazily;
+            - progress (Optional[Callable[[int], None]]): Called with the amount of rows written so far, after each
+                                                          batch;
+            - months (Optional[Iterable[datetime.date]]): First day of the months the rows fall in, whose partitions
+                                                          are created upfront (see `_create_partitions`). Defaults to
+                                                          the months of `rows`, which are then read all at once;
+            - employee_groups (Optional[Dict[int, str]]): Job group of (at least) every employee of the rows, by id.
+                                                          Defaults to the ones of `rows`, read all at once as well.
+
+        Returns:
+            - (int): Amount of rows written.
+        """
+        if months is None or employee_groups is None:
+            rows = list(rows)
+        if months is None:
+            months = {row.date.replace(day=1) for row in rows}
+        if employee_groups is None:
+            employee_groups = {row.employee_id: row.job_group for row in rows}
+        self._create_partitions(months)
+        self._claim_report(report_id)
+
+        # Single pre-fetch of the known employees, and a single insert of the new ones before any work unit
+        known_groups = dict(self.db_session.query(Employee.id, Employee.job_group))
+        self._insert_employees({
+            employee_id: job_group
+            for employee_id, job_group in employee_groups.items()
+            if employee_id not in known_groups
+        })
+        employee_groups = {**employee_groups, **known_groups}
+        totals = {}
+        rows_processed = 0
+        store = get_columnar_store()
+        columnar_writer = store.writer() if store else None
+        try:
+            for batch in self._iter_batches(rows, Config.Ingest.BATCH_SIZE):
+                self._write_batch(report_id, batch, employee_groups, totals, columnar_writer)
+                rows_processed += len(batch)
+                if progress:
+                    progress(rows_processed)
+            self._update_period_totals(totals)
+            self._sequence_report(report_id)
+            self.db_session.commit()
+
+            if columnar_writer:
+                columnar_writer.commit([report_id])
+        finally:
+            if columnar_writer:
+                columnar_writer.discard()
+        return rows_processed
+
+    def _create_partitions(self, months: Iterable[datetime.date]):
+        """
+        Creates the work unit partitions missing for some months, when `Config.Database.PARTITIONING` is set.
+        Creating a partition locks the whole work units table, so it happens before the ingest transaction starts:
+        done halfway through, it would wait on the locks of that same transaction.
 
-        source_string_io = io.StringIO(source.stream.read().decode('UTF-8'), newline=None)
-        csv_reader = csv.reader(source_string_io)
-        next(csv_reader)  # Get rid of the header row
-
-        report = EmployeeWorkReport(id=report_id)
-        self.db_session.add(report)
-        self.db_session.flush()
-
-        employee_ids = []
-        for row in csv_reader:
-            date_str = row[0]
-            hours_worked = float(row[1])
-            employee_id = int(row[2])
-            job_group = row[3]
-
-            if employee_id not in employee_ids:
-                employee = Employee.query.filter_by(id=employee_id).first()
-                if not employee:
-                    employee = Employee(id=employee_id, job_group=job_group)
-                    self.db_session.add(employee)
-                    self.db_session.flush()
-                employee_ids.append(employee.id)
-
-            work_unit_data = EmployeeWorkUnit(
-                employee_id=employee_id,
-                report_id=report.id,
-                hours_worked=hours_worked,
-                date=datetime.date(*[int(part) for part in reversed(date_str.split('/'))]),
+        Args:
+            - months (Iterable[datetime.date]): First day of the months about to be written.
+        """
+        if not WORK_UNITS_PARTITIONED:
+            return
+        # Ends the read-only transaction the rows were validated in
+        self.db_session.commit()
+        ensure_work_unit_partitions(self.db_session.bind, months)
+
+    def _insert_employees(self, employee_groups: Dict[int, str]):
+        """
+        Inserts new employees in a single statement, skipping the ones another ingest inserted concurrently.
+        Rows are inserted in id order, so concurrent ingests sharing employees lock them in the same order, and one
+        waits for the other instead of deadlocking. The stored job groups are read back afterwards, as an employee
+        skipped that way may have been stored in another job group.
+
+        Raises:
+            - EmployeeControllerException: IF any of the employees was stored in another job group in the meantime.
+
+        Args:
+            - employee_groups (Dict[int, str]): Job group of the employees to insert, by id.
+        """
+        if not employee_groups:
+            return
+        employee_ids = sorted(employee_groups)
+        insert = get_dialect_insert(self.db_session.connection())
+        self.db_session.execute(
+            insert(Employee.__table__).on_conflict_do_nothing(index_elements=['id']),
+            [{'id': employee_id, 'job_group': employee_groups[employee_id]} for employee_id in employee_ids],
+        )
+
+        conflicts = []
+        for batch in self._iter_batches(employee_ids, Config.Ingest.BATCH_SIZE):
+            stored_groups = self.db_session.query(Employee.id, Employee.job_group).filter(Employee.id.in_(batch))
+            conflicts.extend(
+                f'Employee {employee_id} belongs to job group {job_group}'
+                for employee_id, job_group in stored_groups.order_by(Employee.id)
+                if job_group != employee_groups[employee_id]
             )
-            self.db_session.add(work_unit_data)
-            self.db_session.flush()
+        if conflicts:
+            self.db_session.rollback()
+            raise EmployeeControllerException('; '.join(conflicts[:Config.Ingest.MAX_REPORTED_ERRORS]))
+
+    def _claim_report(self, report_id: int):
+        """
+        Inserts the report row, making sure no other process is ingesting, or already ingested, the same report.
+        On PostgreSQL, a transaction-scoped advisory lock on the report id makes a concurrent ingest of the same report
+        fail right away, instead of waiting for the first one to finish; different reports never wait for each other.
+
+        Raises:
+            - EmployeeControllerException: IF the report was already processed, or is being processed.
+
+        Args:
+            - report_id (int): Id of the report.
+        """
+        bind = self.db_session.connection()
+        if bind.dialect.name == 'postgresql':
+            locked = self.db_session.execute(
+                text('SELECT pg_try_advisory_xact_lock(:namespace, :report_id)'),
+                {'namespace': REPORT_LOCK_NAMESPACE, 'report_id': report_id},
+            ).scalar()
+            if not locked:
+                self.db_session.rollback()
+                raise EmployeeControllerException('Source file is already being processed')
+
+        insert = get_dialect_insert(bind)
+        result = self.db_session.execute(
+            insert(EmployeeWorkReport.__table__).on_conflict_do_nothing(index_elements=['id']), {'id': report_id},
+        )
+        if result.rowcount != 1:
+            self.db_session.rollback()
+            raise EmployeeControllerException('Source file already processed')
+
+    def _sequence_report(self, report_id: int):
+        """
+        Gives the report the next ingest sequence number (see `EmployeeWorkReportIngest`), right before its ingest
+        commits. On PostgreSQL, an advisory lock held until the commit makes sequence numbers follow the commit order,
+        so a number is never visible before every lower one is.
+
+        Args:
+            - report_id (int): Id of the report.
+        """
+        if self.db_session.connection().dialect.name == 'postgresql':
+            self.db_session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': INGEST_SEQUENCE_LOCK_KEY})
+        self.db_session.execute(EmployeeWorkReportIngest.__table__.insert(), {'report_id': report_id})
+
+    def _update_period_totals(self, totals: Dict[Tuple[int, int], float]):
+        """
+        Adds amounts to the payroll period totals with a single upsert, creating the missing (employee, period) rows.
+        Rows are written in key order, so concurrent ingests lock shared rows in the same order and never deadlock.
+        Totals computed with another pay schedule are left as they are, but marked stale, as they would otherwise mix
+        periods of both schedules; reports fall back to the SQL engine until they are rebuilt.
+
+        Args:
+            - totals (Dict[Tuple[int, int], float]): Amount to add to each (employee_id, period_key).
+        """
+        if not totals:
+            return
+        if not self.are_period_totals_current():
+            get_logger(__name__).warning('Payroll period totals follow another pay schedule, marking them stale')
+            self.db_session.query(PayrollPeriodTotalsSchedule).delete()
+            return
+
+        pay_calendar = get_pay_calendar()
+        params = []
+        for (employee_id, period_key), amount in sorted(totals.items()):
+            period_start, period_end = pay_calendar.get_bounds(period_key)
+            params.append({
+                'employee_id': employee_id,
+                'period_start': period_start,
+                'period_end': period_end,
+                'amount': amount,
+            })
+
+        table = PayrollPeriodTotal.__table__
+        upsert = get_dialect_insert(self.db_session.connection())(table)
+        self.db_session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=['employee_id', 'period_start', 'period_end'],
+                set_={'amount': table.c.amount + upsert.excluded.amount},
+            ),
+            params,
+        )
+
+    def are_period_totals_current(self) -> bool:
+        """
+        Checks whether the payroll period totals were computed with the pay schedule currently configured.
+
+        Returns:
+            - (bool): True when the totals follow the current schedule.
+        """
+        signature = self.db_session.query(PayrollPeriodTotalsSchedule.signature).scalar()
+        return signature == get_pay_calendar().schedule.signature
+
+    def rebuild_period_totals(self):
+        """
+        Rebuilds the payroll period totals from the raw work units, following the current pay schedule.
+        """
+        self.db_session.query(PayrollPeriodTotal).delete()
+        self.db_session.query(PayrollPeriodTotalsSchedule).delete()
+        self.db_session.add(PayrollPeriodTotalsSchedule(id=1, signature=get_pay_calendar().schedule.signature))
+        rows = SQLReportEngine(self.db_session).rows()
+        for batch in self._iter_batches(rows, Config.Ingest.BATCH_SIZE):
+            self.db_session.execute(PayrollPeriodTotal.__table__.insert(), [
+                {'employee_id': employee_id, 'period_start': period_start, 'period_end': period_end, 'amount': amount}
+                for employee_id, period_start, period_end, amount in batch
+            ])
         self.db_session.commit()
 
+    def rebuild_columnar_store(self):
+        """
+        Rebuilds the columnar snapshot of the work units from the database.
+        """
+        query = (
+            self.db_session.query(EmployeeWorkUnit.employee_id, EmployeeWorkUnit.date,
+                                  EmployeeWorkUnit.hours_worked, Employee.job_group)
+            .join(Employee, Employee.id == EmployeeWorkUnit.employee_id)
+            .yield_per(Config.Ingest.BATCH_SIZE)
+        )
+        reports, max_report_id = self.db_session.query(
+            func.count(EmployeeWorkReport.id), func.max(EmployeeWorkReport.id)
+        ).one()
+        ColumnarStore(Config.Columnar.DIRECTORY).rebuild(
+            self._iter_batches(query, Config.Ingest.BATCH_SIZE), reports, max_report_id or 0,
+        )
+
+    def get_data_version(self) -> str:
+        """
+        Resolves a version identifier for the ingested data, which changes whenever a new report is processed.
+
+        Returns:
+            - (str): Data version.
+        """
+        count, max_id = self.db_session.query(func.count(EmployeeWorkReport.id), func.max(EmployeeWorkReport.id)).one()
+        return f'{count}.{max_id or 0}'
+
+    def get_read_controller(self, version: str) -> 'EmployeeController':
+        """
+        Resolves a controller to serve reports from, preferring a read replica when one is configured.
+        Replicas lag behind the primary, so one is only used once it reached the same data version; the primary is
+        used otherwise, including right after a report is ingested, or when the replica cannot be reached.
+
+        Args:
+            - version (str): Data version read from the primary (see `get_data_version`).
+
+        Returns:
+            - (EmployeeController): Controller bound to an up to date replica, or this controller.
+        """
+        replica_session = get_replica_session()
+        if replica_session is None:
+            return self
+
+        replica = EmployeeController(replica_session)
+        try:
+            if replica.get_data_version() == version:
+                return replica
+        except SQLAlchemyError:
+            replica_session.rollback()
+            get_logger(__name__).warning('Read replica unavailable, reading from primary', exc_info=True)
+        return self
+
+    def get_report_watermark(self) -> int:
+        """
+        Resolves the ingest sequence number of the latest report ingested, to be sent back as the "since" of the next
+        delta report. The watermark should be read before the report, so a report ingested in between is sent again by
+        the next delta rather than skipped.
+
+        Returns:
+            - (int): Highest ingest sequence number. 0 when no report was ingested.
+        """
+        return self.db_session.query(func.max(EmployeeWorkReportIngest.sequence)).scalar() or 0
 
     def _get_period(self, date: datetime.date) -> Dict[str, str]:
         """
@@ -130,41 +700,63 @@ class EmployeeController(object):
         Returns:
             - (Dict[str, str]): Map detailing correct period for the date argument.
         """
-        if date.day < 15:
-            first_day = 1
-            final_day = 15
-        else:
-            first_day = 16
-            final_day = calendar.monthrange(date.year, date.month)[1]
-
+        pay_calendar = get_pay_calendar()
+        start_date, end_date = pay_calendar.get_strings(pay_calendar.get_key(date))
         return {
-            'startDate': date.replace(day=first_day).isoformat(),
-            'endDate': date.replace(day=final_day).isoformat(),
+            'startDate': start_date,
+            'endDate': end_date,
         }
 
-    def generate_report(self) -> List[Dict[str, any]]:
+    def _get_report_engine(self, report_query: Optional[ReportQuery] = None) -> ReportEngine:
         """
-        Generates an employee report detailing wages per period.
+        Instantiates the report engine set in `Config.Report.ENGINE`, or the SQL engine for delta reports and while the
+        payroll period totals do not follow the current pay schedule.
+
+        Args:
+            - report_query (Optional[ReportQuery]): Filters and pagination. Defaults to the whole report.
+
+        Raises:
+            - EmployeeControllerException: IF the configured report engine does not exist.
+
+        Returns:
+            - (ReportEngine): Report engine bound to the current session.
+        """
+        # Only the SQL engine can tell which periods were touched by which reports
+        name = 'sql' if report_query and report_query.since is not None else Config.Report.ENGINE
+        if name == 'totals' and not self.are_period_totals_current():
+            get_logger(__name__).warning('Payroll period totals follow another pay schedule, reading work units')
+            name = 'sql'
+        try:
+            return get_report_engine(name, self.db_session, report_query)
+        except ReportEngineException as err:
+            raise EmployeeControllerException(str(err))
+
+    def generate_report(self, report_query: Optional[ReportQuery] = None) -> List[Dict[str, any]]:
+        """
+        Generates an employee report detailing wages per period, using the engine set in `Config.Report.ENGINE`.
+
+        Args:
+            - report_query (Optional[ReportQuery]): Filters and pagination. Defaults to the whole report.
+
+        Raises:
+            - EmployeeControllerException: IF the configured report engine does not exist.
 
         Returns:
             - result (List[Dict[str, any]]): List of period data, identifying employee and total amount paid.
         """
-        ordering = [EmployeeWorkUnit.employee_id.asc(), EmployeeWorkUnit.date.asc()]
-        work_units = EmployeeWorkUnit.query.order_by(*ordering).all()
-
-        data = {}
-        for work_unit in work_units:
-            employee_id = work_unit.employee_id
-            period = self._get_period(work_unit.date)
-            period_slug = f'{period["startDate"]}_{period["endDate"]}_{employee_id}'
-            if not data.get(period_slug):
-                data[period_slug] = {'amount': 0, 'payPeriod': period, 'employeeId': str(employee_id)}
-            data[period_slug]['amount'] += JOB_GROUP_WAGES[work_unit.employee.job_group] * work_unit.hours_worked
-
-        result = []
-        for item in data.values():
-            amount = item.pop('amount')
-            if amount > 0:
-                item['amountPaid'] = '${:.2f}'.format(amount)
-                result.append(item)
-        return result
+        return self._get_report_engine(report_query).generate()
+
+    def iter_report(self, report_query: Optional[ReportQuery] = None) -> Iterator[Dict[str, any]]:
+        """
+        Lazily generates the same entries as `generate_report`, fetching rows from the database as they are consumed.
+
+        Args:
+            - report_query (Optional[ReportQuery]): Filters and pagination. Defaults to the whole report.
+
+        Raises:
+            - EmployeeControllerException: IF the configured report engine does not exist.
+
+        Returns:
+            - (Iterator[Dict[str, any]]): Period data, identifying employee and total amount paid.
+        """
+        return self._get_report_engine(report_query).iter_entries()
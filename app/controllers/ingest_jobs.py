@@ -0,0 +1,298 @@
+"""
+Asynchronous CSV ingest jobs.
+
+Uploads are spooled to `Config.Ingest.SPOOL_DIRECTORY` and processed by a pool of background threads, running the
+same `EmployeeController.process_csv` logic as the synchronous endpoint. Job statuses are stored as JSON files next to
+the spooled uploads, so any worker process on the host can report on any job.
+
+Jobs only live in the memory of the process that accepted them, so they are lost when it exits (i.e. a worker restart
+or a deploy). Statuses record the pid of that process: unfinished jobs whose process is gone are reported as failed,
+and are swept on startup (see `IngestJobStore.fail_orphaned_jobs`), so they never stay queued or running forever.
+"""
+import datetime
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import Flask
+from structlog import get_logger
+from typing import Dict, Optional
+from werkzeug.datastructures import FileStorage
+
+from app.config import Config
+from app.controllers.employees import EmployeeController, EmployeeControllerException, InvalidRowsException
+from app.database import DATABASE
+
+
+JOB_ID_PATTERN = re.compile('[0-9a-f]{32}')
+
+
+class JobStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+ORPHANED_JOB_ERROR = 'The worker process running the job exited before it finished, please submit the file again'
+
+
+def _is_process_alive(pid: Optional[int]) -> bool:
+    """
+    Checks whether a process of the current host is still running.
+
+    Args:
+        - pid (Optional[int]): Id of the process.
+
+    Returns:
+        - (bool): True when the process exists.
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Running under another user
+    return True
+
+
+class IngestJobStore(object):
+    """
+    Stores spooled uploads and job statuses in a directory.
+    """
+    def __init__(self, directory: str):
+        """
+        Class constructor.
+
+        Args:
+            - directory (str): Directory where uploads and statuses are stored. Created when missing.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def upload_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.csv')
+
+    def _status_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def get(self, job_id: str) -> Optional[Dict[str, any]]:
+        """
+        Reads the status of a job.
+
+        Args:
+            - job_id (str): Id of the job.
+
+        Returns:
+            - (Optional[Dict[str, any]]): Job status, if the job exists.
+        """
+        try:
+            with open(self._status_path(job_id)) as status_file:
+                return json.load(status_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, status: Dict[str, any]):
+        """
+        Atomically writes the status of a job.
+
+        Args:
+            - status (Dict[str, any]): Job status, identified by its "jobId".
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as status_file:
+            json.dump(status, status_file)
+        os.replace(tmp_path, self._status_path(status['jobId']))
+
+    def fail_orphaned(self, status: Dict[str, any]) -> Dict[str, any]:
+        """
+        Marks a queued or running job as failed when the process that owns it no longer exists.
+
+        Args:
+            - status (Dict[str, any]): Job status.
+
+        Returns:
+            - (Dict[str, any]): Job status, updated when the job was orphaned.
+        """
+        if status['status'] not in (JobStatus.QUEUED, JobStatus.RUNNING) or _is_process_alive(status.get('pid')):
+            return status
+        status.update(status=JobStatus.FAILED, errors=[ORPHANED_JOB_ERROR], finishedAt=_now())
+        self.save(status)
+        try:
+            os.remove(self.upload_path(status['jobId']))
+        except FileNotFoundError:
+            pass
+        return status
+
+    def fail_orphaned_jobs(self):
+        """
+        Marks every queued or running job whose process no longer exists as failed (see `fail_orphaned`).
+        """
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            status = self.get(os.path.splitext(os.path.basename(path))[0])
+            if status is not None:
+                self.fail_orphaned(status)
+
+    def purge(self, max_age: int):
+        """
+        Removes the statuses and uploads of jobs last updated more than `max_age` seconds ago.
+
+        Args:
+            - max_age (int): Maximum age, in seconds.
+        """
+        limit = time.time() - max_age
+        for path in glob.glob(os.path.join(self.directory, '*')):
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass  # Already purged by another worker
+
+
+_EXECUTOR = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the ingest thread pool of the current process, created on first use (i.e. after gunicorn forks).
+
+    Returns:
+        - (ThreadPoolExecutor): Thread pool running the ingest jobs.
+    """
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=Config.Ingest.JOB_WORKERS, thread_name_prefix='ingest')
+    return _EXECUTOR
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+
+class IngestJobController(object):
+    """
+    Controller to submit and follow asynchronous ingest jobs.
+    """
+    def __init__(self, app: Flask, store: Optional[IngestJobStore] = None):
+        """
+        Class constructor.
+
+        Args:
+            - app (Flask): Application the jobs run in;
+            - store (Optional[IngestJobStore]): Job store. Defaults to a store in `Config.Ingest.SPOOL_DIRECTORY`.
+        """
+        self.app = app
+        self.store = store or IngestJobStore(Config.Ingest.SPOOL_DIRECTORY)
+        self.logger = get_logger(__name__)
+
+    def submit(self, source: FileStorage) -> Dict[str, any]:
+        """
+        Spools a source file to disk and schedules its processing.
+
+        Raises:
+            - EmployeeControllerException:
+                - IF unable to extract the report id from the filename;
+                - IF the report file has already been processed.
+
+        Args:
+            - source (FileStorage): Source .csv file to process.
+
+        Returns:
+            - (Dict[str, any]): Status of the new job.
+        """
+        report_id = EmployeeController(db_session=DATABASE.session).resolve_new_report_id(source)
+        self.store.purge(Config.Ingest.JOB_TTL)
+
+        job_id = uuid.uuid4().hex
+        source.save(self.store.upload_path(job_id))
+        status = {
+            'jobId': job_id,
+            'status': JobStatus.QUEUED,
+            'pid': os.getpid(),
+            'filename': source.filename,
+            'reportId': report_id,
+            'rowsProcessed': 0,
+            'rowsPerSecond': 0,
+            'errors': [],
+            'createdAt': _now(),
+            'startedAt': None,
+            'finishedAt': None,
+        }
+        self.store.save(status)
+        self.schedule(job_id)
+        return status
+
+    def schedule(self, job_id: str) -> Future:
+        """
+        Runs a job in the ingest thread pool.
+
+        Args:
+            - job_id (str): Id of the job.
+
+        Returns:
+            - (Future): Future of the job execution.
+        """
+        return get_executor().submit(self.run, job_id)
+
+    def run(self, job_id: str):
+        """
+        Processes the spooled file of a job, keeping its status up to date.
+
+        Args:
+            - job_id (str): Id of the job.
+        """
+        status = self.store.get(job_id)
+        status.update(status=JobStatus.RUNNING, startedAt=_now())
+        self.store.save(status)
+        started = time.monotonic()
+
+        def progress(rows_processed: int):
+            elapsed = time.monotonic() - started
+            status['rowsProcessed'] = rows_processed
+            status['rowsPerSecond'] = round(rows_processed / elapsed, 2) if elapsed else 0
+            self.store.save(status)
+
+        upload_path = self.store.upload_path(job_id)
+        try:
+            with self.app.app_context(), open(upload_path, 'rb') as stream:
+                EmployeeController(db_session=DATABASE.session).process_csv(
+                    FileStorage(stream, filename=status['filename']),
+                    progress=progress,
+                )
+            status['status'] = JobStatus.SUCCEEDED
+        except InvalidRowsException as err:
+            status.update(status=JobStatus.FAILED, errors=[str(error) for error in err.errors])
+        except EmployeeControllerException as err:
+            status.update(status=JobStatus.FAILED, errors=[str(err)])
+        except Exception as err:
+            self.logger.exception('Ingest job failed', job_id=job_id)
+            status.update(status=JobStatus.FAILED, errors=[f'Unexpected error: {err}'])
+        finally:
+            status['finishedAt'] = _now()
+            self.store.save(status)
+            try:
+                os.remove(upload_path)
+            except FileNotFoundError:
+                pass
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, any]]:
+        """
+        Reads the status of a job, reporting it as failed when the process that owns it exited before it finished.
+
+        Args:
+            - job_id (str): Id of the job.
+
+        Returns:
+            - (Optional[Dict[str, any]]): Job status, if the job exists.
+        """
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        status = self.store.get(job_id)
+        return self.store.fail_orphaned(status) if status is not None else None
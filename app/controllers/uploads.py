@@ -0,0 +1,441 @@
+"""
+Resumable chunked CSV uploads.
+
+An upload session is created for a "time-report-{id}.csv" file, which is then sent as numbered chunks, each with its
+SHA-256 checksum, and committed at the end. Chunks are spooled to a directory of their own under
+`Config.Ingest.SPOOL_DIRECTORY`, so a failed transfer is resumed by resending the missing chunks only.
+
+Every time a chunk extends the contiguous run received so far, its complete lines are parsed and staged, so parsing
+overlaps with the transfer and the commit is left with the database writes only. A line split across chunks is kept
+until the next chunk arrives.
+"""
+import csv
+import datetime
+import fcntl
+import glob
+import hashlib
+import io
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+from contextlib import contextmanager
+from flask import Flask
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from werkzeug.datastructures import FileStorage
+
+from app.config import Config
+from app.controllers.employees import (
+    EmployeeController, EmployeeControllerException, InvalidRowsException, RowError, RowValidator, WorkUnitRow,
+)
+from app.database import DATABASE
+from app.metrics import record_ingest
+from app.models.employees import Employee
+
+
+UPLOAD_ID_PATTERN = re.compile('[0-9a-f]{32}')
+SHA256_PATTERN = re.compile('[0-9a-f]{64}')
+
+
+class UploadStatus:
+    OPEN = 'open'
+    COMMITTED = 'committed'
+    FAILED = 'failed'
+
+
+class UploadConflictException(EmployeeControllerException):
+    """ Exception class used to identify requests conflicting with the current state of an upload """
+    pass
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+
+class UploadController(object):
+    """
+    Controller to create, fill and commit chunked upload sessions.
+    """
+    def __init__(self, app: Flask, directory: Optional[str] = None):
+        """
+        Class constructor.
+
+        Args:
+            - app (Flask): Application the commits run in;
+            - directory (Optional[str]): Directory of the upload sessions.
+                                         Defaults to "uploads" under `Config.Ingest.SPOOL_DIRECTORY`.
+        """
+        self.app = app
+        self.directory = directory or os.path.join(Config.Ingest.SPOOL_DIRECTORY, 'uploads')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, upload_id: str, name: str) -> str:
+        return os.path.join(self.directory, upload_id, name)
+
+    @contextmanager
+    def _lock(self, upload_id: str) -> Iterator[None]:
+        with open(self._path(upload_id, 'lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self, status: Dict[str, any]):
+        """
+        Atomically writes the status of an upload.
+
+        Args:
+            - status (Dict[str, any]): Upload status, identified by its "uploadId".
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self._path(status['uploadId'], ''), suffix='.tmp')
+        with os.fdopen(fd, 'w') as status_file:
+            json.dump(status, status_file)
+        os.replace(tmp_path, self._path(status['uploadId'], 'upload.json'))
+
+    def _purge(self, max_age: int):
+        """
+        Removes the upload sessions last updated more than `max_age` seconds ago.
+
+        Args:
+            - max_age (int): Maximum age, in seconds.
+        """
+        limit = time.time() - max_age
+        for path in glob.glob(os.path.join(self.directory, '*', 'upload.json')):
+            try:
+                if os.path.getmtime(path) < limit:
+                    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            except FileNotFoundError:
+                pass  # Already purged by another worker
+
+    def get_status(self, upload_id: str) -> Optional[Dict[str, any]]:
+        """
+        Reads the status of an upload.
+
+        Args:
+            - upload_id (str): Id of the upload.
+
+        Returns:
+            - (Optional[Dict[str, any]]): Upload status, if the upload exists.
+        """
+        if not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+            return None
+        try:
+            with open(self._path(upload_id, 'upload.json')) as status_file:
+                return json.load(status_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def create(self, filename: str) -> Dict[str, any]:
+        """
+        Creates an upload session for a time report.
+
+        Raises:
+            - EmployeeControllerException:
+                - IF unable to extract the report id from the filename;
+                - IF the report file has already been processed.
+
+        Args:
+            - filename (str): Name of the file being uploaded, i.e. "time-report-{id}.csv".
+
+        Returns:
+            - (Dict[str, any]): Status of the new upload.
+        """
+        report_id = EmployeeController(db_session=DATABASE.session).resolve_new_report_id(
+            FileStorage(filename=filename)
+        )
+        self._purge(Config.Ingest.JOB_TTL)
+
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._path(upload_id, ''))
+        status = {
+            'uploadId': upload_id,
+            'status': UploadStatus.OPEN,
+            'filename': filename,
+            'reportId': report_id,
+            'chunks': {},
+            'parsedChunks': 0,
+            'headerSkipped': False,
+            'linesParsed': 0,
+            'rowsParsed': 0,
+            'jobGroups': {},
+            'employeeLines': {},
+            'months': [],
+            'errors': [],
+            'createdAt': _now(),
+            'committedAt': None,
+        }
+        self._save(status)
+        return status
+
+    def _get_open_status(self, upload_id: str) -> Dict[str, any]:
+        """
+        Reads the status of an upload that can still receive chunks.
+
+        Raises:
+            - UploadConflictException: IF the upload was already committed, or failed.
+
+        Args:
+            - upload_id (str): Id of an existing upload.
+
+        Returns:
+            - (Dict[str, any]): Upload status.
+        """
+        status = self.get_status(upload_id)
+        if status['status'] != UploadStatus.OPEN:
+            raise UploadConflictException(f'Upload already {status["status"]}')
+        return status
+
+    def put_chunk(self, upload_id: str, index: int, stream: BinaryIO, checksum: str) -> Dict[str, any]:
+        """
+        Stores a chunk of an upload, and parses the chunks it makes contiguous. Resending a chunk with the same
+        checksum is a no-op, so chunks can be retried safely.
+
+        Raises:
+            - EmployeeControllerException:
+                - IF the checksum is missing, or does not match the content;
+                - IF the chunk is larger than `Config.Ingest.UPLOAD_CHUNK_MAX_SIZE`;
+                - IF any of the rows parsed is invalid, in which case the upload fails.
+            - UploadConflictException:
+                - IF the upload was already committed, or failed;
+                - IF a chunk with a different checksum was already parsed at this index.
+
+        Args:
+            - upload_id (str): Id of an existing upload;
+            - index (int): Position of the chunk, starting at 0;
+            - stream (BinaryIO): Content of the chunk;
+            - checksum (str): Hex SHA-256 digest of the content.
+
+        Returns:
+            - (Dict[str, any]): Upload status.
+        """
+        checksum = (checksum or '').lower()
+        if not SHA256_PATTERN.fullmatch(checksum):
+            raise EmployeeControllerException('Please inform the SHA-256 checksum of the chunk')
+        chunk = self._get_open_status(upload_id)['chunks'].get(str(index))
+        if chunk and chunk['sha256'] == checksum:
+            return self.get_status(upload_id)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._path(upload_id, ''), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as part_file:
+                for data in iter(lambda: stream.read(Config.Ingest.CHUNK_SIZE), b''):
+                    size += len(data)
+                    if size > Config.Ingest.UPLOAD_CHUNK_MAX_SIZE:
+                        raise EmployeeControllerException(
+                            f'Chunks cannot be larger than {Config.Ingest.UPLOAD_CHUNK_MAX_SIZE} bytes'
+                        )
+                    digest.update(data)
+                    part_file.write(data)
+            if digest.hexdigest() != checksum:
+                raise EmployeeControllerException('Checksum mismatch, please resend the chunk')
+
+            with self._lock(upload_id):
+                status = self._get_open_status(upload_id)
+                if index < status['parsedChunks'] and status['chunks'][str(index)]['sha256'] != checksum:
+                    raise UploadConflictException(f'Chunk {index} was already received with a different checksum')
+                os.replace(tmp_path, self._path(upload_id, f'{index}.part'))
+                status['chunks'][str(index)] = {'size': size, 'sha256': checksum}
+                self._parse_contiguous_chunks(status)
+                return status
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _parse_lines(self, status: Dict[str, any], content: bytes) -> List[WorkUnitRow]:
+        """
+        Parses and validates complete CSV lines of an upload, skipping the header. Job groups are checked against the
+        rows of the previous chunks of the file (stored employees are only checked on commit), and the months of the
+        rows are added to the ones seen so far.
+
+        Raises:
+            - EmployeeControllerException: IF the content is not valid UTF-8;
+            - InvalidRowsException: IF any of the rows is invalid.
+
+        Args:
+            - status (Dict[str, any]): Upload status. Its counts, job groups, employee lines and months are updated in
+                                       place;
+            - content (bytes): Whole lines of the file.
+
+        Returns:
+            - (List[WorkUnitRow]): Parsed work units.
+        """
+        try:
+            lines = content.decode('UTF-8').splitlines(keepends=True)
+        except UnicodeDecodeError:
+            raise EmployeeControllerException(f'Invalid UTF-8 content after row {status["rowsParsed"]}')
+
+        if lines and not status['headerSkipped']:
+            lines.pop(0)  # Get rid of the header row
+            status['headerSkipped'] = True
+            status['linesParsed'] += 1
+
+        validator = RowValidator({int(employee_id): group for employee_id, group in status['jobGroups'].items()})
+        csv_reader = csv.reader(lines)
+        rows = []
+        employee_lines = {}
+        for row in csv_reader:
+            if not row:
+                continue  # Blank lines are ignored
+            line = status['linesParsed'] + csv_reader.line_num
+            work_unit = validator.validate(line, row)
+            if work_unit:
+                rows.append(work_unit)
+                employee_lines.setdefault(str(work_unit.employee_id), line)
+        validator.check()
+        status['employeeLines'] = {**employee_lines, **status['employeeLines']}
+        status['linesParsed'] += csv_reader.line_num
+        status['rowsParsed'] += len(rows)
+        status['jobGroups'] = {str(employee_id): group for employee_id, group in validator.employee_groups.items()}
+        status['months'] = sorted(set(status['months']) | {f'{month:%Y-%m-%d}' for month in validator.months})
+        return rows
+
+    def _stage_rows(self, status: Dict[str, any], name: str, content: bytes):
+        """
+        Parses lines of an upload and stores the work units for the commit, failing the upload on invalid rows.
+
+        Raises:
+            - EmployeeControllerException: IF any of the rows is invalid.
+
+        Args:
+            - status (Dict[str, any]): Upload status. Saved after the rows are staged;
+            - name (str): Name of the staged rows file;
+            - content (bytes): Whole lines of the file.
+        """
+        try:
+            rows = self._parse_lines(status, content)
+        except InvalidRowsException as err:
+            status.update(status=UploadStatus.FAILED, errors=[str(error) for error in err.errors])
+            self._save(status)
+            raise
+        except EmployeeControllerException as err:
+            status.update(status=UploadStatus.FAILED, errors=[str(err)])
+            self._save(status)
+            raise
+        with open(self._path(status['uploadId'], name), 'wb') as rows_file:
+            pickle.dump(rows, rows_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _parse_contiguous_chunks(self, status: Dict[str, any]):
+        """
+        Parses the chunks following the last parsed one, up to the first missing chunk. The trailing partial line
+        of each chunk is kept in a "pending" file, and completed by the next chunk.
+
+        Args:
+            - status (Dict[str, any]): Upload status, updated and saved in place.
+        """
+        upload_id = status['uploadId']
+        pending_path = self._path(upload_id, 'pending')
+        while str(status['parsedChunks']) in status['chunks']:
+            index = status['parsedChunks']
+            content = b''
+            if os.path.exists(pending_path):
+                with open(pending_path, 'rb') as pending_file:
+                    content = pending_file.read()
+            with open(self._path(upload_id, f'{index}.part'), 'rb') as part_file:
+                content += part_file.read()
+
+            end = content.rfind(b'\n') + 1
+            self._stage_rows(status, f'{index}.rows', content[:end])
+            with open(pending_path, 'wb') as pending_file:
+                pending_file.write(content[end:])
+            os.remove(self._path(upload_id, f'{index}.part'))
+            status['parsedChunks'] += 1
+        self._save(status)
+
+    def _iter_staged_rows(self, upload_id: str, chunks: int) -> Iterator[WorkUnitRow]:
+        for name in [f'{index}.rows' for index in range(chunks)] + ['pending.rows']:
+            with open(self._path(upload_id, name), 'rb') as rows_file:
+                yield from pickle.load(rows_file)
+
+    def _check_stored_groups(self, status: Dict[str, any], chunks: int):
+        """
+        Checks the job groups of an upload against the stored employees, failing the upload when any of them conflicts.
+        Chunks are only validated against each other, and employees may be stored until the commit anyway.
+
+        Raises:
+            - InvalidRowsException: IF any of the employees is stored with another job group, detailing the first line
+                                    of each one.
+
+        Args:
+            - status (Dict[str, any]): Upload status, with the staged rows of every chunk;
+            - chunks (int): Total amount of chunks the file was split into.
+        """
+        stored_groups = dict(DATABASE.session.query(Employee.id, Employee.job_group))
+        conflicts = {
+            int(employee_id): job_group
+            for employee_id, job_group in status['jobGroups'].items()
+            if stored_groups.get(int(employee_id), job_group) != job_group
+        }
+        if not conflicts:
+            return
+
+        errors = sorted(
+            RowError(status['employeeLines'][str(employee_id)], 'job group', job_group,
+                     f'Employee {employee_id} belongs to job group {stored_groups[employee_id]}')
+            for employee_id, job_group in conflicts.items()
+        )
+        invalid_rows = sum(
+            1 for row in self._iter_staged_rows(status['uploadId'], chunks) if row.employee_id in conflicts
+        )
+        err = InvalidRowsException(errors[:Config.Ingest.MAX_REPORTED_ERRORS], invalid_rows)
+        status.update(status=UploadStatus.FAILED, errors=[str(error) for error in err.errors])
+        self._save(status)
+        raise err
+
+    def commit(self, upload_id: str, chunks: int) -> Dict[str, any]:
+        """
+        Writes the staged rows of an upload into the database, in a single transaction.
+
+        Raises:
+            - EmployeeControllerException:
+                - IF any of the chunks is missing;
+                - IF the last line of the file is invalid;
+                - IF the report file has already been processed.
+            - InvalidRowsException: IF any of the employees is stored with another job group, in which case the upload
+                                    fails.
+            - UploadConflictException: IF the upload was already committed, or failed.
+
+        Args:
+            - upload_id (str): Id of an existing upload;
+            - chunks (int): Total amount of chunks the file was split into.
+
+        Returns:
+            - (Dict[str, any]): Upload status.
+        """
+        with self._lock(upload_id):
+            status = self._get_open_status(upload_id)
+            received = {int(index) for index in status['chunks']}
+            missing = sorted(set(range(chunks)) - received)
+            if missing or received - set(range(chunks)):
+                raise EmployeeControllerException(f'Expected chunks 0 to {chunks - 1}, missing: {missing}')
+
+            started = time.monotonic()
+            # The last line of the file may not end with a newline
+            if not os.path.exists(self._path(upload_id, 'pending.rows')):
+                pending_path = self._path(upload_id, 'pending')
+                with open(pending_path, 'rb') if os.path.exists(pending_path) else io.BytesIO() as pending_file:
+                    self._stage_rows(status, 'pending.rows', pending_file.read())
+
+            with self.app.app_context():
+                controller = EmployeeController(db_session=DATABASE.session)
+                controller.resolve_new_report_id(FileStorage(filename=status['filename']))
+                self._check_stored_groups(status, chunks)
+                months = [datetime.datetime.strptime(month, '%Y-%m-%d').date() for month in status['months']]
+                employee_groups = {int(employee_id): group for employee_id, group in status['jobGroups'].items()}
+                rows = controller.process_rows(status['reportId'], self._iter_staged_rows(upload_id, chunks),
+                                               months=months, employee_groups=employee_groups)
+
+            status.update(status=UploadStatus.COMMITTED, committedAt=_now())
+            self._save(status)
+            for path in glob.glob(self._path(upload_id, '*.rows')):
+                os.remove(path)
+            record_ingest(rows, sum(chunk['size'] for chunk in status['chunks'].values()),
+                          time.monotonic() - started)
+            return status
@@ -1,23 +1,96 @@
 """
 Database setup.
 """
+import random
+import threading
+import time
+import weakref
+
 from flask import current_app, Flask, g
 from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, inspect, select, Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connectable
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import Insert
+from sqlalchemy.pool import QueuePool
+from structlog import get_logger
+from typing import Callable, Dict, List, Optional
 
 from app.config import Config
 
 
 DATABASE = SQLAlchemy()
 
+# Applications set up in the current process, so their engines can be disposed after a fork
+_APPS = weakref.WeakSet()
+
+
+class PoolStats(object):
+    """
+    Accumulates how long connection checkouts waited for a pooled connection, in the current process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        """
+        Records a checkout.
+
+        Args:
+            - wait (float): Seconds spent waiting for the connection;
+            - timed_out (bool): Whether the checkout gave up after `Config.Database.POOL_TIMEOUT`.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def to_dict(self) -> Dict[str, any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'waitSecondsTotal': round(self.wait_total, 6),
+                'waitSecondsMax': round(self.wait_max, 6),
+            }
+
+
+POOL_STATS = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool recording the checkout wait time into POOL_STATS.
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_STATS.record(time.perf_counter() - started, timed_out=True)
+            raise
+        POOL_STATS.record(time.perf_counter() - started)
+        return connection
+
 
 def get_db_uri():
     """
-    Resolves the database connection string.
+    Resolves the database connection string. `Config.Database.URI`, when set, takes precedence.
 
     Returns:
         - (str): Connection string.
     """
+    if Config.Database.URI:
+        return Config.Database.URI
+
     if Config.DEBUG:
         return f'sqlite:///../{Config.ENVIRONMENT}.db'
 
@@ -25,6 +98,157 @@ def get_db_uri():
     return f'postgresql://{dbc.USER}:{dbc.PASS}@{dbc.HOST}:{dbc.PORT}/{dbc.NAME}'
 
 
+def is_partitioning_enabled() -> bool:
+    """
+    Tells whether the work units are stored in a table range-partitioned by month.
+    Only applies to PostgreSQL: SQLite keeps a single table regardless of `Config.Database.PARTITIONING`.
+
+    Returns:
+        - (bool): True when partitioning is enabled.
+    """
+    return Config.Database.PARTITIONING and get_db_uri().startswith('postgresql')
+
+
+# INSERT constructs supporting `ON CONFLICT` clauses, by dialect
+_DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def get_dialect_insert(bind: Connectable) -> Callable[[Table], Insert]:
+    """
+    Resolves the INSERT construct of the database a connection points to, whose `on_conflict_do_nothing` and
+    `on_conflict_do_update` let concurrent writers insert the same rows without failing on unique constraints.
+
+    Args:
+        - bind (Connectable): Engine or connection to resolve the dialect from.
+
+    Returns:
+        - (Callable[[Table], Insert]): `insert` function of the dialect.
+    """
+    return _DIALECT_INSERTS[bind.dialect.name]
+
+
+def get_engine_options(db_uri: str) -> Dict[str, any]:
+    """
+    Resolves the engine options from `Config.Database`.
+    Pool sizing only applies to server databases; file-based SQLite keeps Flask-SQLAlchemy's NullPool.
+
+    Args:
+        - db_uri (str): Connection string.
+
+    Returns:
+        - (Dict[str, any]): Keyword arguments for `sqlalchemy.create_engine`.
+    """
+    dbc = Config.Database
+    options = {
+        'pool_pre_ping': dbc.POOL_PRE_PING,
+        'pool_recycle': dbc.POOL_RECYCLE,
+    }
+    if not db_uri.startswith('sqlite'):
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=dbc.POOL_SIZE,
+            max_overflow=dbc.MAX_OVERFLOW,
+            pool_timeout=dbc.POOL_TIMEOUT,
+        )
+    return options
+
+
+def get_pool_status() -> Dict[str, any]:
+    """
+    Describes the connection pool of the current application, in the current process.
+
+    Returns:
+        - (Dict[str, any]): Pool occupancy and checkout wait times.
+    """
+    pool = DATABASE.engine.pool
+    status = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checkedOut=pool.checkedout(), overflow=pool.overflow())
+    status.update(POOL_STATS.to_dict())
+    return status
+
+
+def dispose_engines():
+    """
+    Drops the pooled connections inherited from a parent process, without closing them for the parent.
+    Meant to be called right after a fork (i.e. gunicorn's `post_fork`).
+    """
+    for app in list(_APPS):
+        with app.app_context():
+            DATABASE.engine.dispose(close=False)
+        for engine in app.extensions.get('db_replicas', []):
+            engine.dispose(close=False)
+
+
+def get_replica_session() -> Optional[Session]:
+    """
+    Returns a session bound to one of the replicas in `Config.Database.REPLICA_URIS`, picked at random and kept for
+    the rest of the application context. Replicas may lag behind the primary, so callers are expected to check the
+    data they need is there before relying on it.
+
+    Returns:
+        - (Optional[Session]): Replica session, or None when no replica is configured.
+    """
+    engines = current_app.extensions.get('db_replicas')
+    if not engines:
+        return None
+    if 'db_replica_session' not in g:
+        g.db_replica_session = Session(bind=random.choice(engines))
+    return g.db_replica_session
+
+
+def _close_replica_session(_):
+    """ Closes the replica session opened in the application context, if any """
+    session = g.pop('db_replica_session', None)
+    if session is not None:
+        session.close()
+
+
+def get_missing_tables() -> List[str]:
+    """
+    Lists the tables of the models that do not exist in the database of the current application.
+
+    Returns:
+        - (List[str]): Names of the missing tables, in creation order.
+    """
+    existing = set(inspect(DATABASE.engine).get_table_names())
+    return [table.name for table in DATABASE.metadata.sorted_tables if table.name not in existing]
+
+
+def create_schema() -> List[str]:
+    """
+    Creates the tables of the models missing from the database of the current application. Reports ingested before the
+    ingest sequence was added are sequenced in id order. The payroll period totals are then recomputed from the work
+    units unless they follow the current pay schedule, so the totals report engine is complete and consistent from the
+    start: when their table is added to an existing database, when they predate the record of their schedule, or when
+    the schedule changed.
+
+    Returns:
+        - (List[str]): Names of the tables created, in creation order.
+    """
+    # Imported here, as the models and controllers depend on this module
+    from app.controllers.employees import EmployeeController
+    from app.models.employees import EmployeeWorkReport, EmployeeWorkReportIngest, PayrollPeriodTotal
+
+    missing = get_missing_tables()
+    if missing:
+        DATABASE.create_all()
+    if EmployeeWorkReportIngest.__tablename__ in missing and EmployeeWorkReport.__tablename__ not in missing:
+        # Reports ingested before the sequence existed are sequenced in id order
+        DATABASE.session.execute(EmployeeWorkReportIngest.__table__.insert().from_select(
+            ['report_id'], select(EmployeeWorkReport.id).order_by(EmployeeWorkReport.id),
+        ))
+        DATABASE.session.commit()
+    controller = EmployeeController(db_session=DATABASE.session)
+    if PayrollPeriodTotal.__tablename__ in missing or not controller.are_period_totals_current():
+        get_logger(__name__).info('Recomputing the payroll period totals for the current pay schedule')
+        controller.rebuild_period_totals()
+    return missing
+
+
 def add_db_to_app_context():
     """
     Sets the database to the application context g.
@@ -41,11 +265,18 @@ def database_setup(app: Flask):
     """
     app.config['SQLALCHEMY_DATABASE_URI'] = get_db_uri()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     DATABASE.init_app(app)
-    with app.app_context():
-        # Putting this block into a try/catch to avoid using alembic to perform DB migrations for now
-        try:
-            DATABASE.create_all()
-        except Exception:
-            pass
+    app.extensions['db_replicas'] = [
+        create_engine(uri, **get_engine_options(uri)) for uri in Config.Database.REPLICA_URIS
+    ]
+    app.teardown_appcontext(_close_replica_session)
+    _APPS.add(app)
+    if Config.Database.CREATE_SCHEMA:
+        with app.app_context():
+            # Without migrations (i.e. alembic) for now, a database that cannot be reached must not prevent the boot
+            try:
+                create_schema()
+            except SQLAlchemyError:
+                get_logger(__name__).warning('Could not create the database schema', exc_info=True)
     app.before_request(add_db_to_app_context)
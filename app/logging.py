@@ -1,26 +1,46 @@
 """
 Application logger configuration.
+
+With `Config.LOG_QUEUE` set (the default in production), log records are only enqueued by the thread serving the
+request, and formatted/written by a background listener thread.
 """
+import atexit
 import json
+import queue
+import random
 import structlog
 import logging
 import logging.config
+import logging.handlers
+import time
 
-from flask import Flask, request
+from flask import Flask, g, request, Response
+from typing import NamedTuple, Optional
 
 from app.config import Config
+from app.constants import config as config_constants
+
+
+class RequestInfo(NamedTuple):
+    """
+    Request details attached to a log record. Only these few fields are copied (no headers, nor a reference to the
+    request itself), so records handled later by the log listener thread do not keep the request alive.
+    """
+    remote_ip: Optional[str]
+    method: str
+    path: str
+    elapsed: Optional[float]
 
 
 class RequestContext(logging.Filter):
     """ Enhances log messages with contextual information """
     def filter(self, record):
         try:
-            record.request = {
-                'remote_ip': request.remote_addr,
-                'method': request.method,
-                'path': request.path,
-                'headers': dict(request.headers),
-            }
+            started = g.get('log_started')
+            record.request = RequestInfo(
+                request.remote_addr, request.method, request.path,
+                round(time.perf_counter() - started, 6) if started is not None else None,
+            )
         except RuntimeError:
             pass
         return True
@@ -29,8 +49,62 @@ class RequestContext(logging.Filter):
 class HealthFilter(logging.Filter):
     """ Health route filter """
     def filter(self, record):
-        request = getattr(record, 'request', None)
-        return '/health' not in request.get('path') if request else True
+        request_info = getattr(record, 'request', None)
+        return '/health' not in request_info.path if request_info else True
+
+
+class StructlogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records untouched, so structlog event dicts are rendered by the listener thread rather than the caller.
+    """
+    def prepare(self, record):
+        return record
+
+
+_LISTENER = None
+
+
+def _start_listener(handlers):
+    """
+    Routes the records of the configured loggers through a queue, consumed by a background listener.
+
+    Args:
+        - handlers (List[logging.Handler]): Handlers the listener writes the records to.
+    """
+    global _LISTENER
+    _stop_listener()
+
+    log_queue = queue.Queue(-1)
+    queue_handler = StructlogQueueHandler(log_queue)
+    # Records below the level would be dropped by the handlers anyway, so they are neither enriched nor queued
+    queue_handler.setLevel(Config.LOG_LEVEL)
+    queue_handler.addFilter(RequestContext())
+    for name in ('', 'werkzeug'):
+        logging.getLogger(name).handlers = [queue_handler]
+
+    _LISTENER = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _LISTENER.start()
+
+
+def restart_log_listener():
+    """
+    Starts a new listener in a forked process (i.e. gunicorn's `post_fork` with `preload_app`), as the listener thread
+    of the parent process does not exist in its children.
+    """
+    global _LISTENER
+    if _LISTENER is not None:
+        handlers = _LISTENER.handlers
+        _LISTENER = None
+        _start_listener(handlers)
+
+
+@atexit.register
+def _stop_listener():
+    """ Flushes the records still in the queue and stops the listener """
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
 
 
 def configure_logging():
@@ -45,14 +119,19 @@ def configure_logging():
         structlog.stdlib.add_log_level,
         timestamper,
     ]
-    filters = ['request_context', 'health_filter']
+    if Config.LOG_FORMAT == config_constants.LogFormats.JSON:
+        renderer = structlog.processors.JSONRenderer(default=str)
+    else:
+        renderer = structlog.dev.ConsoleRenderer(colors=True)
+    # When queued, the request context is captured by the queue handler instead
+    filters = ['health_filter'] if Config.LOG_QUEUE else ['request_context', 'health_filter']
     config = {
         'version': 1,
         'disable_existing_loggers': False,
         'formatters': {
             'standard': {
                 '()': structlog.stdlib.ProcessorFormatter,
-                'processor': structlog.dev.ConsoleRenderer(colors=True),
+                'processor': renderer,
                 'foreign_pre_chain': pre_chain,
             },
         },
@@ -86,6 +165,8 @@ def configure_logging():
         },
     }
     logging.config.dictConfig(config)
+    if Config.LOG_QUEUE:
+        _start_listener(logging.getLogger().handlers)
     structlog.configure(
         processors=[
             structlog.stdlib.add_log_level,
@@ -100,21 +181,47 @@ def configure_logging():
     )
 
 
+def get_loggable_body(response: Response) -> any:
+    """
+    Resolves what to log of a response body.
+    JSON bodies are only read when no larger than `Config.LOG_BODY_MAX_SIZE`, and only for a
+    `Config.LOG_BODY_SAMPLE_RATE` share of the responses.
+
+    Args:
+        - response (Response): Response to be logged.
+
+    Returns:
+        - (any): Parsed JSON body, or a placeholder string describing why it was skipped.
+    """
+    if response.is_streamed:
+        return '<streamed>'  # Reading the body here would buffer the whole stream
+    if response.headers.get('Content-Type') != 'application/json' or response.content_encoding:
+        return '<not printable>'
+
+    size = response.calculate_content_length()
+    if size is None or size > Config.LOG_BODY_MAX_SIZE:
+        return f'<{size} bytes>'
+    if Config.LOG_BODY_SAMPLE_RATE < 1 and random.random() >= Config.LOG_BODY_SAMPLE_RATE:
+        return '<not sampled>'
+
+    try:
+        data = response.get_data().decode('utf-8')
+    except UnicodeDecodeError:
+        return '<not printable>'
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        return data
+
+
 def logging_setup(app: Flask):
     configure_logging()
 
+    @app.before_request
+    def start_request_timer():
+        g.log_started = time.perf_counter()
+
     @app.after_request
     def log_access(response):
-        data = '<not printable>'
-        if response.headers.get('Content-Type') == 'application/json':
-            try:
-                data = response.get_data().decode('utf-8')
-            except UnicodeDecodeError:
-                pass
-
-        try:
-            log_message = json.loads(data)
-        except json.JSONDecodeError:
-            log_message = data
-        structlog.get_logger('access').info('RESPONSE', status=response.status_code, data=log_message)
+        structlog.get_logger('access').info('RESPONSE', status=response.status_code, data=get_loggable_body(response))
         return response
@@ -0,0 +1,191 @@
+"""
+Prometheus metrics.
+
+Metrics are kept in prometheus_client's multiprocess mode: every process writes its values into memory-mapped files
+in `Config.Metrics.DIRECTORY`, which are aggregated when `/metrics` is scraped, so any gunicorn worker reports the
+totals of all of them. Nothing is set up (prometheus_client is not even imported) when `Config.Metrics.ENABLED` is off.
+"""
+import os
+import shutil
+import time
+
+from flask import Flask, g, has_request_context, request, Response
+from sqlalchemy import event
+
+from app.config import Config
+from app.database import DATABASE
+
+
+class Metrics(object):
+    """
+    Metrics of the application. Only created through `get_metrics`.
+    """
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Time spent building the response, per route',
+            ['method', 'route', 'status'],
+        )
+        self.requests_in_flight = Gauge(
+            'http_requests_in_flight', 'Requests being served, per route',
+            ['method', 'route'], multiprocess_mode='livesum',
+        )
+        self.request_db_queries = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request, per route',
+            ['route'], buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000),
+        )
+        self.request_db_duration = Histogram(
+            'http_request_db_duration_seconds', 'Time spent executing SQL statements per request, per route',
+            ['route'],
+        )
+        self.db_query_duration = Histogram('db_query_duration_seconds', 'Time spent executing each SQL statement')
+        self.ingest_rows = Counter('ingest_rows', 'CSV rows ingested')
+        self.ingest_bytes = Counter('ingest_bytes', 'CSV bytes ingested')
+        self.ingest_rows_per_second = Histogram(
+            'ingest_rows_per_second', 'Throughput of each CSV ingest',
+            buckets=(100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 1000000),
+        )
+
+
+_METRICS = None
+
+
+def get_metrics() -> Metrics:
+    """
+    Returns the metrics of the current process, created on first use. The multiprocess mode is picked when
+    prometheus_client is imported, so its directory is set (and created) right before.
+
+    Returns:
+        - (Metrics): Application metrics.
+    """
+    global _METRICS
+    if _METRICS is None:
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', Config.Metrics.DIRECTORY)
+        os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+        _METRICS = Metrics()
+    return _METRICS
+
+
+def clear_metrics_directory():
+    """
+    Removes the values written by previous processes. Meant to be called once, before any worker starts
+    (i.e. gunicorn's `on_starting`).
+    """
+    if not Config.Metrics.ENABLED:
+        return
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR', Config.Metrics.DIRECTORY)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def mark_process_dead(pid: int):
+    """
+    Drops the live gauges of a process that exited (i.e. from gunicorn's `child_exit`).
+
+    Args:
+        - pid (int): Id of the process.
+    """
+    if not Config.Metrics.ENABLED:
+        return
+    get_metrics()
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(pid)
+
+
+def generate_metrics() -> bytes:
+    """
+    Aggregates the metrics of every process.
+
+    Returns:
+        - (bytes): Metrics in the Prometheus text format.
+    """
+    get_metrics()
+    from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def record_ingest(rows: int, size: int, elapsed: float):
+    """
+    Records a CSV ingest.
+
+    Args:
+        - rows (int): Amount of rows ingested;
+        - size (int): Size of the file, in bytes;
+        - elapsed (float): Seconds spent in the ingest.
+    """
+    if not Config.Metrics.ENABLED:
+        return
+    metrics = get_metrics()
+    metrics.ingest_rows.inc(rows)
+    metrics.ingest_bytes.inc(size)
+    if elapsed > 0:
+        metrics.ingest_rows_per_second.observe(rows / elapsed)
+
+
+def _get_route() -> str:
+    return request.url_rule.rule if request.url_rule else '<unmatched>'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    get_metrics().db_query_duration.observe(elapsed)
+    if has_request_context() and 'metrics_db' in g:
+        g.metrics_db[0] += 1
+        g.metrics_db[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def metrics_setup(app: Flask):
+    """
+    Instruments the requests and database statements of the application.
+
+    Args:
+        - app (Flask): Current application instance.
+    """
+    if not Config.Metrics.ENABLED:
+        return
+
+    metrics = get_metrics()
+    with app.app_context():
+        engine = DATABASE.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_db = [0, 0.0]
+        g.metrics_status = 500
+        metrics.requests_in_flight.labels(request.method, _get_route()).inc()
+
+    @app.after_request
+    def set_request_metrics_status(response: Response) -> Response:
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(_):
+        if 'metrics_started' not in g:
+            return
+        route = _get_route()
+        metrics.requests_in_flight.labels(request.method, route).dec()
+        metrics.request_latency.labels(request.method, route, g.metrics_status).observe(
+            time.perf_counter() - g.metrics_started
+        )
+        queries, duration = g.metrics_db
+        metrics.request_db_queries.labels(route).observe(queries)
+        metrics.request_db_duration.labels(route).observe(duration)
@@ -1,10 +1,10 @@
 """
 Employee-related models.
 """
-from sqlalchemy import Column, Float, ForeignKey, Integer, String, Date
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String, Date
 from sqlalchemy.orm import relationship
 
-from app.database import DATABASE
+from app.database import DATABASE, is_partitioning_enabled
 
 
 class Employee(DATABASE.Model):
@@ -26,16 +26,62 @@ class EmployeeWorkReport(DATABASE.Model):
     id = Column(Integer, primary_key=True)
 
 
+class EmployeeWorkReportIngest(DATABASE.Model):
+    """
+    Orders the reports as their ingest committed. Delta reports use the sequence as their watermark, as report ids
+    come from the file names and do not have to grow as reports are ingested.
+    """
+    __tablename__ = 'employee_work_report_ingests'
+
+    sequence = Column(Integer, primary_key=True, autoincrement=True)
+    report_id = Column(Integer, ForeignKey(EmployeeWorkReport.id), nullable=False, unique=True)
+
+
+# Partitioned tables need the partition key in their primary key
+WORK_UNITS_PARTITIONED = is_partitioning_enabled()
+
+
 class EmployeeWorkUnit(DATABASE.Model):
     """
     Represents a unit of data for a work entry for a certain employee.
+    On PostgreSQL with `Config.Database.PARTITIONING`, the table is range-partitioned by month on `date`, with
+    partitions created as new dates are ingested (see `app.models.partitions`).
     """
     __tablename__ = 'employee_work_units'
+    __table_args__ = (
+        Index('ix_employee_work_units_employee_id_date', 'employee_id', 'date'),
+        Index('ix_employee_work_units_report_id', 'report_id'),
+        {'postgresql_partition_by': 'RANGE (date)'} if WORK_UNITS_PARTITIONED else {},
+    )
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     employee_id = Column(Integer, ForeignKey(Employee.id), nullable=False)
     report_id = Column(Integer, ForeignKey(EmployeeWorkReport.id), nullable=False)
     hours_worked = Column(Float, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, primary_key=WORK_UNITS_PARTITIONED)
 
     employee = relationship(Employee, uselist=False)
+
+
+class PayrollPeriodTotal(DATABASE.Model):
+    """
+    Running amount paid to an employee in a certain pay period.
+    Maintained by the CSV ingest, so reports do not have to aggregate every work unit.
+    """
+    __tablename__ = 'payroll_period_totals'
+
+    employee_id = Column(Integer, ForeignKey(Employee.id), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    period_end = Column(Date, primary_key=True)
+    amount = Column(Float, nullable=False, default=0)
+
+
+class PayrollPeriodTotalsSchedule(DATABASE.Model):
+    """
+    Pay schedule the payroll period totals were computed with (see `PaySchedule.signature`), in a single row.
+    Totals without it predate the record, and are recomputed along with the schema.
+    """
+    __tablename__ = 'payroll_period_totals_schedule'
+
+    id = Column(Integer, primary_key=True)
+    signature = Column(String(64), nullable=False)
@@ -0,0 +1,82 @@
+"""
+Monthly range partitions of the work units table, on PostgreSQL with `Config.Database.PARTITIONING`.
+
+Partitions are created on demand, for the months of the rows an ingest has validated, before its transaction starts.
+Creating a partition takes an exclusive lock on the parent table, so it runs in a short transaction of its own,
+serialized with an advisory lock: it only waits for the ingests already writing to commit, and no ingest ever waits
+for it while holding locks on the table.
+"""
+import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connectable
+from typing import Iterable, Set, Tuple
+
+from app.models.employees import EmployeeWorkUnit, WORK_UNITS_PARTITIONED
+
+
+# Advisory lock serializing partition creation across processes
+PARTITION_LOCK_KEY = 0x77617665
+
+# First day of the months known to have a partition, in the current process
+_KNOWN_MONTHS: Set[datetime.date] = set()
+
+
+@event.listens_for(EmployeeWorkUnit.__table__, 'after_create')
+def _forget_partitions(*_, **__):
+    # A recreated table starts without partitions
+    _KNOWN_MONTHS.clear()
+
+
+def get_month_bounds(date: datetime.date) -> Tuple[datetime.date, datetime.date]:
+    """
+    Resolves the range of the partition a date belongs to.
+
+    Args:
+        - date (datetime.date): Date to be analized.
+
+    Returns:
+        - (Tuple[datetime.date, datetime.date]): First day of its month, and first day of the following month.
+    """
+    first = date.replace(day=1)
+    following = (first + datetime.timedelta(days=32)).replace(day=1)
+    return first, following
+
+
+def get_partition_ddl(month: datetime.date) -> str:
+    """
+    Builds the statement creating the partition of a month, when missing.
+
+    Args:
+        - month (datetime.date): First day of the month.
+
+    Returns:
+        - (str): CREATE TABLE statement.
+    """
+    table = EmployeeWorkUnit.__tablename__
+    first, following = get_month_bounds(month)
+    return (
+        f'CREATE TABLE IF NOT EXISTS {table}_{first:%Y_%m} PARTITION OF {table} '
+        f"FOR VALUES FROM ('{first.isoformat()}') TO ('{following.isoformat()}')"
+    )
+
+
+def ensure_work_unit_partitions(bind: Connectable, dates: Iterable[datetime.date]):
+    """
+    Creates the partitions missing for a set of dates. Does nothing when the table is not partitioned.
+
+    Args:
+        - bind (Connectable): Engine (or connection of the engine) to create the partitions with;
+        - dates (Iterable[datetime.date]): Dates about to be written.
+    """
+    if not WORK_UNITS_PARTITIONED:
+        return
+    months = {date.replace(day=1) for date in dates} - _KNOWN_MONTHS
+    if not months:
+        return
+
+    with bind.engine.begin() as connection:
+        connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': PARTITION_LOCK_KEY})
+        for month in sorted(months):
+            connection.execute(text(get_partition_ddl(month)))
+    _KNOWN_MONTHS.update(months)
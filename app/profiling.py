@@ -0,0 +1,190 @@
+"""
+Opt-in request profiling.
+
+With `Config.Profiling.ENABLED`, a request carrying the `X-Profile` header (or the `profile` query parameter) runs
+under cProfile, with every SQL statement it executes recorded alongside. The stats are written to
+`Config.Profiling.DIRECTORY`, or returned instead of the response when the value is "inline". Profiled requests must
+send the configured token in `X-Profile-Token`; only outside of production (`Config.DEBUG`) can requests be profiled
+to disk when no token is configured. Inline results always require it.
+
+When disabled, nothing is installed, so requests run exactly as they would without this module.
+"""
+import cProfile
+import datetime
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import event
+from structlog import get_logger
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import parse_qs
+
+from app.config import Config
+from app.database import DATABASE
+
+
+INLINE = 'inline'
+# Functions listed in the stats, by cumulative time
+STATS_LIMIT = 50
+
+_CAPTURE = threading.local()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_CAPTURE, 'queries', None) is not None:
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = getattr(_CAPTURE, 'queries', None)
+    started = conn.info.get('profile_started')
+    if queries is not None and started:
+        queries.append({'statement': statement, 'seconds': round(time.perf_counter() - started.pop(), 6)})
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get('profile_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+class ProfilerMiddleware(object):
+    """
+    WSGI middleware running the requests that ask for it under cProfile. The whole response is consumed inside the
+    profiler, so the time spent streaming a report is included.
+    """
+    def __init__(self, wsgi_app: Callable, directory: str, token: str, debug: bool = False):
+        """
+        Class constructor.
+
+        Args:
+            - wsgi_app (Callable): Application being profiled;
+            - directory (str): Directory the stats are written to;
+            - token (str): Token profiled requests must send. When empty, no request is profiled unless `debug` is set;
+            - debug (bool): Whether any request can be profiled to disk when no token is configured.
+        """
+        self.wsgi_app = wsgi_app
+        self.directory = directory
+        self.token = token
+        self.debug = debug
+        self.logger = get_logger(__name__)
+
+    def _get_mode(self, environ: Dict[str, any]) -> Optional[str]:
+        """
+        Resolves whether a request should be profiled.
+
+        Args:
+            - environ (Dict[str, any]): WSGI environment of the request.
+
+        Returns:
+            - (Optional[str]): "inline" or "file". None when the request should not be profiled.
+        """
+        mode = environ.get('HTTP_X_PROFILE')
+        if mode is None and 'profile' in environ.get('QUERY_STRING', ''):
+            mode = parse_qs(environ['QUERY_STRING'], keep_blank_values=True).get('profile', [None])[0]
+        if mode is None or mode.lower() in ('0', 'false'):
+            return None
+
+        authorized = bool(self.token) and hmac.compare_digest(
+            environ.get('HTTP_X_PROFILE_TOKEN', '').encode(), self.token.encode(),
+        )
+        if mode.lower() == INLINE:
+            return INLINE if authorized else None
+        return 'file' if authorized or (self.debug and not self.token) else None
+
+    def __call__(self, environ: Dict[str, any], start_response: Callable) -> Iterable[bytes]:
+        mode = self._get_mode(environ)
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+
+        response = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            response.update(status=status, headers=headers, exc_info=exc_info)
+            return lambda data: response.setdefault('written', []).append(data)
+
+        profiler = cProfile.Profile()
+        _CAPTURE.queries = queries = []
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            app_iter = self.wsgi_app(environ, capture_start_response)
+            try:
+                body = response.get('written', []) + list(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            profiler.disable()
+            _CAPTURE.queries = None
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'status': response.get('status'),
+            'seconds': round(elapsed, 6),
+            'queries': queries,
+            'stats': self._format_stats(profiler),
+        }
+        if mode == INLINE:
+            content = json.dumps(result).encode('utf-8')
+            start_response('200 OK', [('Content-Type', 'application/json'), ('Content-Length', str(len(content)))])
+            return [content]
+
+        path = self._write(profiler, result)
+        self.logger.info('Request profiled', path=path, seconds=result['seconds'], queries=len(queries))
+        start_response(response['status'], response['headers'], response['exc_info'])
+        return body
+
+    def _format_stats(self, profiler: cProfile.Profile) -> str:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(STATS_LIMIT)
+        return output.getvalue()
+
+    def _write(self, profiler: cProfile.Profile, result: Dict[str, any]) -> str:
+        """
+        Writes the stats of a request: a ".prof" file, readable by pstats/snakeviz, and a ".json" file with the SQL
+        statements and a text summary.
+
+        Args:
+            - profiler (cProfile.Profile): Profiler of the request;
+            - result (Dict[str, any]): Summary of the request.
+
+        Returns:
+            - (str): Path of the stats, without extension.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', result['path'] or '').strip('-') or 'root'
+        timestamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(self.directory, f'{timestamp}-{os.getpid()}-{result["method"]}-{slug}')
+        profiler.dump_stats(f'{path}.prof')
+        with open(f'{path}.json', 'w') as output:
+            json.dump(result, output, indent=2)
+        return path
+
+
+def profiling_setup(app: Flask):
+    """
+    Installs the profiling middleware and the SQL capture, if enabled.
+
+    Args:
+        - app (Flask): Current application instance.
+    """
+    if not Config.Profiling.ENABLED:
+        return
+
+    with app.app_context():
+        engine = DATABASE.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, Config.Profiling.DIRECTORY, Config.Profiling.TOKEN, Config.DEBUG)
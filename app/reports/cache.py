@@ -0,0 +1,178 @@
+"""
+File-based report cache, shared by every worker process running on the same host.
+
+Entries are keyed on the data version (see `EmployeeController.get_data_version`), so a new ingest naturally
+invalidates every cached report. Stale entries are evicted whenever a new entry is stored.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+
+from typing import Iterable, Iterator, Optional
+
+from app.config import Config
+
+
+class ReportCache(object):
+    """
+    Stores serialized reports as files in a directory.
+    """
+    SUFFIX = '.json'
+
+    def __init__(self, directory: str, max_entries: int):
+        """
+        Class constructor.
+
+        Args:
+            - directory (str): Directory where the entries are stored. Created when missing;
+            - max_entries (int): Maximum amount of entries kept for the current data version.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_etag(version: str, key: str) -> str:
+        """
+        Builds the entity tag of a report.
+
+        Args:
+            - version (str): Data version the report was generated from;
+            - key (str): Identifies the report variant (engine, query arguments, etc).
+
+        Returns:
+            - (str): Entity tag.
+        """
+        return hashlib.sha1(f'{version}:{key}'.encode('UTF-8')).hexdigest()
+
+    def _path(self, version: str, etag: str) -> str:
+        return os.path.join(self.directory, f'{version}-{etag}{self.SUFFIX}')
+
+    def get(self, version: str, etag: str) -> Optional[bytes]:
+        """
+        Reads an entry.
+
+        Args:
+            - version (str): Data version of the entry;
+            - etag (str): Entity tag of the entry.
+
+        Returns:
+            - (Optional[bytes]): Cached content, if present.
+        """
+        try:
+            with open(self._path(version, etag), 'rb') as entry:
+                return entry.read()
+        except FileNotFoundError:
+            return None
+
+    def iter_content(self, version: str, etag: str, chunk_size: int = 64 * 1024) -> Optional[Iterator[bytes]]:
+        """
+        Reads an entry in chunks.
+
+        Args:
+            - version (str): Data version of the entry;
+            - etag (str): Entity tag of the entry;
+            - chunk_size (int): Maximum amount of bytes per chunk.
+
+        Returns:
+            - (Optional[Iterator[bytes]]): Chunks of the cached content, if present.
+        """
+        try:
+            entry = open(self._path(version, etag), 'rb')
+        except FileNotFoundError:
+            return None
+
+        def read_chunks():
+            with entry:
+                yield from iter(lambda: entry.read(chunk_size), b'')
+        return read_chunks()
+
+    def tee(self, version: str, etag: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Passes chunks through while storing them as an entry, which becomes visible once every chunk was consumed.
+        The content is written to a temporary file first, so concurrent readers never see partial content.
+
+        Args:
+            - version (str): Data version of the entry;
+            - etag (str): Entity tag of the entry;
+            - chunks (Iterable[bytes]): Content to cache.
+
+        Returns:
+            - (Iterator[bytes]): The same chunks.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    yield chunk
+        except BaseException:
+            # Includes GeneratorExit, when the client goes away before the whole content is sent
+            self._remove(tmp_path)
+            raise
+        os.replace(tmp_path, self._path(version, etag))
+        self.evict(version)
+
+    def set(self, version: str, etag: str, content: bytes):
+        """
+        Stores an entry and evicts the stale ones.
+
+        Args:
+            - version (str): Data version of the entry;
+            - etag (str): Entity tag of the entry;
+            - content (bytes): Content to cache.
+        """
+        for _ in self.tee(version, etag, [content]):
+            pass
+
+    def evict(self, version: Optional[str] = None):
+        """
+        Removes entries from other data versions and the least recently written ones above `max_entries`.
+
+        Args:
+            - version (Optional[str]): Current data version. When not informed, every entry is removed.
+        """
+        current = []
+        for path in glob.glob(os.path.join(self.directory, f'*{self.SUFFIX}')):
+            if version is not None and os.path.basename(path).startswith(f'{version}-'):
+                current.append(path)
+            else:
+                self._remove(path)
+
+        if len(current) > self.max_entries:
+            current.sort(key=self._mtime)
+            for path in current[:len(current) - self.max_entries]:
+                self._remove(path)
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Already evicted by another worker
+
+
+_REPORT_CACHE = None
+
+
+def get_report_cache() -> Optional[ReportCache]:
+    """
+    Returns the report cache of the current process, as configured in `Config.ReportCache`.
+
+    Returns:
+        - (Optional[ReportCache]): Report cache, or None when caching is disabled.
+    """
+    global _REPORT_CACHE
+    if not Config.ReportCache.ENABLED:
+        return None
+    if _REPORT_CACHE is None or _REPORT_CACHE.directory != Config.ReportCache.DIRECTORY:
+        _REPORT_CACHE = ReportCache(Config.ReportCache.DIRECTORY, Config.ReportCache.MAX_ENTRIES)
+    return _REPORT_CACHE
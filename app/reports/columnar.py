@@ -0,0 +1,265 @@
+"""
+Columnar work unit snapshot.
+
+Work units are persisted as one flat binary file per column (employee id, date ordinal, hours worked and job group
+code), plus a JSON metadata file holding the amount of committed rows. Readers memory-map the column files, so every
+worker process shares the same pages through the OS page cache instead of materializing ORM objects.
+
+Writers stage their rows in temporary files while the ingest runs, and only append them to the snapshot (under an
+exclusive file lock) once the database transaction is committed.
+"""
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.config import Config
+
+
+# NumPy dtype of each column. NumPy itself is only imported once a snapshot is read or written.
+COLUMNS = {
+    'employee_id': 'int64',
+    'date': 'int32',
+    'hours_worked': 'float64',
+    'job_group': 'uint8',
+}
+
+
+class ColumnarStore(object):
+    """
+    Memory-mapped columnar snapshot of the work units, stored in a directory.
+    """
+    META_FILENAME = 'meta.json'
+    LOCK_FILENAME = '.lock'
+
+    def __init__(self, directory: str):
+        """
+        Class constructor.
+
+        Args:
+            - directory (str): Directory holding the snapshot. Created when missing.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _column_path(self, column: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f'{column}.bin')
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        with open(os.path.join(self.directory, self.LOCK_FILENAME), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_meta(self) -> Dict[str, any]:
+        """
+        Reads the snapshot metadata.
+
+        Returns:
+            - (Dict[str, any]): Committed row count, job group table and included reports.
+        """
+        try:
+            with open(os.path.join(self.directory, self.META_FILENAME)) as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return {'count': 0, 'groups': [], 'reports': 0, 'max_report_id': 0}
+
+    def _write_meta(self, meta: Dict[str, any]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, os.path.join(self.directory, self.META_FILENAME))
+
+    @staticmethod
+    def get_version(meta: Dict[str, any]) -> str:
+        """
+        Resolves the data version the snapshot corresponds to, comparable to `EmployeeController.get_data_version`.
+
+        Args:
+            - meta (Dict[str, any]): Snapshot metadata.
+
+        Returns:
+            - (str): Data version.
+        """
+        return f'{meta["reports"]}.{meta["max_report_id"]}'
+
+    def read(self) -> Optional[Dict[str, any]]:
+        """
+        Memory-maps the committed rows of every column.
+
+        Returns:
+            - (Optional[Dict[str, any]]): Read-only column arrays, plus the "meta" of the snapshot. None when empty.
+        """
+        meta = self.read_meta()
+        if not meta['count']:
+            return None
+
+        import numpy as np
+        columns = {
+            column: np.memmap(self._column_path(column), dtype=dtype, mode='r', shape=(meta['count'],))
+            for column, dtype in COLUMNS.items()
+        }
+        columns['meta'] = meta
+        return columns
+
+    def writer(self) -> 'ColumnarWriter':
+        """
+        Creates a writer that stages rows until they are committed into the snapshot.
+
+        Returns:
+            - (ColumnarWriter): New writer.
+        """
+        return ColumnarWriter(self)
+
+    def _commit(self, staging: str, groups: List[str], count: int, report_ids: Sequence[int]):
+        """
+        Appends staged rows into the snapshot.
+
+        Args:
+            - staging (str): Directory holding the staged column files;
+            - groups (List[str]): Job groups, indexed by the staged job group codes;
+            - count (int): Amount of staged rows;
+            - report_ids (Sequence[int]): Ids of the reports the staged rows belong to.
+        """
+        import numpy as np
+        with self._lock():
+            meta = self.read_meta()
+            codes = []
+            for group in groups:
+                if group not in meta['groups']:
+                    meta['groups'].append(group)
+                codes.append(meta['groups'].index(group))
+
+            for column, dtype in COLUMNS.items():
+                with open(self._column_path(column), 'ab') as column_file:
+                    # Drops rows left behind by an interrupted commit, which were never recorded in the metadata
+                    column_file.truncate(meta['count'] * np.dtype(dtype).itemsize)
+                    if column == 'job_group' and count:
+                        staged = np.fromfile(self._column_path(column, staging), dtype=dtype)
+                        np.array(codes, dtype=dtype)[staged].tofile(column_file)
+                    else:
+                        with open(self._column_path(column, staging), 'rb') as staged_file:
+                            shutil.copyfileobj(staged_file, column_file)
+                    column_file.flush()
+                    os.fsync(column_file.fileno())
+
+            meta['count'] += count
+            meta['reports'] += len(report_ids)
+            meta['max_report_id'] = max([meta['max_report_id'], *report_ids])
+            self._write_meta(meta)
+
+    def rebuild(self, batches: Iterable[Sequence[Sequence[any]]], reports: int, max_report_id: int):
+        """
+        Replaces the whole snapshot.
+        Column files are swapped rather than truncated, so readers still mapping the previous files are unaffected.
+
+        Args:
+            - batches (Iterable[Sequence[Sequence[any]]]): Batches of (employee_id, date, hours_worked, job_group);
+            - reports (int): Amount of reports the rows come from;
+            - max_report_id (int): Greatest id of the reports the rows come from.
+        """
+        writer = self.writer()
+        try:
+            for batch in batches:
+                writer.append(batch)
+            writer.touch()
+            with self._lock():
+                for column in COLUMNS:
+                    os.replace(self._column_path(column, writer.staging), self._column_path(column))
+                self._write_meta({
+                    'count': writer.count,
+                    'groups': writer.groups,
+                    'reports': reports,
+                    'max_report_id': max_report_id,
+                })
+        finally:
+            writer.discard()
+
+
+class ColumnarWriter(object):
+    """
+    Stages work units in temporary column files, to be appended into a ColumnarStore on commit.
+    """
+    def __init__(self, store: ColumnarStore):
+        """
+        Class constructor.
+
+        Args:
+            - store (ColumnarStore): Store the rows are committed into.
+        """
+        self.store = store
+        self.staging = tempfile.mkdtemp(dir=store.directory, prefix='staging-')
+        self.groups = []
+        self.count = 0
+
+    def append(self, rows: Sequence[Sequence[any]]):
+        """
+        Stages a batch of work units.
+
+        Args:
+            - rows (Sequence[Sequence[any]]): Batch of (employee_id, date, hours_worked, job_group).
+        """
+        if not rows:
+            return
+
+        import numpy as np
+        employee_ids, dates, hours_worked, job_groups = zip(*rows)
+        codes = []
+        for group in job_groups:
+            if group not in self.groups:
+                self.groups.append(group)
+            codes.append(self.groups.index(group))
+
+        arrays = {
+            'employee_id': employee_ids,
+            'date': [date.toordinal() for date in dates],
+            'hours_worked': hours_worked,
+            'job_group': codes,
+        }
+        for column, dtype in COLUMNS.items():
+            with open(self.store._column_path(column, self.staging), 'ab') as column_file:
+                np.array(arrays[column], dtype=dtype).tofile(column_file)
+        self.count += len(rows)
+
+    def commit(self, report_ids: Sequence[int]):
+        """
+        Appends the staged rows into the store and discards the staging files.
+
+        Args:
+            - report_ids (Sequence[int]): Ids of the reports the staged rows belong to.
+        """
+        self.touch()
+        self.store._commit(self.staging, self.groups, self.count, report_ids)
+        self.discard()
+
+    def touch(self):
+        """
+        Makes sure every staged column file exists, even when no rows were appended.
+        """
+        for column in COLUMNS:
+            open(self.store._column_path(column, self.staging), 'ab').close()
+
+    def discard(self):
+        """
+        Removes the staging files.
+        """
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+
+def get_columnar_store() -> Optional[ColumnarStore]:
+    """
+    Returns the columnar store configured in `Config.Columnar`.
+
+    Returns:
+        - (Optional[ColumnarStore]): Columnar store, or None when the snapshot is disabled.
+    """
+    if not Config.Columnar.ENABLED:
+        return None
+    return ColumnarStore(Config.Columnar.DIRECTORY)
@@ -0,0 +1,420 @@
+"""
+Payroll report engines.
+
+Every engine yields `(employee_id, period_start, period_end, amount)` rows ordered by employee and period, which are
+then formatted into the report entries returned by the API. Rows are fetched `Config.Report.CHUNK_SIZE` at a time
+(using server-side cursors where supported), so entries can be streamed without loading the whole result.
+"""
+import datetime
+import itertools
+
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from sqlalchemy import and_, cast, case, false, func, or_, select, String
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.scoping import scoped_session
+from sqlalchemy.sql.elements import ColumnElement
+from structlog import get_logger
+
+from app.config import Config
+from app.constants.employees import JOB_GROUP_WAGES
+from app.models.employees import (
+    Employee, EmployeeWorkReport, EmployeeWorkReportIngest, EmployeeWorkUnit, PayrollPeriodTotal,
+)
+from app.reports.columnar import ColumnarStore
+from app.reports.pay_calendar import EPOCH_ORDINAL, get_pay_calendar, PayCalendarException
+from app.reports.query import ReportQuery
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+ReportRow = Tuple[int, datetime.date, datetime.date, float]
+
+
+class ReportEngineException(Exception):
+    """ Exception class used to identify report engine errors """
+    pass
+
+
+def format_report_entry(employee_id: int, start_date: datetime.date, end_date: datetime.date,
+                        amount: float) -> Dict[str, any]:
+    """
+    Formats an aggregated row into a report entry.
+
+    Args:
+        - employee_id (int): Id of the employee;
+        - start_date (datetime.date): First day of the pay period;
+        - end_date (datetime.date): Last day of the pay period;
+        - amount (float): Total amount paid in the period.
+
+    Returns:
+        - (Dict[str, any]): Report entry.
+    """
+    return {
+        'payPeriod': {'startDate': start_date.isoformat(), 'endDate': end_date.isoformat()},
+        'employeeId': str(employee_id),
+        'amountPaid': '${:.2f}'.format(amount),
+    }
+
+
+class ReportEngine(object):
+    """
+    Base report engine.
+    """
+    def __init__(self, db_session: scoped_session, report_query: Optional[ReportQuery] = None):
+        """
+        Class constructor.
+
+        Raises:
+            - ReportEngineException: IF the configured pay schedule is invalid.
+
+        Args:
+            - db_session (scoped_session): Database session used to read the data;
+            - report_query (Optional[ReportQuery]): Filters and pagination. Defaults to the whole report.
+        """
+        self.db_session = db_session
+        self.report_query = report_query or ReportQuery()
+        try:
+            self.pay_calendar = get_pay_calendar()
+        except PayCalendarException as err:
+            raise ReportEngineException(str(err))
+
+    def _filter_work_units(self, query: Query) -> Query:
+        """
+        Applies the report query to a query over work units. Units are matched on their period key, so periods are
+        always reported whole. The date range of the matching periods is added on top, as plain comparisons on the date
+        column, so the (employee_id, date) index can be used and PostgreSQL skips the monthly partitions outside of it
+        (see `app.models.partitions`).
+
+        Args:
+            - query (Query): Query selecting from EmployeeWorkUnit.
+
+        Returns:
+            - (Query): Filtered query.
+        """
+        if self.report_query.employee_id is not None:
+            query = query.filter(EmployeeWorkUnit.employee_id == self.report_query.employee_id)
+
+        period_key = self.pay_calendar.schedule.sql_key(EmployeeWorkUnit.date)
+        lower_key, upper_key = self.report_query.key_bounds()
+        lower, upper = self.report_query.date_bounds()
+        if lower_key is not None:
+            query = query.filter(period_key >= lower_key, EmployeeWorkUnit.date >= lower)
+        if upper_key is not None:
+            query = query.filter(period_key <= upper_key, EmployeeWorkUnit.date <= upper)
+
+        if self.report_query.after:
+            employee_id, after_key = self.report_query.after_key()
+            query = query.filter(or_(
+                EmployeeWorkUnit.employee_id > employee_id,
+                and_(EmployeeWorkUnit.employee_id == employee_id, period_key > after_key),
+            ))
+        return query
+
+    def rows(self) -> Iterator[ReportRow]:
+        """
+        To be implemented by child engines.
+        Should yield the aggregated rows matching the report query, ordered by employee id and period.
+        """
+        raise NotImplementedError
+
+    def iter_entries(self) -> Iterator[Dict[str, any]]:
+        """
+        Lazily generates the report entries, dropping periods without any amount to be paid.
+
+        Returns:
+            - (Iterator[Dict[str, any]]): Report entries.
+        """
+        entries = (format_report_entry(*row) for row in self.rows() if row[3] > 0)
+        return itertools.islice(entries, self.report_query.limit)
+
+    def generate(self) -> List[Dict[str, any]]:
+        """
+        Generates the report entries, dropping periods without any amount to be paid.
+
+        Returns:
+            - (List[Dict[str, any]]): List of report entries.
+        """
+        return list(self.iter_entries())
+
+
+class PythonReportEngine(ReportEngine):
+    """
+    Loads every work unit and aggregates them in Python.
+    """
+    def rows(self) -> Iterator[ReportRow]:
+        query = (
+            self.db_session.query(EmployeeWorkUnit.employee_id, EmployeeWorkUnit.date,
+                                  EmployeeWorkUnit.hours_worked, Employee.job_group)
+            .join(Employee, Employee.id == EmployeeWorkUnit.employee_id)
+            .order_by(EmployeeWorkUnit.employee_id.asc(), EmployeeWorkUnit.date.asc())
+        )
+        query = self._filter_work_units(query).yield_per(Config.Report.CHUNK_SIZE)
+
+        data = {}
+        for employee_id, date, hours_worked, job_group in query:
+            key = (employee_id, self.pay_calendar.get_key(date))
+            data[key] = data.get(key, 0) + JOB_GROUP_WAGES[job_group] * hours_worked
+
+        for (employee_id, period_key), amount in data.items():
+            yield (employee_id, *self.pay_calendar.get_bounds(period_key), amount)
+
+
+class SQLReportEngine(ReportEngine):
+    """
+    Aggregates work units per employee and period inside the database.
+    Works on both SQLite and PostgreSQL. Also the only engine computing delta reports (`ReportQuery.since`).
+    """
+    def _is_new(self) -> ColumnElement:
+        """
+        Builds the condition matching the work units of the reports ingested after `ReportQuery.since`.
+
+        Returns:
+            - (ColumnElement): Condition over EmployeeWorkUnit.
+        """
+        new_reports = select(EmployeeWorkReportIngest.report_id).where(
+            EmployeeWorkReportIngest.sequence > self.report_query.since
+        )
+        return EmployeeWorkUnit.report_id.in_(new_reports)
+
+    def _filter_delta(self, query: Query) -> Query:
+        """
+        Restricts a query over work units to the employees and periods that reports after `ReportQuery.since`
+        have units in, so delta reports only read around the new data. Periods are matched by key, so every unit of a
+        touched period is read; the date range of those periods is added on top for partition pruning.
+
+        Args:
+            - query (Query): Query selecting from EmployeeWorkUnit.
+
+        Returns:
+            - (Query): Filtered query.
+        """
+        is_new = self._is_new()
+        first, last = self.db_session.query(func.min(EmployeeWorkUnit.date), func.max(EmployeeWorkUnit.date)).filter(
+            is_new
+        ).one()
+        if first is None:
+            return query.filter(false())
+
+        first_key, last_key = self.pay_calendar.get_key(first), self.pay_calendar.get_key(last)
+        period_key = self.pay_calendar.schedule.sql_key(EmployeeWorkUnit.date)
+        return query.filter(
+            EmployeeWorkUnit.employee_id.in_(select(EmployeeWorkUnit.employee_id).where(is_new)),
+            period_key >= first_key,
+            period_key <= last_key,
+            EmployeeWorkUnit.date >= self.pay_calendar.get_bounds(first_key)[0],
+            EmployeeWorkUnit.date <= self.pay_calendar.get_bounds(last_key)[1],
+        )
+
+    def query(self) -> Query:
+        """
+        Builds the aggregation query.
+
+        Returns:
+            - (Query): Query selecting (employee_id, period_key, amount) rows.
+        """
+        period_key = self.pay_calendar.schedule.sql_key(EmployeeWorkUnit.date)
+        wage = case(JOB_GROUP_WAGES, value=Employee.job_group)
+        # Grouping on subquery columns keeps PostgreSQL from comparing expressions with distinct bound parameters
+        columns = [
+            EmployeeWorkUnit.employee_id.label('employee_id'),
+            period_key.label('period_key'),
+            (EmployeeWorkUnit.hours_worked * wage).label('amount'),
+        ]
+        if self.report_query.since is not None:
+            columns.append(case((self._is_new(), 1), else_=0).label('is_new'))
+        units = self.db_session.query(*columns).join(Employee, Employee.id == EmployeeWorkUnit.employee_id)
+        units = self._filter_work_units(units)
+        if self.report_query.since is not None:
+            units = self._filter_delta(units)
+        units = units.subquery()
+
+        amount = func.sum(units.c.amount)
+        query = (
+            self.db_session.query(units.c.employee_id, units.c.period_key, amount)
+            .group_by(units.c.employee_id, units.c.period_key)
+            .having(amount > 0)
+        )
+        if self.report_query.since is not None:
+            # Periods touched by a new report, reported with the amounts of every report
+            query = query.having(func.max(units.c.is_new) == 1)
+        return query.order_by(units.c.employee_id.asc(), units.c.period_key.asc()).limit(self.report_query.limit)
+
+    def rows(self) -> Iterator[ReportRow]:
+        for employee_id, period_key, amount in self.query().yield_per(Config.Report.CHUNK_SIZE):
+            yield (employee_id, *self.pay_calendar.get_bounds(period_key), amount or 0)
+
+
+class NumpyReportEngine(ReportEngine):
+    """
+    Fetches the work unit columns as arrays and aggregates them with vectorized NumPy operations.
+    Unlike the other engines, the matching work units are loaded at once.
+    NumPy is only imported once one of the NumPy-based engines runs, so it does not slow down worker startup.
+    """
+    def rows(self) -> Iterator[ReportRow]:
+        import numpy as np
+        # Dates are fetched as ISO strings, which NumPy parses without building datetime.date objects
+        query = (
+            self.db_session.query(EmployeeWorkUnit.employee_id, cast(EmployeeWorkUnit.date, String),
+                                  EmployeeWorkUnit.hours_worked, Employee.job_group)
+            .join(Employee, Employee.id == EmployeeWorkUnit.employee_id)
+            .order_by(EmployeeWorkUnit.employee_id.asc(), EmployeeWorkUnit.date.asc())
+        )
+        units = self.db_session.connection().execute(self._filter_work_units(query).statement).fetchall()
+        if not units:
+            return iter(())
+
+        employee_ids, dates, hours_worked, job_groups = zip(*units)
+        groups, group_indexes = np.unique(np.array(job_groups, dtype=object).astype(str), return_inverse=True)
+        wages = np.array([JOB_GROUP_WAGES.get(group, 0) for group in groups], dtype=np.float64)
+        return self._aggregate(
+            np.array(employee_ids, dtype=np.int64),
+            np.array(dates, dtype='datetime64[D]').astype(np.int64) + EPOCH_ORDINAL,
+            np.array(hours_worked, dtype=np.float64) * wages[group_indexes],
+        )
+
+    def _aggregate(self, employee_ids: 'np.ndarray', ordinals: 'np.ndarray',
+                   amounts: 'np.ndarray') -> Iterator[ReportRow]:
+        """
+        Sums amounts per employee and period. Each group is added up sequentially, in unit order, like the Python
+        engine does, so both report the exact same amounts (`np.add.reduceat` sums pairwise, which rounds differently).
+
+        Args:
+            - employee_ids (np.ndarray): Employee id of each work unit;
+            - ordinals (np.ndarray): Date of each work unit, as a proleptic Gregorian ordinal;
+            - amounts (np.ndarray): Amount paid for each work unit.
+                                    All arrays must be ordered by employee id and date.
+
+        Returns:
+            - (Iterator[ReportRow]): Aggregated rows.
+        """
+        import numpy as np
+        period_keys = self.pay_calendar.get_keys(ordinals)
+
+        # Units are ordered by employee and date, so every (employee_id, period_key) group is a contiguous run
+        changes = (np.diff(employee_ids) != 0) | (np.diff(period_keys) != 0)
+        starts = np.concatenate(([0], np.flatnonzero(changes) + 1))
+        lengths = np.diff(np.append(starts, len(amounts)))
+        # Adds the n-th unit of every group still running at once, so there are as many passes as units in the
+        # largest group
+        totals = np.zeros(len(starts))
+        for offset in range(int(lengths.max())):
+            running = lengths > offset
+            totals[running] += amounts[starts[running] + offset]
+
+        for employee_id, period_key, amount in zip(employee_ids[starts].tolist(), period_keys[starts].tolist(),
+                                                   totals.tolist()):
+            yield (employee_id, *self.pay_calendar.get_bounds(period_key), amount)
+
+
+class ColumnarReportEngine(NumpyReportEngine):
+    """
+    Aggregates the memory-mapped columnar snapshot of the work units (see `app.reports.columnar`), without reading
+    work units from the database. Falls back to the NumPy engine when the snapshot does not match the ingested data.
+    """
+    def rows(self) -> Iterator[ReportRow]:
+        import numpy as np
+        store = ColumnarStore(Config.Columnar.DIRECTORY)
+        columns = store.read()
+        count, max_id = self.db_session.query(func.count(EmployeeWorkReport.id), func.max(EmployeeWorkReport.id)).one()
+        if not count:
+            return iter(())
+        if columns is None or store.get_version(columns['meta']) != f'{count}.{max_id}':
+            get_logger(__name__).warning('Columnar snapshot out of date, reading work units from the database')
+            return super().rows()
+
+        employee_ids, ordinals = columns['employee_id'], columns['date']
+        mask = np.ones(len(employee_ids), dtype=bool)
+        if self.report_query.employee_id is not None:
+            mask &= employee_ids == self.report_query.employee_id
+
+        lower_key, upper_key = self.report_query.key_bounds()
+        if lower_key is not None or upper_key is not None or self.report_query.after:
+            period_keys = self.pay_calendar.get_keys(ordinals.astype(np.int64))
+            if lower_key is not None:
+                mask &= period_keys >= lower_key
+            if upper_key is not None:
+                mask &= period_keys <= upper_key
+            if self.report_query.after:
+                employee_id, after_key = self.report_query.after_key()
+                mask &= (employee_ids > employee_id) | ((employee_ids == employee_id) & (period_keys > after_key))
+
+        indexes = np.flatnonzero(mask)
+        if not len(indexes):
+            return iter(())
+        # Rows are stored in ingest order, so they are sorted by employee and date before aggregating
+        indexes = indexes[np.lexsort((ordinals[indexes], employee_ids[indexes]))]
+
+        wages = np.array([JOB_GROUP_WAGES.get(group, 0) for group in columns['meta']['groups']], dtype=np.float64)
+        return self._aggregate(
+            employee_ids[indexes],
+            ordinals[indexes].astype(np.int64),
+            columns['hours_worked'][indexes] * wages[columns['job_group'][indexes]],
+        )
+
+
+class TotalsReportEngine(ReportEngine):
+    """
+    Reads the payroll period totals maintained by the CSV ingest.
+    """
+    def rows(self) -> Iterator[ReportRow]:
+        query = self.db_session.query(
+            PayrollPeriodTotal.employee_id,
+            PayrollPeriodTotal.period_start,
+            PayrollPeriodTotal.period_end,
+            PayrollPeriodTotal.amount,
+        ).filter(PayrollPeriodTotal.amount > 0)
+
+        if self.report_query.employee_id is not None:
+            query = query.filter(PayrollPeriodTotal.employee_id == self.report_query.employee_id)
+
+        lower, upper = self.report_query.date_bounds()
+        if lower:
+            query = query.filter(PayrollPeriodTotal.period_start >= lower)
+        if upper:
+            query = query.filter(PayrollPeriodTotal.period_end <= upper)
+
+        if self.report_query.after:
+            employee_id, period_start = self.report_query.after
+            query = query.filter(or_(
+                PayrollPeriodTotal.employee_id > employee_id,
+                and_(PayrollPeriodTotal.employee_id == employee_id, PayrollPeriodTotal.period_start > period_start),
+            ))
+
+        query = (
+            query.order_by(PayrollPeriodTotal.employee_id.asc(), PayrollPeriodTotal.period_start.asc())
+            .limit(self.report_query.limit)
+        )
+        return iter(query.yield_per(Config.Report.CHUNK_SIZE))
+
+
+ENGINES = {
+    'python': PythonReportEngine,
+    'sql': SQLReportEngine,
+    'numpy': NumpyReportEngine,
+    'columnar': ColumnarReportEngine,
+    'totals': TotalsReportEngine,
+}
+
+
+def get_report_engine(name: str, db_session: scoped_session,
+                      report_query: Optional[ReportQuery] = None) -> ReportEngine:
+    """
+    Instantiates a report engine by name.
+
+    Raises:
+        - ReportEngineException: IF there is no engine registered under the given name.
+
+    Args:
+        - name (str): Name of the engine (see ENGINES);
+        - db_session (scoped_session): Database session used to read the data;
+        - report_query (Optional[ReportQuery]): Filters and pagination. Defaults to the whole report.
+
+    Returns:
+        - (ReportEngine): Engine instance.
+    """
+    try:
+        return ENGINES[name](db_session, report_query)
+    except KeyError:
+        raise ReportEngineException(f'Unknown report engine "{name}"')
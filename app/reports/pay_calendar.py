@@ -0,0 +1,310 @@
+"""
+Pay calendar: splits dates into pay periods, following the schedule set in `Config.Report.PAY_SCHEDULE`.
+
+Every schedule identifies its periods by an integer key, which can be computed both in Python and in SQL, so rows can
+be grouped by period inside the database. The PayCalendar precomputes the key of every day in the span of the data
+(growing it on demand), so classifying a date is a single table lookup, and keeps the bounds and ISO strings of each
+period so they are only built once.
+"""
+import array
+import calendar
+import datetime
+
+from sqlalchemy import cast, case, extract, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.functions import FunctionElement
+from typing import Dict, Tuple, TYPE_CHECKING
+
+from app.config import Config
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Proleptic Gregorian ordinal of 1970-01-01
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class PayCalendarException(Exception):
+    """ Exception class used to identify pay calendar errors """
+    pass
+
+
+class day_number(FunctionElement):
+    """
+    SQL expression for the amount of days between 1970-01-01 and a date column.
+    """
+    type = Integer()
+    name = 'day_number'
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _compile_day_number(element, compiler, **kwargs):
+    return f"({compiler.process(element.clauses, **kwargs)} - DATE '1970-01-01')"
+
+
+@compiles(day_number, 'sqlite')
+def _compile_day_number_sqlite(element, compiler, **kwargs):
+    return f'CAST(julianday({compiler.process(element.clauses, **kwargs)}) - 2440587.5 AS INTEGER)'
+
+
+class PaySchedule(object):
+    """
+    Base pay schedule.
+    """
+    name = None
+
+    @property
+    def signature(self) -> str:
+        """
+        Identifies the periods of the schedule, so data computed with another schedule (i.e. the stored payroll period
+        totals) can be told apart.
+        """
+        return self.name
+
+    def get_key(self, date: datetime.date) -> int:
+        """
+        To be implemented by child schedules.
+        Should resolve the key of the period that a certain date is in.
+        """
+        raise NotImplementedError
+
+    def get_bounds(self, key: int) -> Tuple[datetime.date, datetime.date]:
+        """
+        To be implemented by child schedules.
+        Should resolve the first and last days of a period.
+        """
+        raise NotImplementedError
+
+    def sql_key(self, date: ColumnElement) -> ColumnElement:
+        """
+        To be implemented by child schedules.
+        Should build the SQL expression computing the same key as `get_key`.
+        """
+        raise NotImplementedError
+
+
+class WeeklySchedule(PaySchedule):
+    """
+    Periods of `LENGTH` days, starting on the anchor date.
+    """
+    name = 'weekly'
+    LENGTH = 7
+    # Keeps the dividend positive in SQL, where integer division truncates instead of flooring
+    _SQL_OFFSET = 100000
+
+    def __init__(self, anchor: datetime.date):
+        """
+        Class constructor.
+
+        Args:
+            - anchor (datetime.date): First day of any of the periods.
+        """
+        self.anchor = anchor.toordinal()
+
+    @property
+    def signature(self) -> str:
+        return f'{self.name}:{datetime.date.fromordinal(self.anchor).isoformat()}'
+
+    def get_key(self, date: datetime.date) -> int:
+        return (date.toordinal() - self.anchor) // self.LENGTH
+
+    def get_bounds(self, key: int) -> Tuple[datetime.date, datetime.date]:
+        start = self.anchor + key * self.LENGTH
+        return datetime.date.fromordinal(start), datetime.date.fromordinal(start + self.LENGTH - 1)
+
+    def sql_key(self, date: ColumnElement) -> ColumnElement:
+        days = day_number(date) - (self.anchor - EPOCH_ORDINAL) + self.LENGTH * self._SQL_OFFSET
+        return cast(days / self.LENGTH, Integer) - self._SQL_OFFSET
+
+
+class BiWeeklySchedule(WeeklySchedule):
+    name = 'bi-weekly'
+    LENGTH = 14
+
+
+class SemiMonthlySchedule(PaySchedule):
+    """
+    Two periods per month, keyed by `year * 24 + (month - 1) * 2 + half`.
+    """
+    name = 'semi-monthly'
+
+    def get_key(self, date: datetime.date) -> int:
+        return date.year * 24 + (date.month - 1) * 2 + (0 if date.day <= 15 else 1)
+
+    def get_bounds(self, key: int) -> Tuple[datetime.date, datetime.date]:
+        year, remainder = divmod(key, 24)
+        month, half = divmod(remainder, 2)
+        month += 1
+        if half == 0:
+            return datetime.date(year, month, 1), datetime.date(year, month, 15)
+        return datetime.date(year, month, 16), datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+    def sql_key(self, date: ColumnElement) -> ColumnElement:
+        half = case((extract('day', date) <= 15, 0), else_=1)
+        return cast(extract('year', date) * 24 + (extract('month', date) - 1) * 2 + half, Integer)
+
+
+class MonthlySchedule(PaySchedule):
+    """
+    One period per calendar month, keyed by `year * 12 + month - 1`.
+    """
+    name = 'monthly'
+
+    def get_key(self, date: datetime.date) -> int:
+        return date.year * 12 + date.month - 1
+
+    def get_bounds(self, key: int) -> Tuple[datetime.date, datetime.date]:
+        year, month = divmod(key, 12)
+        month += 1
+        return datetime.date(year, month, 1), datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+    def sql_key(self, date: ColumnElement) -> ColumnElement:
+        return cast(extract('year', date) * 12 + extract('month', date) - 1, Integer)
+
+
+SCHEDULES = {
+    WeeklySchedule.name: WeeklySchedule,
+    BiWeeklySchedule.name: BiWeeklySchedule,
+    SemiMonthlySchedule.name: SemiMonthlySchedule,
+    MonthlySchedule.name: MonthlySchedule,
+}
+
+
+class PayCalendar(object):
+    """
+    Precomputed period lookup table for a pay schedule.
+    """
+    # Days added around the requested span whenever the table grows, so it does not grow on every new date
+    MARGIN = 366
+
+    def __init__(self, schedule: PaySchedule):
+        """
+        Class constructor.
+
+        Args:
+            - schedule (PaySchedule): Schedule the periods follow.
+        """
+        self.schedule = schedule
+        # (ordinal of the first day, key of each day), swapped as a whole when the table grows
+        self._table = (0, array.array('q'))
+        self._bounds = {}
+        self._strings = {}
+
+    def _extend(self, first: int, last: int):
+        """
+        Grows the lookup table to cover a span of days. The new table is swapped in at once, so concurrent lookups
+        always see a consistent table.
+
+        Args:
+            - first (int): Ordinal of the first day to cover;
+            - last (int): Ordinal of the last day to cover.
+        """
+        table_first, day_keys = self._table
+        if day_keys:
+            first, last = min(first, table_first), max(last, table_first + len(day_keys) - 1)
+        first, last = max(first - self.MARGIN, 1), last + self.MARGIN
+
+        # Keys are resolved day by day, so the table always agrees with `PaySchedule.get_key`
+        get_key = self.schedule.get_key
+        day_keys = array.array('q', (get_key(datetime.date.fromordinal(ordinal)) for ordinal in range(first, last + 1)))
+        self._table = (first, day_keys)
+
+    def get_key(self, date: datetime.date) -> int:
+        """
+        Resolves the key of the period that a certain date is in.
+
+        Args:
+            - date (datetime.date): Date object to be analized.
+
+        Returns:
+            - (int): Period key.
+        """
+        ordinal = date.toordinal()
+        first, day_keys = self._table
+        if not 0 <= ordinal - first < len(day_keys):
+            self._extend(ordinal, ordinal)
+            first, day_keys = self._table
+        return day_keys[ordinal - first]
+
+    def get_keys(self, ordinals: 'np.ndarray') -> 'np.ndarray':
+        """
+        Vectorized `get_key`.
+
+        Args:
+            - ordinals (np.ndarray): Proleptic Gregorian ordinals of the dates.
+
+        Returns:
+            - (np.ndarray): Period key of each date.
+        """
+        import numpy as np
+        if not len(ordinals):
+            return np.zeros(0, dtype=np.int64)
+        table_first, day_keys = self._table
+        first, last = int(ordinals.min()), int(ordinals.max())
+        if first < table_first or last >= table_first + len(day_keys):
+            self._extend(first, last)
+            table_first, day_keys = self._table
+        return np.frombuffer(day_keys, dtype=np.int64)[ordinals - table_first]
+
+    def get_bounds(self, key: int) -> Tuple[datetime.date, datetime.date]:
+        """
+        Resolves the first and last days of a period.
+
+        Args:
+            - key (int): Key of the period, as returned by `get_key`.
+
+        Returns:
+            - (Tuple[datetime.date, datetime.date]): Start and end dates of the period.
+        """
+        bounds = self._bounds.get(key)
+        if bounds is None:
+            bounds = self._bounds.setdefault(key, self.schedule.get_bounds(key))
+        return bounds
+
+    def get_strings(self, key: int) -> Tuple[str, str]:
+        """
+        Resolves the start and end dates of a period as ISO strings, shared by every caller.
+
+        Args:
+            - key (int): Key of the period, as returned by `get_key`.
+
+        Returns:
+            - (Tuple[str, str]): Start and end dates of the period.
+        """
+        strings = self._strings.get(key)
+        if strings is None:
+            start_date, end_date = self.get_bounds(key)
+            strings = self._strings.setdefault(key, (start_date.isoformat(), end_date.isoformat()))
+        return strings
+
+
+_CALENDARS: Dict[Tuple[str, str], PayCalendar] = {}
+
+
+def get_pay_calendar() -> PayCalendar:
+    """
+    Returns the pay calendar of the schedule set in `Config.Report.PAY_SCHEDULE`, shared by the whole process.
+
+    Raises:
+        - PayCalendarException: IF the configured schedule or anchor is invalid.
+
+    Returns:
+        - (PayCalendar): Pay calendar.
+    """
+    name, anchor = Config.Report.PAY_SCHEDULE, Config.Report.PAY_SCHEDULE_ANCHOR
+    pay_calendar = _CALENDARS.get((name, anchor))
+    if pay_calendar is None:
+        if name not in SCHEDULES:
+            raise PayCalendarException(f'Unknown pay schedule "{name}"')
+        if issubclass(SCHEDULES[name], WeeklySchedule):
+            try:
+                schedule = SCHEDULES[name](datetime.datetime.strptime(anchor, '%Y-%m-%d').date())
+            except ValueError:
+                raise PayCalendarException(f'Invalid pay schedule anchor "{anchor}"')
+        else:
+            schedule = SCHEDULES[name]()
+        pay_calendar = _CALENDARS.setdefault((name, anchor), PayCalendar(schedule))
+    return pay_calendar
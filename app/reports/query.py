@@ -0,0 +1,161 @@
+"""
+Report filtering and keyset pagination arguments.
+"""
+import datetime
+
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+from app.reports.pay_calendar import get_pay_calendar
+
+
+class ReportQueryException(Exception):
+    """ Exception class used to identify invalid report arguments """
+    pass
+
+
+class ReportQuery(NamedTuple):
+    """
+    Restricts the entries of a report.
+
+    - employee_id: Only report this employee;
+    - start_date/end_date: Only report the pay periods overlapping this range (periods are always reported whole);
+    - after: Only report entries after this (employee_id, period_start) position, in report order;
+    - limit: Maximum amount of entries to report;
+    - since: Only report the (employee, period) pairs with work units from reports ingested after this watermark (see
+             `EmployeeController.get_report_watermark`), with their whole amounts.
+    """
+    employee_id: Optional[int] = None
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+    after: Optional[Tuple[int, datetime.date]] = None
+    limit: Optional[int] = None
+    since: Optional[int] = None
+
+    def key_bounds(self) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Resolves the pay periods the date range starts and ends in. Work units are filtered on their period key, so
+        a unit is reported along with its whole period.
+
+        Returns:
+            - (Tuple[Optional[int], Optional[int]]): Keys of the first and last periods to be considered.
+        """
+        pay_calendar = get_pay_calendar()
+        lower = pay_calendar.get_key(self.start_date) if self.start_date else None
+        upper = pay_calendar.get_key(self.end_date) if self.end_date else None
+        return lower, upper
+
+    def date_bounds(self) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+        """
+        Expands the date range to whole pay periods.
+
+        Returns:
+            - (Tuple[Optional[datetime.date], Optional[datetime.date]]): First and last days to be considered.
+        """
+        pay_calendar = get_pay_calendar()
+        lower, upper = self.key_bounds()
+        return (
+            pay_calendar.get_bounds(lower)[0] if lower is not None else None,
+            pay_calendar.get_bounds(upper)[1] if upper is not None else None,
+        )
+
+    def after_key(self) -> Optional[Tuple[int, int]]:
+        """
+        Resolves the (employee_id, period_key) position the pagination cursor points to.
+
+        Returns:
+            - (Optional[Tuple[int, int]]): Position of the cursor, if paginating.
+        """
+        if not self.after:
+            return None
+        return self.after[0], get_pay_calendar().get_key(self.after[1])
+
+    def after_period_end(self) -> Optional[datetime.date]:
+        """
+        Resolves the last day of the pay period the pagination cursor points to.
+
+        Returns:
+            - (Optional[datetime.date]): Last day of the period, if paginating.
+        """
+        if not self.after:
+            return None
+        return get_pay_calendar().get_bounds(self.after_key()[1])[1]
+
+
+def get_next_cursor(last_entry: Optional[Dict[str, any]], count: int, limit: Optional[int]) -> Optional[str]:
+    """
+    Builds the pagination cursor pointing right after the last entry of a page.
+
+    Args:
+        - last_entry (Optional[Dict[str, any]]): Last report entry of the page;
+        - count (int): Amount of entries in the page;
+        - limit (Optional[int]): Page size requested.
+
+    Returns:
+        - (Optional[str]): Pagination cursor, or None when there are no more entries to fetch.
+    """
+    if last_entry is None or limit is None or count < limit:
+        return None
+    return f'{last_entry["employeeId"]}_{last_entry["payPeriod"]["startDate"]}'
+
+
+def _parse_date(value: str, name: str) -> datetime.date:
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ReportQueryException(f'Invalid "{name}". Please inform a date formatted as YYYY-MM-DD')
+
+
+def parse_report_query(args: Mapping[str, str], max_limit: int) -> ReportQuery:
+    """
+    Parses report arguments from a request query string.
+
+    Raises:
+        - ReportQueryException: IF any of the arguments is invalid.
+
+    Args:
+        - args (Mapping[str, str]): Query string arguments (employeeId, startDate, endDate, cursor, limit, since);
+        - max_limit (int): Maximum page size allowed.
+
+    Returns:
+        - (ReportQuery): Parsed arguments.
+    """
+    employee_id = args.get('employeeId')
+    if employee_id is not None:
+        try:
+            employee_id = int(employee_id)
+        except ValueError:
+            raise ReportQueryException('Invalid "employeeId". Please inform an integer')
+
+    start_date = _parse_date(args['startDate'], 'startDate') if args.get('startDate') else None
+    end_date = _parse_date(args['endDate'], 'endDate') if args.get('endDate') else None
+    if start_date and end_date and start_date > end_date:
+        raise ReportQueryException('"startDate" must not be after "endDate"')
+
+    after = None
+    if args.get('cursor'):
+        try:
+            cursor_employee_id, cursor_date = args['cursor'].split('_')
+            after = (int(cursor_employee_id), _parse_date(cursor_date, 'cursor'))
+        except (ValueError, ReportQueryException):
+            raise ReportQueryException('Invalid "cursor"')
+
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= max_limit:
+            raise ReportQueryException(f'Invalid "limit". Please inform an integer between 1 and {max_limit}')
+
+    since = args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if since < 0:
+            raise ReportQueryException('Invalid "since". Please inform a watermark')
+
+    return ReportQuery(employee_id=employee_id, start_date=start_date, end_date=end_date, after=after, limit=limit,
+                       since=since)
@@ -0,0 +1,44 @@
+"""
+Incremental JSON serialization for payroll reports.
+"""
+from flask import json
+from typing import Dict, Iterable, Iterator, Optional
+
+from app.reports.query import get_next_cursor
+
+REPORT_PREFIX = '{"payrollReport": {"employeeReports": ['
+
+
+def iter_report_json(entries: Iterable[Dict[str, any]], chunk_size: int, limit: Optional[int] = None,
+                     watermark: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Serializes report entries as `{"payrollReport": {"employeeReports": [...]}}`, one chunk at a time.
+    The concatenated chunks are identical to serializing the whole report with `json.dumps`.
+
+    Args:
+        - entries (Iterable[Dict[str, any]]): Report entries to serialize;
+        - chunk_size (int): Amount of entries per chunk;
+        - limit (Optional[int]): Page size requested. When informed, the report also carries a "nextCursor";
+        - watermark (Optional[int]): Watermark to request the next delta report from. Carried when informed.
+
+    Returns:
+        - (Iterator[bytes]): UTF-8 encoded chunks of the report.
+    """
+    prefix = REPORT_PREFIX
+    parts = []
+    entry = None
+    count = 0
+    for entry in entries:
+        parts.append((', ' if count else '') + json.dumps(entry))
+        count += 1
+        if len(parts) >= chunk_size:
+            yield (prefix + ''.join(parts)).encode('UTF-8')
+            prefix = ''
+            parts = []
+
+    parts.append(']')
+    if limit is not None:
+        parts.append(', "nextCursor": ' + json.dumps(get_next_cursor(entry, count, limit)))
+    if watermark is not None:
+        parts.append(', "watermark": ' + json.dumps(watermark))
+    yield (prefix + ''.join(parts) + '}}').encode('UTF-8')
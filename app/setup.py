@@ -7,7 +7,10 @@ from app.config import Config
 from app.logging import logging_setup
 from app.errors import errors_setup
 from app.database import database_setup
+from app.metrics import metrics_setup
+from app.profiling import profiling_setup
 from app.blueprints import views_setup
+from app.commands import commands_setup
 
 def create_app():
     """
@@ -21,5 +24,8 @@ def create_app():
     logging_setup(app)
     errors_setup(app)
     database_setup(app)
+    metrics_setup(app)
+    profiling_setup(app)
     views_setup(app)
+    commands_setup(app)
     return app
@@ -0,0 +1,132 @@
+"""
+Stream-related helpers.
+"""
+import bz2
+import codecs
+import gzip
+import io
+import lzma
+import zlib
+
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+
+def iter_text_lines(stream: BinaryIO, encoding: str = 'UTF-8', chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Incrementally decodes a binary stream into text lines, reading at most `chunk_size` bytes at a time.
+    Line endings are kept, so the result can be fed straight into `csv.reader`.
+
+    Args:
+        - stream (BinaryIO): Binary stream to read from;
+        - encoding (str): Encoding used to decode the stream;
+        - chunk_size (int): Number of bytes read from the stream per iteration.
+
+    Returns:
+        - (Iterator[str]): Decoded lines, in order.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        pending += decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            break
+
+        lines = pending.splitlines(keepends=True)
+        # The last line may continue in the next chunk (including a "\r" that is half of a "\r\n")
+        pending = lines.pop() if lines and not lines[-1].endswith('\n') else ''
+        yield from lines
+
+    if pending:
+        yield from pending.splitlines(keepends=True)
+
+
+# Leading bytes of each supported compression format
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'bzip2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+}
+COMPRESSION_OPENERS = {
+    'gzip': gzip.open,
+    'bzip2': bz2.open,
+    'xz': lzma.open,
+}
+# Content-Encoding / Content-Type values naming each format
+COMPRESSION_ALIASES = {
+    'gzip': 'gzip', 'x-gzip': 'gzip', 'application/gzip': 'gzip', 'application/x-gzip': 'gzip',
+    'bzip2': 'bzip2', 'x-bzip2': 'bzip2', 'application/x-bzip2': 'bzip2',
+    'xz': 'xz', 'application/x-xz': 'xz',
+}
+# Errors raised while reading corrupt or truncated compressed streams
+DECOMPRESSION_ERRORS = (OSError, EOFError, lzma.LZMAError)
+
+
+class _PrefixedStream(io.RawIOBase):
+    """
+    Non-seekable stream whose first bytes were already read, returning them again before the rest of the stream.
+    """
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.prefix[:len(buffer)] if self.prefix else self.stream.read(len(buffer))
+        self.prefix = self.prefix[len(data):]
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_decompressed(stream: BinaryIO, encoding: Optional[str] = None) -> BinaryIO:
+    """
+    Wraps a binary stream so it is decompressed while read, when it is gzip, bzip2 or xz compressed.
+    The format is taken from `encoding` when informed, and detected from the leading bytes of the stream otherwise.
+
+    Raises:
+        - ValueError: IF the encoding is not supported.
+
+    Args:
+        - stream (BinaryIO): Binary stream to read from;
+        - encoding (Optional[str]): Content-Encoding or Content-Type of the stream, if known.
+
+    Returns:
+        - (BinaryIO): Stream of decompressed bytes. The stream itself, when not compressed.
+    """
+    if encoding and encoding.lower() != 'identity':
+        compression = COMPRESSION_ALIASES.get(encoding.lower())
+        if compression is None:
+            raise ValueError(f'Unsupported encoding "{encoding}"')
+        return COMPRESSION_OPENERS[compression](stream, 'rb')
+
+    prefix = stream.read(max(len(magic) for magic in COMPRESSION_MAGIC.values()))
+    try:
+        stream.seek(-len(prefix), io.SEEK_CUR)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        stream = io.BufferedReader(_PrefixedStream(prefix, stream))
+
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if prefix.startswith(magic):
+            return COMPRESSION_OPENERS[compression](stream, 'rb')
+    return stream
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip-compresses a stream of chunks as they are consumed, without buffering the whole content.
+
+    Args:
+        - chunks (Iterable[bytes]): Chunks to compress;
+        - level (int): Compression level, from 1 (fastest) to 9 (smallest).
+
+    Returns:
+        - (Iterator[bytes]): Chunks of a single gzip stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,10 +1,22 @@
 """
 Employee-related blueprint/views.
 """
-from flask import Blueprint, request
+import gzip
 
-from app.controllers.employees import EmployeeController, EmployeeControllerException
+from flask import Blueprint, current_app, json, jsonify, request, Response, stream_with_context, url_for
+from typing import List
+from werkzeug.datastructures import FileStorage
+
+from app.config import Config
+from app.controllers.batch_ingest import BatchIngestController
+from app.controllers.employees import EmployeeController, EmployeeControllerException, InvalidRowsException
+from app.controllers.ingest_jobs import IngestJobController
+from app.controllers.uploads import UploadConflictException, UploadController
 from app.errors import create_error_response
+from app.reports.cache import get_report_cache, ReportCache
+from app.reports.query import get_next_cursor, parse_report_query, ReportQuery, ReportQueryException
+from app.reports.streaming import iter_report_json
+from app.utils.streams import iter_gzip
 
 
 BLUEPRINT = Blueprint('employees', __name__, url_prefix='/employees')
@@ -14,30 +26,250 @@ BLUEPRINT = Blueprint('employees', __name__, url_prefix='/employees')
 def process_employees_csv():
     """
     Processes a CSV file with employee information.
+    Several "source" files, or zip/tar archives of them, are ingested in parallel and reported on individually.
+    Every row is validated before anything is written: files with invalid rows are rejected with a report of the
+    problems found, by line number.
     """
-    try:
-        source = request.files['source']
-    except KeyError:
+    sources = request.files.getlist('source')
+    if not sources:
         return create_error_response({'message': 'Missing source file'}, 400)
 
+    if BatchIngestController.is_batch(sources):
+        return _process_batch(sources)
+
+    source = sources[0]
+    if Config.Ingest.ASYNC:
+        return _submit_ingest_job(source)
+
     controller = EmployeeController()
     try:
         controller.process_csv(source)
+    except InvalidRowsException as err:
+        return create_error_response(err.to_dict(), 400)
     except EmployeeControllerException as err:
         return create_error_response({'message': str(err)}, 400)
 
     return {'message': 'Employee work hours saved'}
 
 
+def _process_batch(sources: List[FileStorage]) -> Response:
+    """
+    Ingests several source files, answering with the outcome of each one.
+    """
+    controller = BatchIngestController(current_app._get_current_object())
+    try:
+        results = controller.process(sources)
+    except EmployeeControllerException as err:
+        return create_error_response({'message': str(err)}, 400)
+
+    response = jsonify({'reports': results})
+    if results and all(result['status'] == 'failed' for result in results):
+        response.status_code = 400
+    return response
+
+
+def _submit_ingest_job(source: FileStorage) -> Response:
+    """
+    Spools the source file and schedules its processing, answering with 202 and the job status.
+    """
+    controller = IngestJobController(current_app._get_current_object())
+    try:
+        status = controller.submit(source)
+    except EmployeeControllerException as err:
+        return create_error_response({'message': str(err)}, 400)
+
+    response = jsonify(status)
+    response.status_code = 202
+    response.headers['Location'] = url_for('employees.get_ingest_job', job_id=status['jobId'])
+    return response
+
+
+@BLUEPRINT.route('/csv/jobs/<job_id>', methods=['GET'])
+def get_ingest_job(job_id: str):
+    """
+    Returns the status and progress of an ingest job.
+    """
+    status = IngestJobController(current_app._get_current_object()).get_status(job_id)
+    if status is None:
+        return create_error_response({'message': 'Not found'}, 404)
+    return jsonify(status)
+
+
+@BLUEPRINT.route('/csv/uploads', methods=['POST'])
+def create_upload():
+    """
+    Creates a resumable upload session for a "time-report-{id}.csv" file, informed as {"filename": ...}.
+    The file is then sent with `PUT /csv/uploads/<upload_id>/chunks/<index>` and committed with
+    `POST /csv/uploads/<upload_id>/commit`.
+    """
+    filename = (request.get_json(silent=True) or {}).get('filename')
+    if not filename:
+        return create_error_response({'message': 'Missing filename'}, 400)
+
+    try:
+        status = UploadController(current_app._get_current_object()).create(filename)
+    except EmployeeControllerException as err:
+        return create_error_response({'message': str(err)}, 400)
+
+    response = jsonify(status)
+    response.status_code = 201
+    response.headers['Location'] = url_for('employees.get_upload', upload_id=status['uploadId'])
+    return response
+
+
+@BLUEPRINT.route('/csv/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id: str):
+    """
+    Returns the status of an upload session, including the chunks received so far.
+    """
+    status = UploadController(current_app._get_current_object()).get_status(upload_id)
+    if status is None:
+        return create_error_response({'message': 'Not found'}, 404)
+    return jsonify(status)
+
+
+@BLUEPRINT.route('/csv/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id: str, index: int):
+    """
+    Stores a chunk of an upload, sent as the raw request body along with its hex SHA-256 digest in the
+    "X-Chunk-SHA256" header. Chunks can be sent in any order, and resent safely.
+    """
+    controller = UploadController(current_app._get_current_object())
+    if controller.get_status(upload_id) is None:
+        return create_error_response({'message': 'Not found'}, 404)
+
+    try:
+        status = controller.put_chunk(upload_id, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+    except UploadConflictException as err:
+        return create_error_response({'message': str(err)}, 409)
+    except InvalidRowsException as err:
+        return create_error_response(err.to_dict(), 400)
+    except EmployeeControllerException as err:
+        return create_error_response({'message': str(err)}, 400)
+    return jsonify(status)
+
+
+@BLUEPRINT.route('/csv/uploads/<upload_id>/commit', methods=['POST'])
+def commit_upload(upload_id: str):
+    """
+    Ingests an upload once all of its chunks were received. The total amount of chunks is informed as
+    {"chunks": ...}.
+    """
+    controller = UploadController(current_app._get_current_object())
+    if controller.get_status(upload_id) is None:
+        return create_error_response({'message': 'Not found'}, 404)
+
+    chunks = (request.get_json(silent=True) or {}).get('chunks')
+    if not isinstance(chunks, int) or chunks < 0:
+        return create_error_response({'message': 'Please inform the amount of chunks'}, 400)
+
+    try:
+        status = controller.commit(upload_id, chunks)
+    except UploadConflictException as err:
+        return create_error_response({'message': str(err)}, 409)
+    except InvalidRowsException as err:
+        return create_error_response(err.to_dict(), 400)
+    except EmployeeControllerException as err:
+        return create_error_response({'message': str(err)}, 400)
+    return jsonify(status)
+
+
 @BLUEPRINT.route('/report', methods=['GET'])
 def process_report():
     """
     Returns payment-related information for all employees based on time periods.
+    Accepts the employeeId, startDate and endDate filters, plus limit and cursor for keyset pagination. Paginated
+    reports carry a "nextCursor", to be sent back as the cursor of the following page.
+    With `since=<watermark>`, only the periods touched by reports ingested later are returned (with their whole
+    amounts), along with a "watermark" to be sent as the `since` of the next delta report. `since=0` returns every
+    period.
+    Responses carry an ETag derived from the data version, and are served from the report cache when possible.
+    Reports are read from a replica in `Config.Database.REPLICA_URIS` once it caught up with that data version.
+    When `Config.Report.STREAM` is set, the report is written out in chunks as rows are read from the database.
+    Reports are gzip-compressed on the fly for clients accepting it, unless `Config.Report.GZIP_LEVEL` is 0.
     """
-    controller = EmployeeController()
     try:
-        report = controller.generate_report()
-    except EmployeeControllerException as err:
+        report_query = parse_report_query(request.args, Config.Report.MAX_PAGE_SIZE)
+    except ReportQueryException as err:
         return create_error_response({'message': str(err)}, 400)
 
-    return {'payrollReport': {'employeeReports': report}}
+    controller = EmployeeController()
+    version = controller.get_data_version()
+    etag = ReportCache.make_etag(version, (
+        f'{Config.Report.ENGINE}:{Config.Report.PAY_SCHEDULE}:{Config.Report.PAY_SCHEDULE_ANCHOR}'
+        f'?{sorted(request.args.items(multi=True))}'
+    ))
+    compress = Config.Report.GZIP_LEVEL > 0 and request.accept_encodings['gzip'] > 0
+    # Compressed and uncompressed bodies are different representations, so they need different tags
+    response_etag = f'{etag}-gzip' if compress else etag
+    if response_etag in request.if_none_match:
+        response = Response(status=304)
+    elif Config.Report.STREAM:
+        response = _stream_report(controller, report_query, version, etag)
+    else:
+        response = _build_report(controller, report_query, version, etag)
+
+    if response.status_code == 200 and compress:
+        _compress_response(response)
+    if response.status_code in (200, 304):
+        response.set_etag(response_etag)
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def _compress_response(response: Response):
+    """
+    Gzip-compresses a response body in place. Streamed bodies are compressed chunk by chunk as they are sent.
+    """
+    if response.is_streamed:
+        response.response = iter_gzip(response.response, Config.Report.GZIP_LEVEL)
+    else:
+        response.set_data(gzip.compress(response.get_data(), Config.Report.GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+
+
+def _build_report(controller: EmployeeController, report_query: ReportQuery, version: str, etag: str) -> Response:
+    """
+    Builds the whole report response in memory.
+    """
+    cache = get_report_cache()
+    content = cache.get(version, etag) if cache else None
+    if content is None:
+        controller = controller.get_read_controller(version)
+        watermark = controller.get_report_watermark() if report_query.since is not None else None
+        try:
+            report = controller.generate_report(report_query)
+        except EmployeeControllerException as err:
+            return create_error_response({'message': str(err)}, 400)
+
+        data = {'employeeReports': report}
+        if report_query.limit is not None:
+            data['nextCursor'] = get_next_cursor(report[-1] if report else None, len(report), report_query.limit)
+        if watermark is not None:
+            data['watermark'] = watermark
+        content = json.dumps({'payrollReport': data}).encode('UTF-8')
+        if cache:
+            cache.set(version, etag, content)
+
+    return Response(content, mimetype='application/json')
+
+
+def _stream_report(controller: EmployeeController, report_query: ReportQuery, version: str, etag: str) -> Response:
+    """
+    Builds a chunked report response, storing it in the report cache as it is sent.
+    """
+    cache = get_report_cache()
+    chunks = cache.iter_content(version, etag) if cache else None
+    if chunks is None:
+        controller = controller.get_read_controller(version)
+        watermark = controller.get_report_watermark() if report_query.since is not None else None
+        try:
+            entries = controller.iter_report(report_query)
+        except EmployeeControllerException as err:
+            return create_error_response({'message': str(err)}, 400)
+
+        chunks = iter_report_json(entries, Config.Report.CHUNK_SIZE, report_query.limit, watermark)
+        if cache:
+            chunks = cache.tee(version, etag, chunks)
+
+    return Response(stream_with_context(chunks), mimetype='application/json')
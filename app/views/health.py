@@ -6,6 +6,8 @@ import datetime
 
 from flask import Blueprint, jsonify
 
+from app.database import get_pool_status
+
 
 BLUEPRINT = Blueprint('health', __name__, url_prefix='/health')
 
@@ -19,4 +21,5 @@ def health_check():
         'status': 'ok',
         'host': os.getenv('HOSTNAME'),
         'timestamp': datetime.datetime.now().timestamp(),
+        'databasePool': get_pool_status(),
     })
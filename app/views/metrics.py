@@ -0,0 +1,19 @@
+"""
+Metrics blueprint, exposing Prometheus metrics.
+"""
+from flask import Blueprint, Response
+
+from app.metrics import generate_metrics
+
+
+BLUEPRINT = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+
+@BLUEPRINT.route('', methods=['GET'])
+def get_metrics():
+    """
+    Returns the metrics of every worker process, in the Prometheus text format.
+    """
+    metrics = generate_metrics()
+    from prometheus_client import CONTENT_TYPE_LATEST  # Only imported once the metrics are set up
+    return Response(metrics, content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the CSV ingest and the payroll report.
+
+Run with `python -m benchmarks --help`.
+"""
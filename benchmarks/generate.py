@@ -0,0 +1,75 @@
+"""
+Synthetic time report generator.
+
+Usage: `python -m benchmarks.generate --rows 100000 --employees 500 --output time-report-99.csv`
+"""
+import argparse
+import datetime
+import random
+
+from typing import Dict, Optional, TextIO
+
+
+def generate_time_report(output: TextIO, rows: int, employees: int = 100,
+                         start_date: datetime.date = datetime.date(2020, 1, 1), days: int = 365,
+                         job_groups: Optional[Dict[str, float]] = None, seed: int = 0):
+    """
+    Writes a synthetic time report, in the same format as the uploaded "time-report-{id}.csv" files.
+    The output only depends on the arguments, so runs with the same seed are comparable.
+
+    Args:
+        - output (TextIO): Text stream to write the CSV into;
+        - rows (int): Amount of work units;
+        - employees (int): Amount of distinct employees;
+        - start_date (datetime.date): First date of the work units;
+        - days (int): Amount of days the work units are spread over;
+        - job_groups (Optional[Dict[str, float]]): Relative weight of each job group among employees.
+                                                   Defaults to as many A as B;
+        - seed (int): Random seed.
+    """
+    job_groups = job_groups or {'A': 1, 'B': 1}
+    rng = random.Random(seed)
+    groups = rng.choices(list(job_groups), weights=list(job_groups.values()), k=employees)
+    dates = [(start_date + datetime.timedelta(days=offset)).strftime('%d/%m/%Y') for offset in range(days)]
+
+    output.write('date,hours worked,employee id,job group\n')
+    for _ in range(rows):
+        employee_index = rng.randrange(employees)
+        hours = rng.randrange(1, 49) / 4
+        output.write(f'{rng.choice(dates)},{hours},{employee_index + 1},{groups[employee_index]}\n')
+
+
+def parse_job_groups(value: str) -> Dict[str, float]:
+    """
+    Parses a job group mix such as "A=3,B=1".
+
+    Args:
+        - value (str): Comma-separated group=weight pairs.
+
+    Returns:
+        - (Dict[str, float]): Weight by job group.
+    """
+    try:
+        return {group: float(weight) for group, weight in (pair.split('=') for pair in value.split(','))}
+    except ValueError:
+        raise argparse.ArgumentTypeError('Please inform the job groups as "A=1,B=1"')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates a synthetic time report.')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--employees', type=int, default=100)
+    parser.add_argument('--start-date', type=lambda value: datetime.datetime.strptime(value, '%Y-%m-%d').date(),
+                        default=datetime.date(2020, 1, 1))
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--job-groups', type=parse_job_groups, default={'A': 1, 'B': 1})
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help='Path of the file, i.e. "time-report-99.csv"')
+    args = parser.parse_args()
+
+    with open(args.output, 'w', newline='') as output:
+        generate_time_report(output, args.rows, args.employees, args.start_date, args.days, args.job_groups, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Startup benchmark: measures how long a fresh process takes to import and build the application, which every gunicorn
+worker pays on boot unless the app is preloaded in the master process.
+
+Each run happens in a new interpreter, so nothing is cached in `sys.modules`, and is repeated with and without the
+schema creation of `Config.Database.CREATE_SCHEMA`.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Dict, List
+
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ran by each measured process; reports its own timings as JSON
+STARTUP_SCRIPT = '''
+import json
+import time
+
+started = time.perf_counter()
+from app.setup import create_app
+imported = time.perf_counter()
+create_app()
+print(json.dumps({'importSeconds': imported - started, 'createAppSeconds': time.perf_counter() - imported}))
+'''
+
+
+def measure_startup(database_uri: str, create_schema: bool) -> Dict[str, float]:
+    """
+    Starts a new interpreter that builds the application against a database.
+
+    Args:
+        - database_uri (str): Connection string of the database;
+        - create_schema (bool): Whether the tables are created on boot.
+
+    Returns:
+        - (Dict[str, float]): Time spent importing the app, building it, and running the whole process.
+    """
+    env = dict(os.environ, DB_URI=database_uri, DB_CREATE_SCHEMA=str(create_schema).lower())
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=ROOT_DIRECTORY, env=env, check=True,
+                            stdout=subprocess.PIPE).stdout
+    timings = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+    timings['processSeconds'] = time.perf_counter() - started
+    return timings
+
+
+def run_startup(database_uri: str, database: str, repeat: int = 3) -> List[Dict[str, any]]:
+    """
+    Measures the startup time with and without schema creation, reporting the median of each.
+
+    Args:
+        - database_uri (str): Connection string of the database to run against;
+        - database (str): Name of the database, as reported in the results;
+        - repeat (int): Runs per measurement.
+
+    Returns:
+        - (List[Dict[str, any]]): One result per measurement.
+    """
+    # The schema is created upfront, so both measurements see the same database
+    measure_startup(database_uri, create_schema=True)
+    results = []
+    for create_schema in (True, False):
+        runs = [measure_startup(database_uri, create_schema) for _ in range(repeat)]
+        result = {'name': 'startup', 'database': database, 'createSchema': create_schema}
+        for field in ('importSeconds', 'createAppSeconds', 'processSeconds'):
+            result[field] = round(statistics.median(run[field] for run in runs), 6)
+        result['seconds'] = result['processSeconds']
+        results.append(result)
+    return results
@@ -1,3 +1,57 @@
+from app.config import Config
+
 bind = "0.0.0.0:5000"
-workers = 4
+# Each worker also has an ingest process pool of `Config.Ingest.PROCESSES`, which defaults to its share of the CPUs
+workers = Config.WORKERS
 timeout = 30
+# Imports and builds the app once in the master process, so workers are forked ready to serve and share its memory
+preload_app = True
+
+
+def on_starting(server):
+    """
+    Clears the metrics left by previous runs, before any worker starts writing its own, and fails the ingest jobs the
+    workers of previous runs did not finish.
+    """
+    from app.config import Config
+    from app.controllers.ingest_jobs import IngestJobStore
+    from app.metrics import clear_metrics_directory
+    clear_metrics_directory()
+    IngestJobStore(Config.Ingest.SPOOL_DIRECTORY).fail_orphaned_jobs()
+
+
+def pre_fork(server, worker):
+    """
+    Moves the objects of the preloaded app out of the garbage collector's reach, so collections in the workers do not
+    touch (and copy) the memory pages they share with the master process.
+    """
+    import gc
+    if hasattr(gc, 'freeze'):  # Python 3.7+
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Drops any database connection inherited from the master process, and restarts the log listener thread, which is
+    not carried over by the fork.
+    """
+    from app.database import dispose_engines
+    from app.logging import restart_log_listener
+    dispose_engines()
+    restart_log_listener()
+
+
+def child_exit(server, worker):
+    """
+    Drops the live gauges of a worker that exited.
+    """
+    from app.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """
+    Stops the ingest process pool of an exiting worker.
+    """
+    from app.controllers.batch_ingest import terminate_pool
+    terminate_pool()
@@ -1,4 +1,8 @@
 #!/bin/bash
+set -e
+
+# Tables are created once here, instead of by every worker on boot
+FLASK_APP=run.py flask create-schema
 
 if [ "${ENVIRONMENT:=development}" = "development" ]; then
   python run.py
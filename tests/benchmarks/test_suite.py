@@ -0,0 +1,76 @@
+"""
+Test module for the benchmark suite.
+"""
+import csv
+import io
+import pytest
+
+from app.config import Config
+from benchmarks.generate import generate_time_report
+from benchmarks.startup import run_startup
+from benchmarks.suite import check_thresholds, main, run_suite
+
+
+def test_generate_time_report():
+    """ Default test case for generate_time_report """
+    output = io.StringIO()
+    generate_time_report(output, rows=200, employees=5, days=10, job_groups={'A': 1, 'B': 0}, seed=1)
+    rows = list(csv.reader(io.StringIO(output.getvalue())))
+
+    assert rows[0] == ['date', 'hours worked', 'employee id', 'job group']
+    assert len(rows) == 201
+    assert {row[3] for row in rows[1:]} == {'A'}
+    assert {int(row[2]) for row in rows[1:]} <= {1, 2, 3, 4, 5}
+    assert len({row[0] for row in rows[1:]}) <= 10
+
+    same_seed = io.StringIO()
+    generate_time_report(same_seed, rows=200, employees=5, days=10, job_groups={'A': 1, 'B': 0}, seed=1)
+    assert same_seed.getvalue() == output.getvalue()
+
+
+def test_check_thresholds():
+    """ Default test case for check_thresholds """
+    results = [
+        {'name': 'ingest', 'rows': 10, 'rowsPerSecond': 100},
+        {'name': 'report', 'engine': 'sql', 'rows': 10, 'seconds': 2},
+        {'name': 'report', 'engine': 'totals', 'rows': 10, 'seconds': 0.5},
+    ]
+    assert check_thresholds(results, [{'name': 'ingest', 'min': {'rowsPerSecond': 50}}]) == []
+    assert len(check_thresholds(results, [{'name': 'ingest', 'min': {'rowsPerSecond': 500}}])) == 1
+    assert len(check_thresholds(results, [{'name': 'report', 'max': {'seconds': 1}}])) == 1
+    assert check_thresholds(results, [{'name': 'report', 'engine': 'totals', 'max': {'seconds': 1}}]) == []
+
+
+def test_run_suite(tmp_path):
+    """ Default test case for run_suite, on a SQLite database of its own """
+    engine = Config.Report.ENGINE
+    results = run_suite(f'sqlite:///{tmp_path / "benchmark.db"}', [50], ['sql', 'totals'], repeat=1, reset=True)
+
+    assert [(result['name'], result.get('engine')) for result in results] == [
+        ('ingest', None), ('report', 'sql'), ('report', 'totals'),
+    ]
+    assert results[0]['rowsPerSecond'] > 0
+    assert results[1]['entries'] == results[2]['entries'] > 0
+    assert Config.Report.ENGINE == engine
+
+
+def test_run_suite_without_reset(tmp_path):
+    """ Test case for the benchmark suite refusing to drop the tables of a database not confirmed with reset """
+    database_uri = f'sqlite:///{tmp_path / "kept.db"}'
+    with pytest.raises(ValueError):
+        run_suite(database_uri, [50], ['sql'], repeat=1)
+    with pytest.raises(SystemExit) as err:
+        main(['--database', database_uri, '--scales', '50'])
+    assert err.value.code == 2
+    assert not (tmp_path / 'kept.db').exists()
+
+
+def test_run_startup(tmp_path):
+    """ Default test case for run_startup, with and without schema creation on boot """
+    database_uri = f'sqlite:///{tmp_path / "startup.db"}'
+    results = run_startup(database_uri, 'sqlite', repeat=1)
+
+    assert [(result['name'], result['createSchema']) for result in results] == [
+        ('startup', True), ('startup', False),
+    ]
+    assert all(0 < result['importSeconds'] < result['seconds'] for result in results)
@@ -0,0 +1,14 @@
+"""
+Shared test fixtures.
+"""
+import pytest
+
+from app.database import create_schema
+from app.setup import create_app
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database_schema():
+    """ Creates the tables of the test database once, as the application no longer does it on boot """
+    with create_app().app_context():
+        create_schema()
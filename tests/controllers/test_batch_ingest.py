@@ -0,0 +1,108 @@
+"""
+Test module for the BatchIngestController.
+"""
+import io
+import pytest
+import tarfile
+import zipfile
+
+from werkzeug.datastructures import FileStorage
+
+from app.config import Config
+from app.controllers import batch_ingest
+from app.controllers.batch_ingest import BatchIngestController, terminate_pool
+from app.controllers.employees import EmployeeControllerException
+from app.models.employees import (
+    Employee, EmployeeWorkReport, EmployeeWorkReportIngest, EmployeeWorkUnit, PayrollPeriodTotal,
+    PayrollPeriodTotalsSchedule,
+)
+from app.reports.pay_calendar import get_pay_calendar
+
+from tests import BaseTestController
+
+
+def _csv(*rows):
+    """ Builds the content of a time report """
+    return '\n'.join(['date,hours worked,employee id,job group'] + list(rows)).encode('UTF-8')
+
+
+class TestBatchIngestController(BaseTestController):
+    """
+    Test encapsulator for BatchIngestController.
+    """
+    def _clean_db_queries(self):
+        """ Queries for cleaning the db at class teardown """
+        self.session.query(Employee).delete()
+        self.session.query(EmployeeWorkReportIngest).delete()
+        self.session.query(EmployeeWorkReport).delete()
+        self.session.query(EmployeeWorkUnit).delete()
+        self.session.query(PayrollPeriodTotal).delete()
+        self.session.merge(PayrollPeriodTotalsSchedule(id=1, signature=get_pay_calendar().schedule.signature))
+
+    @pytest.mark.parametrize('filenames, expected_result', [
+        (['time-report-1.csv'], False),
+        (['time-report-1.csv', 'time-report-2.csv'], True),
+        (['drop.zip'], True),
+        (['drop.TAR.GZ'], True),
+    ])
+    def test_is_batch(self, filenames, expected_result):
+        """ Default test case for BatchIngestController::is_batch """
+        sources = [FileStorage(io.BytesIO(b''), filename=filename) for filename in filenames]
+        assert BatchIngestController.is_batch(sources) == expected_result
+
+    @pytest.mark.parametrize('processes', [1, 2])
+    def test_process(self, monkeypatch, processes):
+        """ Default test case for BatchIngestController::process, in the current process and in a process pool """
+        monkeypatch.setattr(Config.Ingest, 'PROCESSES', processes)
+        zip_content = io.BytesIO()
+        with zipfile.ZipFile(zip_content, 'w') as archive:
+            archive.writestr('drop/time-report-32.csv', _csv('12/10/2021,1,4,B'))
+            archive.writestr('drop/', b'')
+        zip_content.seek(0)
+
+        tar_content = io.BytesIO()
+        with tarfile.open(fileobj=tar_content, mode='w:gz') as archive:
+            content = _csv('12/10/2021,2,5,A')
+            member = tarfile.TarInfo('../time-report-33.csv')
+            member.size = len(content)
+            archive.addfile(member, io.BytesIO(content))
+        tar_content.seek(0)
+
+        sources = [
+            FileStorage(io.BytesIO(_csv('12/10/2021,3.5,3,A', '19/10/2021,2,3,A')), filename='time-report-30.csv'),
+            FileStorage(io.BytesIO(_csv('12/10/2021,1,3,A')), filename='time-report-31.csv'),
+            FileStorage(io.BytesIO(_csv('12/10/2021,3.5,3,A', '19/10/2021,2,3,A')), filename='time-report-30.csv'),
+            FileStorage(zip_content, filename='drop.zip'),
+            FileStorage(tar_content, filename='drop.tar.gz'),
+        ]
+        results = BatchIngestController(self.app).process(sources)
+
+        # Either copy of report 30 may be ingested first when running in a pool
+        assert [result['filename'] for result in results] == [
+            'time-report-30.csv', 'time-report-31.csv', 'time-report-30.csv',
+            'time-report-32.csv', 'time-report-33.csv',
+        ]
+        assert sorted((result['filename'], result['status']) for result in results) == [
+            ('time-report-30.csv', 'failed'),
+            ('time-report-30.csv', 'processed'),
+            ('time-report-31.csv', 'processed'),
+            ('time-report-32.csv', 'processed'),
+            ('time-report-33.csv', 'processed'),
+        ]
+        with self.app.app_context():
+            assert EmployeeWorkReport.query.count() == 4
+            assert EmployeeWorkUnit.query.count() == 5
+            assert Employee.query.count() == 3
+
+        if processes > 1:
+            pool = batch_ingest._POOL
+            terminate_pool()
+            assert batch_ingest._POOL is None
+            with pytest.raises(ValueError):
+                pool.apply(int)
+
+    def test_process_invalid_archive(self):
+        """ Test case for BatchIngestController::process when an archive can not be read """
+        sources = [FileStorage(io.BytesIO(b'not an archive'), filename='drop.zip')]
+        with pytest.raises(EmployeeControllerException):
+            BatchIngestController(self.app).process(sources)
@@ -1,15 +1,33 @@
 """
 Test module for the EmployeeController.
 """
+import bz2
+import concurrent.futures
 import csv
 import datetime
+import gzip
 import io
+import lzma
 import pytest
 
+from sqlalchemy import event
 from werkzeug.datastructures import FileStorage
 
-from app.controllers.employees import EmployeeController, EmployeeControllerException
-from app.models.employees import Employee, EmployeeWorkReport, EmployeeWorkUnit
+from app.config import Config
+from app.controllers import employees
+from app.controllers.employees import (
+    EmployeeController, EmployeeControllerException, InvalidRowsException, RowValidator, WorkUnitRow,
+)
+from app.database import DATABASE
+from app.models.employees import (
+    Employee, EmployeeWorkReport, EmployeeWorkReportIngest, EmployeeWorkUnit, PayrollPeriodTotal,
+    PayrollPeriodTotalsSchedule,
+)
+from app.reports.columnar import ColumnarStore
+from app.reports.engines import ENGINES
+from app.reports.pay_calendar import get_pay_calendar
+from app.reports.query import ReportQuery
+from app.setup import create_app
 
 from tests import BaseTestController
 
@@ -21,8 +39,11 @@ class TestBaseVerifiedUserController(BaseTestController):
     def _clean_db_queries(self):
         """ Queries for cleaning the db at class teardown """
         self.session.query(Employee).delete()
+        self.session.query(EmployeeWorkReportIngest).delete()
         self.session.query(EmployeeWorkReport).delete()
         self.session.query(EmployeeWorkUnit).delete()
+        self.session.query(PayrollPeriodTotal).delete()
+        self.session.merge(PayrollPeriodTotalsSchedule(id=1, signature=get_pay_calendar().schedule.signature))
 
     def _get_controller(self):
         """ Returns an instance of EmployeeController """
@@ -139,8 +160,8 @@ class TestBaseVerifiedUserController(BaseTestController):
             ],
         ),
     ])
-    def test_generate_report(self, employees, work_reports, work_units, expected_result):
-        """ Default EmployeeController::generate_report """
+    def test_generate_report(self, monkeypatch, tmp_path, employees, work_reports, work_units, expected_result):
+        """ Default EmployeeController::generate_report, for every report engine """
         with self.app.app_context():
             for employee in employees:
                 self.session.add(employee)
@@ -152,8 +173,296 @@ class TestBaseVerifiedUserController(BaseTestController):
             for work_unit in work_units:
                 self.session.add(work_unit)
             self.session.flush()
+            self._get_controller().rebuild_period_totals()
+            monkeypatch.setattr(Config.Columnar, 'DIRECTORY', str(tmp_path))
+            self._get_controller().rebuild_columnar_store()
 
-            assert self._get_controller().generate_report() == expected_result
+            for engine in ENGINES:
+                monkeypatch.setattr(Config.Report, 'ENGINE', engine)
+                assert self._get_controller().generate_report() == expected_result
+
+    @pytest.mark.parametrize('report_query, expected_result', [
+        (ReportQuery(employee_id=2), [('2', '2020-04-16'), ('2', '2021-10-01')]),
+        (
+            ReportQuery(start_date=datetime.date(2021, 10, 10)),
+            [('1', '2021-10-01'), ('2', '2021-10-01'), ('3', '2021-10-16')],
+        ),
+        (
+            ReportQuery(start_date=datetime.date(2021, 10, 10), end_date=datetime.date(2021, 10, 10)),
+            [('1', '2021-10-01'), ('2', '2021-10-01')],
+        ),
+        (ReportQuery(end_date=datetime.date(2020, 4, 16)), [('2', '2020-04-16')]),
+        (ReportQuery(limit=2), [('1', '2021-10-01'), ('2', '2020-04-16')]),
+        (ReportQuery(after=(2, datetime.date(2020, 4, 16)), limit=2), [('2', '2021-10-01'), ('3', '2021-10-16')]),
+        (ReportQuery(after=(3, datetime.date(2021, 10, 16))), []),
+    ])
+    def test_generate_report_filtered(self, monkeypatch, tmp_path, report_query, expected_result):
+        """ Test case for EmployeeController::generate_report with filters and pagination, for every engine """
+        with self.app.app_context():
+            self.session.add_all([Employee(id=1, job_group='A'), Employee(id=2, job_group='B'),
+                                  Employee(id=3, job_group='B'), EmployeeWorkReport(id=1)])
+            self.session.flush()
+            self.session.add_all([
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=2.5, date=datetime.date(2021, 10, 4)),
+                EmployeeWorkUnit(report_id=1, employee_id=2, hours_worked=2.5, date=datetime.date(2021, 10, 4)),
+                EmployeeWorkUnit(report_id=1, employee_id=2, hours_worked=5, date=datetime.date(2020, 4, 18)),
+                EmployeeWorkUnit(report_id=1, employee_id=3, hours_worked=0, date=datetime.date(2021, 10, 1)),
+                EmployeeWorkUnit(report_id=1, employee_id=3, hours_worked=1, date=datetime.date(2021, 10, 20)),
+            ])
+            self.session.flush()
+            self._get_controller().rebuild_period_totals()
+            monkeypatch.setattr(Config.Columnar, 'DIRECTORY', str(tmp_path))
+            self._get_controller().rebuild_columnar_store()
+
+            for engine in ENGINES:
+                monkeypatch.setattr(Config.Report, 'ENGINE', engine)
+                report = self._get_controller().generate_report(report_query)
+                assert [(entry['employeeId'], entry['payPeriod']['startDate']) for entry in report] == expected_result
+
+    @pytest.mark.parametrize('report_query, expected_result', [
+        (ReportQuery(), [('2021-10-01', '$60.00'), ('2021-10-16', '$20.00')]),
+        (ReportQuery(start_date=datetime.date(2021, 10, 15)), [('2021-10-01', '$60.00'), ('2021-10-16', '$20.00')]),
+        (ReportQuery(end_date=datetime.date(2021, 10, 15)), [('2021-10-01', '$60.00')]),
+        (ReportQuery(start_date=datetime.date(2021, 10, 16)), [('2021-10-16', '$20.00')]),
+        (ReportQuery(limit=1), [('2021-10-01', '$60.00')]),
+        (ReportQuery(after=(1, datetime.date(2021, 10, 1))), [('2021-10-16', '$20.00')]),
+        (ReportQuery(after=(1, datetime.date(2021, 10, 15))), [('2021-10-16', '$20.00')]),
+        (ReportQuery(after=(1, datetime.date(2021, 10, 16))), []),
+    ])
+    def test_generate_report_period_boundaries(self, monkeypatch, tmp_path, report_query, expected_result):
+        """ Test case for EmployeeController::generate_report with a unit on the last day of a period """
+        monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'semi-monthly')
+        with self.app.app_context():
+            self.session.add_all([Employee(id=1, job_group='A'), EmployeeWorkReport(id=1)])
+            self.session.flush()
+            self.session.add_all([
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=1, date=datetime.date(2021, 10, 4)),
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=2, date=datetime.date(2021, 10, 15)),
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=1, date=datetime.date(2021, 10, 20)),
+            ])
+            self.session.flush()
+            self._get_controller().rebuild_period_totals()
+            monkeypatch.setattr(Config.Columnar, 'DIRECTORY', str(tmp_path))
+            self._get_controller().rebuild_columnar_store()
+
+            monkeypatch.setattr(Config.Report, 'ENGINE', 'totals')
+            totals_report = self._get_controller().generate_report(report_query)
+            assert [
+                (entry['payPeriod']['startDate'], entry['amountPaid']) for entry in totals_report
+            ] == expected_result
+            for engine in ENGINES:
+                monkeypatch.setattr(Config.Report, 'ENGINE', engine)
+                assert self._get_controller().generate_report(report_query) == totals_report
+
+    def test_report_engines_amount_parity(self, monkeypatch, tmp_path):
+        """ Test case for the Python, NumPy and columnar engines summing non-dyadic amounts to the exact same value """
+        monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'semi-monthly')
+        hours = [7.17, 2.34, 9.36, 8.93, 0.4, 0.35, 5.41, 9.3, 3.84, 2.22, 4.24, 0.38, 2.27, 4.39, 4.96]
+        with self.app.app_context():
+            self.session.add_all([Employee(id=1, job_group='B'), EmployeeWorkReport(id=1)])
+            self.session.flush()
+            self.session.add_all([
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=hours_worked,
+                                 date=datetime.date(2021, 10, day))
+                for day, hours_worked in enumerate(hours, start=1)
+            ])
+            self.session.flush()
+            monkeypatch.setattr(Config.Columnar, 'DIRECTORY', str(tmp_path))
+            self._get_controller().rebuild_columnar_store()
+
+            expected_amount = 0
+            for hours_worked in hours:
+                expected_amount += 30 * hours_worked
+            for engine in ('python', 'numpy', 'columnar'):
+                assert list(ENGINES[engine](self.session).rows()) == [
+                    (1, datetime.date(2021, 10, 1), datetime.date(2021, 10, 15), expected_amount),
+                ]
+
+    @pytest.mark.parametrize('schedule, expected_result', [
+        ('weekly', [('1', '2021-10-04', '$50.00'), ('1', '2021-10-11', '$20.00'), ('2', '2021-10-18', '$30.00')]),
+        ('bi-weekly', [('1', '2021-10-04', '$70.00'), ('2', '2021-10-18', '$30.00')]),
+        ('monthly', [('1', '2021-10-01', '$70.00'), ('2', '2021-10-01', '$30.00')]),
+    ])
+    def test_generate_report_pay_schedules(self, monkeypatch, tmp_path, schedule, expected_result):
+        """ Test case for EmployeeController::generate_report with other pay schedules, for every engine """
+        monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', schedule)
+        with self.app.app_context():
+            self.session.add_all([
+                Employee(id=1, job_group='A'), Employee(id=2, job_group='B'), EmployeeWorkReport(id=1),
+            ])
+            self.session.flush()
+            self.session.add_all([
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=2.5, date=datetime.date(2021, 10, 10)),
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=1, date=datetime.date(2021, 10, 11)),
+                EmployeeWorkUnit(report_id=1, employee_id=2, hours_worked=1, date=datetime.date(2021, 10, 24)),
+            ])
+            self.session.flush()
+            self._get_controller().rebuild_period_totals()
+            monkeypatch.setattr(Config.Columnar, 'DIRECTORY', str(tmp_path))
+            self._get_controller().rebuild_columnar_store()
+
+            for engine in ENGINES:
+                monkeypatch.setattr(Config.Report, 'ENGINE', engine)
+                report = self._get_controller().generate_report()
+                assert [
+                    (entry['employeeId'], entry['payPeriod']['startDate'], entry['amountPaid']) for entry in report
+                ] == expected_result
+
+    def test_generate_report_pay_schedule_changed(self, monkeypatch):
+        """ Test case for the totals engine after the pay schedule changed, until the totals are rebuilt """
+        monkeypatch.setattr(Config.Report, 'ENGINE', 'totals')
+        expected_result = [('1', '2021-10-01', '$60.00'), ('1', '2021-11-01', '$40.00')]
+        with self.app.app_context():
+            controller = self._get_controller()
+            controller.process_rows(1, [
+                WorkUnitRow(1, datetime.date(2021, 10, 4), 2, 'A'), WorkUnitRow(1, datetime.date(2021, 10, 20), 1, 'A'),
+            ])
+            assert PayrollPeriodTotal.query.count() == 2
+
+            monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'monthly')
+            # Totals of the previous schedule are neither added to nor served
+            controller.process_rows(2, [WorkUnitRow(1, datetime.date(2021, 11, 2), 2, 'A')])
+            assert PayrollPeriodTotal.query.count() == 2
+            assert PayrollPeriodTotalsSchedule.query.count() == 0
+            report = controller.generate_report()
+            assert [
+                (entry['employeeId'], entry['payPeriod']['startDate'], entry['amountPaid']) for entry in report
+            ] == expected_result
+
+            # Switching back does not serve them either, as they miss the report ingested in between
+            monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'semi-monthly')
+            assert not controller.are_period_totals_current()
+
+            monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'monthly')
+            controller.rebuild_period_totals()
+            assert controller.are_period_totals_current()
+            assert [
+                (total.period_start, total.amount)
+                for total in PayrollPeriodTotal.query.order_by(PayrollPeriodTotal.period_start)
+            ] == [(datetime.date(2021, 10, 1), 60), (datetime.date(2021, 11, 1), 40)]
+            report = controller.generate_report()
+            assert [
+                (entry['employeeId'], entry['payPeriod']['startDate'], entry['amountPaid']) for entry in report
+            ] == expected_result
+
+    @pytest.mark.parametrize('since, expected_result', [
+        (0, [('1', '2021-10-01', '$100.00'), ('1', '2021-10-16', '$20.00'), ('2', '2021-10-01', '$30.00')]),
+        (1, [('1', '2021-10-01', '$100.00'), ('2', '2021-10-01', '$30.00')]),
+        (2, [('2', '2021-10-01', '$30.00')]),
+        (3, []),
+    ])
+    def test_generate_report_since(self, since, expected_result):
+        """ Test case for EmployeeController::generate_report reporting the periods touched by later reports """
+        with self.app.app_context():
+            self.session.add_all([
+                Employee(id=1, job_group='A'), Employee(id=2, job_group='B'),
+                EmployeeWorkReport(id=1), EmployeeWorkReport(id=2), EmployeeWorkReport(id=3),
+            ])
+            self.session.flush()
+            self.session.add_all([
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=3, date=datetime.date(2021, 10, 4)),
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=1, date=datetime.date(2021, 10, 20)),
+                EmployeeWorkUnit(report_id=2, employee_id=1, hours_worked=2, date=datetime.date(2021, 10, 5)),
+                EmployeeWorkUnit(report_id=3, employee_id=2, hours_worked=1, date=datetime.date(2021, 10, 6)),
+                EmployeeWorkReportIngest(sequence=1, report_id=1),
+                EmployeeWorkReportIngest(sequence=2, report_id=2),
+                EmployeeWorkReportIngest(sequence=3, report_id=3),
+            ])
+            self.session.flush()
+
+            controller = self._get_controller()
+            report = controller.generate_report(ReportQuery(since=since))
+            assert [
+                (entry['employeeId'], entry['payPeriod']['startDate'], entry['amountPaid']) for entry in report
+            ] == expected_result
+            assert controller.get_report_watermark() == 3
+
+    def test_generate_report_since_middle_of_month(self):
+        """ Test case for EmployeeController::generate_report with a delta starting on the last day of a period """
+        with self.app.app_context():
+            self.session.add_all([Employee(id=1, job_group='A'), EmployeeWorkReport(id=1), EmployeeWorkReport(id=2)])
+            self.session.flush()
+            self.session.add_all([
+                EmployeeWorkUnit(report_id=1, employee_id=1, hours_worked=1, date=datetime.date(2021, 10, 20)),
+                EmployeeWorkUnit(report_id=2, employee_id=1, hours_worked=2, date=datetime.date(2021, 10, 15)),
+                EmployeeWorkUnit(report_id=2, employee_id=1, hours_worked=1, date=datetime.date(2021, 10, 31)),
+                EmployeeWorkReportIngest(sequence=1, report_id=1),
+                EmployeeWorkReportIngest(sequence=2, report_id=2),
+            ])
+            self.session.flush()
+
+            controller = self._get_controller()
+            controller.rebuild_period_totals()
+            full_report = controller.generate_report()
+            assert [(entry['payPeriod']['startDate'], entry['amountPaid']) for entry in full_report] == [
+                ('2021-10-01', '$40.00'), ('2021-10-16', '$40.00'),
+            ]
+            assert controller.generate_report(ReportQuery(since=1)) == full_report
+
+    def test_generate_report_since_out_of_order(self):
+        """ Test case for EmployeeController::generate_report with a report ingested after one with a greater id """
+        with self.app.app_context():
+            controller = self._get_controller()
+            controller.process_rows(5, [WorkUnitRow(1, datetime.date(2021, 10, 4), 1, 'A')])
+            watermark = controller.get_report_watermark()
+            controller.process_rows(3, [WorkUnitRow(2, datetime.date(2021, 10, 5), 1, 'B')])
+
+            report = controller.generate_report(ReportQuery(since=watermark))
+            assert [(entry['employeeId'], entry['amountPaid']) for entry in report] == [('2', '$30.00')]
+            assert controller.get_report_watermark() == watermark + 1
+
+    def test_generate_report_unknown_engine(self, monkeypatch):
+        """ Test case for EmployeeController::generate_report when the configured engine does not exist """
+        monkeypatch.setattr(Config.Report, 'ENGINE', 'unknown')
+        with self.app.app_context():
+            with pytest.raises(EmployeeControllerException):
+                self._get_controller().generate_report()
+
+    def test_get_data_version(self):
+        """ Default test case for EmployeeController::get_data_version """
+        with self.app.app_context():
+            controller = self._get_controller()
+            assert controller.get_data_version() == '0.0'
+
+            self.session.add(EmployeeWorkReport(id=7))
+            self.session.flush()
+            assert controller.get_data_version() == '1.7'
+
+    def test_get_read_controller(self, monkeypatch, tmp_path):
+        """ Test case for EmployeeController::get_read_controller using the primary until the replica catches up """
+        with self.app.app_context():
+            assert self._get_controller().get_read_controller('0.0').db_session == self.session
+            self.session.add(EmployeeWorkReport(id=7))
+            self.session.flush()
+            self.session.add(EmployeeWorkReportIngest(sequence=1, report_id=7))
+            self.session.commit()
+
+        monkeypatch.setattr(Config.Database, 'REPLICA_URIS', [f'sqlite:///{tmp_path / "replica.db"}'])
+        app = create_app()
+        replica_engine = app.extensions['db_replicas'][0]
+        DATABASE.metadata.create_all(replica_engine)
+        with app.app_context():
+            controller = self._get_controller()
+            # The replica has not caught up with the primary yet
+            assert controller.get_read_controller(controller.get_data_version()) is controller
+
+        with replica_engine.begin() as connection:
+            connection.execute(EmployeeWorkReport.__table__.insert(), {'id': 7})
+            connection.execute(EmployeeWorkReportIngest.__table__.insert(), {'sequence': 1, 'report_id': 7})
+        with app.app_context():
+            controller = self._get_controller()
+            read_controller = controller.get_read_controller(controller.get_data_version())
+            assert read_controller is not controller
+            assert read_controller.db_session.bind is replica_engine
+            assert read_controller.get_report_watermark() == 1
+
+    def test_get_read_controller_unavailable(self, monkeypatch, tmp_path):
+        """ Test case for EmployeeController::get_read_controller when the replica cannot be reached """
+        monkeypatch.setattr(Config.Database, 'REPLICA_URIS', [f'sqlite:///{tmp_path / "missing" / "replica.db"}'])
+        app = create_app()
+        with app.app_context():
+            controller = self._get_controller()
+            assert controller.get_read_controller(controller.get_data_version()) is controller
 
     def test_process_csv(self):
         """ Default EmployeeController::process_csv """
@@ -189,3 +498,270 @@ class TestBaseVerifiedUserController(BaseTestController):
                     in EmployeeWorkUnit.query.filter_by(employee_id=employee_id, report_id=10)
                 ])
                 assert hours_for_employee_3 == expected_accumulated_hours
+
+    def test_process_rows_concurrent_writes(self):
+        """ Test case for EmployeeController::process_rows with rows written by another ingest in the meantime """
+        date = datetime.date(2021, 10, 12)
+        rows = [WorkUnitRow(3, date, 2, 'A'), WorkUnitRow(4, date, 1, 'B')]
+        with self.app.app_context():
+            controller = self._get_controller()
+            # Employee 3 and its period total were inserted after this ingest read the known employees
+            controller._insert_employees({3: 'A'})
+            controller._write_batch(7, rows[:1], {3: 'A'}, {})
+            controller._update_period_totals({(3, get_pay_calendar().get_key(date)): 40})
+            controller._insert_employees({4: 'B', 3: 'A'})
+            self.session.commit()
+            assert Employee.query.count() == 2
+
+            assert controller.process_rows(9, rows) == 2
+            assert PayrollPeriodTotal.query.filter_by(employee_id=3).one().amount == 80
+
+            with pytest.raises(EmployeeControllerException, match='already processed'):
+                controller.process_rows(9, rows)
+            assert EmployeeWorkUnit.query.filter_by(report_id=9).count() == 2
+
+    def test_insert_employees_conflicting_groups(self):
+        """ Test case for EmployeeController::_insert_employees with an employee stored in another group meanwhile """
+        with self.app.app_context():
+            # Employee 3 was inserted by another ingest after this one read the known employees
+            self.session.add(Employee(id=3, job_group='B'))
+            self.session.commit()
+
+            with pytest.raises(EmployeeControllerException, match='Employee 3 belongs to job group B'):
+                self._get_controller()._insert_employees({3: 'A', 4: 'A'})
+            assert [(employee.id, employee.job_group) for employee in Employee.query] == [(3, 'B')]
+
+    def test_process_csv_inserts_employees_first(self, monkeypatch):
+        """ Test case for EmployeeController::process_csv inserting every new employee at once, in id order """
+        monkeypatch.setattr(Config.Ingest, 'BATCH_SIZE', 2)
+        content = b'date,hours worked,employee id,job group\n' + b''.join(
+            f'1{day}/10/2021,1,{employee_id},A\n'.encode('UTF-8') for day, employee_id in enumerate([5, 2, 9, 1, 2])
+        )
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO employee'):
+                statements.append((statement.split()[2], parameters))
+
+        with self.app.app_context():
+            self.session.add(Employee(id=1, job_group='A'))
+            self.session.commit()
+            engine = self.session.bind
+            event.listen(engine, 'before_cursor_execute', record)
+            try:
+                self._get_controller().process_csv(FileStorage(io.BytesIO(content), filename='time-report-10.csv'))
+            finally:
+                event.remove(engine, 'before_cursor_execute', record)
+
+            assert [table for table, _ in statements] == (
+                ['employee_work_reports', 'employees'] + ['employee_work_units'] * 3 + ['employee_work_report_ingests']
+            )
+            assert [row[0] for row in statements[1][1]] == [2, 5, 9]
+            assert Employee.query.count() == 4
+
+    def test_process_csv_partitioned(self, monkeypatch):
+        """ Test case for EmployeeController::process_csv creating the partitions before the ingest transaction """
+        calls = []
+
+        def ensure_work_unit_partitions(bind, months):
+            calls.append((set(months), self.session().in_transaction(), EmployeeWorkReport.query.count()))
+
+        monkeypatch.setattr(employees, 'WORK_UNITS_PARTITIONED', True)
+        monkeypatch.setattr(employees, 'ensure_work_unit_partitions', ensure_work_unit_partitions)
+        content = b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n02/11/2021,2,3,A\n28/10/2021,1,4,B\n'
+        with self.app.app_context():
+            self._get_controller().process_csv(FileStorage(io.BytesIO(content), filename='time-report-10.csv'))
+            # Partitions were created with no transaction in progress, before the report was claimed
+            assert calls == [({datetime.date(2021, 10, 1), datetime.date(2021, 11, 1)}, False, 0)]
+            assert EmployeeWorkUnit.query.filter_by(report_id=10).count() == 3
+
+            controller = self._get_controller()
+            controller.process_rows(11, [WorkUnitRow(3, datetime.date(2021, 12, 3), 1, 'A')])
+            assert calls[-1][0] == {datetime.date(2021, 12, 1)}
+
+    def test_process_csv_parallel(self):
+        """ Test case for EmployeeController::process_csv ingesting reports sharing employees from several threads """
+        def ingest(report_id):
+            content = '\n'.join(['date,hours worked,employee id,job group'] + [
+                f'{day:02d}/10/2021,1,{employee_id},A' for day in range(1, 29) for employee_id in range(1, 6)
+            ])
+            with self.app.app_context():
+                try:
+                    EmployeeController(db_session=DATABASE.session).process_csv(
+                        FileStorage(io.BytesIO(content.encode('UTF-8')), filename=f'time-report-{report_id}.csv')
+                    )
+                    return 'processed'
+                except EmployeeControllerException as err:
+                    return str(err)
+                finally:
+                    DATABASE.session.remove()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(ingest, [1, 2, 3, 1]))
+
+        assert results[1:3] == ['processed', 'processed']
+        assert sorted([results[0], results[3]]) == ['Source file already processed', 'processed']
+        with self.app.app_context():
+            assert Employee.query.count() == 5
+            assert EmployeeWorkUnit.query.count() == 3 * 28 * 5
+            amounts = {}
+            for total in PayrollPeriodTotal.query:
+                amounts[total.employee_id] = amounts.get(total.employee_id, 0) + total.amount
+            assert amounts == {employee_id: 3 * 28 * 20 for employee_id in range(1, 6)}
+
+    @pytest.mark.parametrize('compress, filename', [
+        (gzip.compress, 'time-report-10.csv.gz'),
+        (bz2.compress, 'time-report-10.csv.bz2'),
+        (lzma.compress, 'time-report-10.csv'),
+    ])
+    def test_process_csv_compressed(self, compress, filename):
+        """ Test case for EmployeeController::process_csv with compressed files """
+        content = b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n19/10/2021,2,3,A\n'
+        source = FileStorage(io.BytesIO(compress(content)), filename=filename)
+
+        with self.app.app_context():
+            self._get_controller().process_csv(source)
+            assert EmployeeWorkUnit.query.filter_by(employee_id=3, report_id=10).count() == 2
+
+    def test_process_csv_compressed_invalid(self):
+        """ Test case for EmployeeController::process_csv with corrupt or unsupported compressed files """
+        content = gzip.compress(b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n')
+        with self.app.app_context():
+            with pytest.raises(EmployeeControllerException):
+                self._get_controller().process_csv(
+                    FileStorage(io.BytesIO(content[:-12]), filename='time-report-10.csv')
+                )
+            with pytest.raises(EmployeeControllerException):
+                self._get_controller().process_csv(FileStorage(
+                    io.BytesIO(content), filename='time-report-10.csv', headers={'Content-Encoding': 'br'},
+                ))
+            assert EmployeeWorkReport.query.count() == 0
+
+    @pytest.mark.parametrize('row, fields', [
+        (['12/10/2021', '3.5', '3', 'A'], []),
+        (['12/10/2021', '3.5', '3'], ['row']),
+        (['2021-10-12', '3.5', '3', 'A'], ['date']),
+        (['30/02/2021', '3.5', '3', 'A'], ['date']),
+        (['12/10/2021', 'abc', '3', 'A'], ['hours worked']),
+        (['12/10/2021', '0', '3', 'A'], []),
+        (['12/10/2021', '-1', '3', 'A'], ['hours worked']),
+        (['12/10/2021', '24.5', '3', 'A'], ['hours worked']),
+        (['12/10/2021', 'nan', '3', 'A'], ['hours worked']),
+        (['12/10/2021', '3.5', '-3', 'A'], ['employee id']),
+        (['12/10/2021', '3.5', '3', 'C'], ['job group']),
+        (['12/10/2021', '3.5', '4', 'A'], ['job group']),
+        (['bad', '', 'x', 'C'], ['date', 'hours worked', 'employee id', 'job group']),
+    ])
+    def test_row_validator(self, row, fields):
+        """ Default test case for RowValidator, with employee 4 stored in job group B """
+        validator = RowValidator({4: 'B'})
+        work_unit = validator.validate(7, row)
+
+        assert [error.field for error in validator.errors] == fields
+        assert all(error.line == 7 for error in validator.errors)
+        assert (work_unit is None) == bool(fields)
+
+    def test_row_validator_conflicting_groups(self, monkeypatch):
+        """ Test case for RowValidator with an employee changing job group within a file """
+        monkeypatch.setattr(Config.Ingest, 'MAX_REPORTED_ERRORS', 1)
+        validator = RowValidator()
+        work_unit = validator.validate(2, ['12/10/2021', '1', '3', 'A'])
+        assert work_unit == WorkUnitRow(3, datetime.date(2021, 10, 12), 1, 'A')
+        assert validator.validate(3, ['13/10/2021', '1', '3', 'B']) is None
+        assert validator.validate(4, ['14/10/2021', '1', '3', 'B']) is None
+
+        with pytest.raises(InvalidRowsException) as err:
+            validator.check()
+        assert err.value.invalid_rows == 2
+        assert err.value.to_dict()['errors'] == [{
+            'line': 3, 'field': 'job group', 'value': 'B', 'message': 'Employee 3 belongs to job group A',
+        }]
+
+    def test_process_csv_invalid_rows(self):
+        """ Test case for EmployeeController::process_csv rejecting a file with invalid rows without writing it """
+        content = b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n13/10/2021,99,3,A\n'
+        with self.app.app_context():
+            with pytest.raises(InvalidRowsException, match='first on line 3'):
+                self._get_controller().process_csv(FileStorage(io.BytesIO(content), filename='time-report-10.csv'))
+            assert EmployeeWorkReport.query.count() == 0
+            assert Employee.query.count() == 0
+
+    def test_process_csv_in_batches(self, monkeypatch):
+        """ Test case for EmployeeController::process_csv when rows span multiple batches and employees exist """
+        monkeypatch.setattr(Config.Ingest, 'BATCH_SIZE', 2)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['date', 'hours worked', 'employee id', 'job group'])
+        writer.writerow(['12/10/2021', '3.5', '3', 'A'])
+        writer.writerow(['19/10/2021', '2', '3', 'A'])
+        writer.writerow(['12/10/2021', '1', '2', 'B'])
+        writer.writerow(['13/10/2021', '4', '1', 'A'])
+        writer.writerow(['14/10/2021', '2', '2', 'B'])
+        source = FileStorage(io.BytesIO(bytes(output.getvalue(), 'UTF-8')), filename='time-report-11.csv')
+
+        with self.app.app_context():
+            self.session.add(Employee(id=1, job_group='A'))
+            self.session.commit()
+            self._get_controller().process_csv(source)
+
+            assert Employee.query.count() == 3
+            assert EmployeeWorkReport.query.get(11) is not None
+            assert EmployeeWorkUnit.query.filter_by(report_id=11).count() == 5
+            assert EmployeeWorkUnit.query.filter_by(employee_id=2).count() == 2
+
+    def test_process_csv_updates_period_totals(self):
+        """ Test case for EmployeeController::process_csv keeping the payroll period totals up to date """
+        sources = [
+            ('time-report-12.csv', [['12/10/2021', '3.5', '3', 'A'], ['19/10/2021', '2', '3', 'A']]),
+            ('time-report-13.csv', [['13/10/2021', '1', '3', 'A'], ['02/10/2021', '2', '4', 'B']]),
+        ]
+        with self.app.app_context():
+            for filename, rows in sources:
+                output = io.StringIO()
+                writer = csv.writer(output)
+                writer.writerow(['date', 'hours worked', 'employee id', 'job group'])
+                writer.writerows(rows)
+                source = FileStorage(io.BytesIO(bytes(output.getvalue(), 'UTF-8')), filename)
+                self._get_controller().process_csv(source)
+
+            ordering = [PayrollPeriodTotal.employee_id, PayrollPeriodTotal.period_start]
+            totals = [
+                (total.employee_id, total.period_start, total.period_end, total.amount)
+                for total in PayrollPeriodTotal.query.order_by(*ordering)
+            ]
+            assert totals == [
+                (3, datetime.date(2021, 10, 1), datetime.date(2021, 10, 15), 90),
+                (3, datetime.date(2021, 10, 16), datetime.date(2021, 10, 31), 40),
+                (4, datetime.date(2021, 10, 1), datetime.date(2021, 10, 15), 60),
+            ]
+
+            self._get_controller().rebuild_period_totals()
+            assert PayrollPeriodTotal.query.count() == 3
+            total = PayrollPeriodTotal.query.get((3, datetime.date(2021, 10, 1), datetime.date(2021, 10, 15)))
+            assert total.amount == 90
+
+    def test_process_csv_appends_columnar_snapshot(self, monkeypatch, tmp_path):
+        """ Test case for EmployeeController::process_csv keeping the columnar snapshot up to date """
+        monkeypatch.setattr(Config.Columnar, 'ENABLED', True)
+        monkeypatch.setattr(Config.Columnar, 'DIRECTORY', str(tmp_path))
+        sources = [
+            ('time-report-14.csv', [['12/10/2021', '3.5', '3', 'A'], ['19/10/2021', '2', '3', 'A']]),
+            ('time-report-15.csv', [['13/10/2021', '1', '3', 'A'], ['02/10/2021', '2', '4', 'B']]),
+        ]
+        with self.app.app_context():
+            for filename, rows in sources:
+                output = io.StringIO()
+                writer = csv.writer(output)
+                writer.writerow(['date', 'hours worked', 'employee id', 'job group'])
+                writer.writerows(rows)
+                source = FileStorage(io.BytesIO(bytes(output.getvalue(), 'UTF-8')), filename)
+                self._get_controller().process_csv(source)
+
+            columns = ColumnarStore(str(tmp_path)).read()
+            assert columns['meta']['count'] == 4
+            assert ColumnarStore.get_version(columns['meta']) == self._get_controller().get_data_version()
+
+            monkeypatch.setattr(Config.Report, 'ENGINE', 'columnar')
+            assert [entry['amountPaid'] for entry in self._get_controller().generate_report()] == [
+                '$90.00', '$40.00', '$60.00',
+            ]
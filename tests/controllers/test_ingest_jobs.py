@@ -0,0 +1,110 @@
+"""
+Test module for the IngestJobController.
+"""
+import io
+import os
+import pytest
+
+from werkzeug.datastructures import FileStorage
+
+from app.controllers.employees import EmployeeControllerException
+from app.controllers.ingest_jobs import IngestJobController, IngestJobStore, JobStatus, ORPHANED_JOB_ERROR
+from app.models.employees import (
+    Employee, EmployeeWorkReport, EmployeeWorkReportIngest, EmployeeWorkUnit, PayrollPeriodTotal,
+    PayrollPeriodTotalsSchedule,
+)
+from app.reports.pay_calendar import get_pay_calendar
+
+from tests import BaseTestController
+
+
+class TestIngestJobController(BaseTestController):
+    """
+    Test encapsulator for IngestJobController.
+    """
+    def _clean_db_queries(self):
+        """ Queries for cleaning the db at class teardown """
+        self.session.query(Employee).delete()
+        self.session.query(EmployeeWorkReportIngest).delete()
+        self.session.query(EmployeeWorkReport).delete()
+        self.session.query(EmployeeWorkUnit).delete()
+        self.session.query(PayrollPeriodTotal).delete()
+        self.session.merge(PayrollPeriodTotalsSchedule(id=1, signature=get_pay_calendar().schedule.signature))
+
+    def _get_controller(self, directory, monkeypatch):
+        """ Returns an instance of IngestJobController that does not schedule jobs in background """
+        controller = IngestJobController(self.app, store=IngestJobStore(str(directory)))
+        monkeypatch.setattr(controller, 'schedule', lambda job_id: None)
+        return controller
+
+    @staticmethod
+    def _get_source(content, filename='time-report-20.csv'):
+        """ Returns a FileStorage for a CSV content """
+        return FileStorage(io.BytesIO(content), filename=filename)
+
+    def test_submit_and_run(self, tmp_path, monkeypatch):
+        """ Default test case for IngestJobController::submit and IngestJobController::run """
+        controller = self._get_controller(tmp_path, monkeypatch)
+        source = self._get_source(b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n19/10/2021,2,3,A\n')
+        with self.app.app_context():
+            status = controller.submit(source)
+        assert status['status'] == JobStatus.QUEUED
+        assert status['reportId'] == 20
+        assert os.path.exists(controller.store.upload_path(status['jobId']))
+
+        controller.run(status['jobId'])
+        status = controller.get_status(status['jobId'])
+        assert status['status'] == JobStatus.SUCCEEDED
+        assert status['rowsProcessed'] == 2
+        assert status['errors'] == []
+        assert not os.path.exists(controller.store.upload_path(status['jobId']))
+        with self.app.app_context():
+            assert EmployeeWorkUnit.query.filter_by(report_id=20).count() == 2
+
+    def test_run_fails(self, tmp_path, monkeypatch):
+        """ Test case for IngestJobController::run when the file cannot be processed """
+        controller = self._get_controller(tmp_path, monkeypatch)
+        source = self._get_source(b'date,hours worked,employee id,job group\n12/10/2021,abc,3,A\n')
+        with self.app.app_context():
+            job_id = controller.submit(source)['jobId']
+
+        controller.run(job_id)
+        status = controller.get_status(job_id)
+        assert status['status'] == JobStatus.FAILED
+        assert len(status['errors']) == 1
+
+    def test_submit_fails(self, tmp_path, monkeypatch):
+        """ Test case for IngestJobController::submit when the report was already processed """
+        controller = self._get_controller(tmp_path, monkeypatch)
+        with self.app.app_context():
+            self.session.add(EmployeeWorkReport(id=20))
+            self.session.commit()
+            with pytest.raises(EmployeeControllerException):
+                controller.submit(self._get_source(b''))
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_get_status_orphaned(self, tmp_path, monkeypatch):
+        """ Test case for IngestJobController::get_status when the process running the job exited """
+        controller = self._get_controller(tmp_path, monkeypatch)
+        with self.app.app_context():
+            status = controller.submit(self._get_source(b'date,hours worked,employee id,job group\n'))
+        assert status['pid'] == os.getpid()
+        assert controller.get_status(status['jobId'])['status'] == JobStatus.QUEUED
+
+        # A pid above the highest one the system hands out
+        orphaned = {**status, 'jobId': 'f' * 32, 'pid': 2 ** 22 + 1}
+        controller.store.save(orphaned)
+        controller.store.fail_orphaned_jobs()
+        assert controller.store.get(orphaned['jobId'])['status'] == JobStatus.FAILED
+        assert controller.store.get(status['jobId'])['status'] == JobStatus.QUEUED
+
+        controller.store.save({**status, 'status': JobStatus.RUNNING, 'pid': 2 ** 22 + 1})
+        status = controller.get_status(status['jobId'])
+        assert status['status'] == JobStatus.FAILED
+        assert status['errors'] == [ORPHANED_JOB_ERROR]
+        assert not os.path.exists(controller.store.upload_path(status['jobId']))
+
+    @pytest.mark.parametrize('job_id', ['unknown', '../../etc/passwd', '0' * 32])
+    def test_get_status_not_found(self, tmp_path, monkeypatch, job_id):
+        """ Test case for IngestJobController::get_status when the job does not exist """
+        assert self._get_controller(tmp_path, monkeypatch).get_status(job_id) is None
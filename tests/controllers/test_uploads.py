@@ -0,0 +1,157 @@
+"""
+Test module for the UploadController.
+"""
+import hashlib
+import io
+import os
+import pytest
+
+from app.controllers.employees import EmployeeControllerException, InvalidRowsException
+from app.controllers.uploads import UploadConflictException, UploadController, UploadStatus
+from app.models.employees import (
+    Employee, EmployeeWorkReport, EmployeeWorkReportIngest, EmployeeWorkUnit, PayrollPeriodTotal,
+    PayrollPeriodTotalsSchedule,
+)
+from app.reports.pay_calendar import get_pay_calendar
+
+from tests import BaseTestController
+
+
+CONTENT = b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n19/10/2021,2,3,A\n20/10/2021,4,4,B'
+
+
+class TestUploadController(BaseTestController):
+    """
+    Test encapsulator for UploadController.
+    """
+    def _clean_db_queries(self):
+        """ Queries for cleaning the db at class teardown """
+        self.session.query(Employee).delete()
+        self.session.query(EmployeeWorkReportIngest).delete()
+        self.session.query(EmployeeWorkReport).delete()
+        self.session.query(EmployeeWorkUnit).delete()
+        self.session.query(PayrollPeriodTotal).delete()
+        self.session.merge(PayrollPeriodTotalsSchedule(id=1, signature=get_pay_calendar().schedule.signature))
+
+    def _create(self, directory, filename='time-report-21.csv'):
+        """ Returns an UploadController and a new upload session """
+        controller = UploadController(self.app, str(directory))
+        with self.app.app_context():
+            status = controller.create(filename)
+        return controller, status
+
+    @staticmethod
+    def _put(controller, upload_id, index, content, checksum=None):
+        """ Sends a chunk along with its checksum """
+        checksum = checksum or hashlib.sha256(content).hexdigest()
+        return controller.put_chunk(upload_id, index, io.BytesIO(content), checksum)
+
+    def test_upload_and_commit(self, tmp_path):
+        """ Default test case for UploadController, with chunks split mid-line and sent out of order """
+        controller, status = self._create(tmp_path)
+        upload_id = status['uploadId']
+        assert status['status'] == UploadStatus.OPEN
+        assert status['reportId'] == 21
+
+        chunks = [CONTENT[:20], CONTENT[20:50], CONTENT[50:]]
+        status = self._put(controller, upload_id, 2, chunks[2])
+        assert status['parsedChunks'] == 0
+
+        status = self._put(controller, upload_id, 0, chunks[0])
+        assert (status['parsedChunks'], status['rowsParsed']) == (1, 0)
+
+        # Chunks can be resent, as long as the content is the same
+        status = self._put(controller, upload_id, 0, chunks[0])
+        assert status['parsedChunks'] == 1
+
+        status = self._put(controller, upload_id, 1, chunks[1])
+        assert (status['parsedChunks'], status['rowsParsed']) == (3, 2)
+
+        status = controller.commit(upload_id, 3)
+        assert status['status'] == UploadStatus.COMMITTED
+        assert status['rowsParsed'] == 3
+        assert status['months'] == ['2021-10-01']
+        assert sorted(os.listdir(tmp_path / upload_id)) == ['lock', 'pending', 'upload.json']
+        with self.app.app_context():
+            assert EmployeeWorkUnit.query.filter_by(report_id=21).count() == 3
+            assert Employee.query.count() == 2
+
+        with pytest.raises(UploadConflictException):
+            self._put(controller, upload_id, 3, b'12/10/2021,1,3,A\n')
+
+    def test_put_chunk_checksum(self, tmp_path):
+        """ Test case for UploadController::put_chunk with missing or wrong checksums """
+        controller, status = self._create(tmp_path)
+        with pytest.raises(EmployeeControllerException):
+            controller.put_chunk(status['uploadId'], 0, io.BytesIO(CONTENT), '')
+        with pytest.raises(EmployeeControllerException):
+            self._put(controller, status['uploadId'], 0, CONTENT, hashlib.sha256(b'other').hexdigest())
+
+        assert controller.get_status(status['uploadId'])['chunks'] == {}
+        assert [name for name in os.listdir(tmp_path / status['uploadId']) if name.endswith('.tmp')] == []
+
+    def test_put_chunk_conflict(self, tmp_path):
+        """ Test case for UploadController::put_chunk replacing a chunk that was already parsed """
+        controller, status = self._create(tmp_path)
+        self._put(controller, status['uploadId'], 0, CONTENT[:50])
+        with pytest.raises(UploadConflictException):
+            self._put(controller, status['uploadId'], 0, CONTENT[:40])
+
+    def test_put_chunk_invalid_row(self, tmp_path):
+        """ Test case for UploadController::put_chunk failing the upload on an invalid row """
+        controller, status = self._create(tmp_path)
+        with pytest.raises(InvalidRowsException, match='first on line 3'):
+            self._put(controller, status['uploadId'], 0, CONTENT[:59] + b'not-a-date,2,3,A\n')
+
+        assert controller.get_status(status['uploadId'])['status'] == UploadStatus.FAILED
+        with pytest.raises(UploadConflictException):
+            controller.commit(status['uploadId'], 1)
+
+    def test_commit_stored_job_groups(self, tmp_path):
+        """ Test case for UploadController::commit failing the upload on employees stored with another job group """
+        controller, status = self._create(tmp_path)
+        with self.app.app_context():
+            self.session.add_all([Employee(id=3, job_group='A'), Employee(id=4, job_group='A')])
+            self.session.commit()
+
+        self._put(controller, status['uploadId'], 0, CONTENT[:40])
+        self._put(controller, status['uploadId'], 1, CONTENT[40:])
+        with pytest.raises(InvalidRowsException) as err:
+            controller.commit(status['uploadId'], 2)
+
+        assert err.value.invalid_rows == 1
+        assert err.value.to_dict()['errors'] == [{
+            'line': 4, 'field': 'job group', 'value': 'B', 'message': 'Employee 4 belongs to job group A',
+        }]
+        status = controller.get_status(status['uploadId'])
+        assert status['status'] == UploadStatus.FAILED
+        assert status['errors'] == ['Line 4, job group "B": Employee 4 belongs to job group A']
+        with self.app.app_context():
+            assert EmployeeWorkReport.query.count() == 0
+            assert EmployeeWorkUnit.query.count() == 0
+
+    def test_commit_missing_chunks(self, tmp_path):
+        """ Test case for UploadController::commit before every chunk is received """
+        controller, status = self._create(tmp_path)
+        self._put(controller, status['uploadId'], 1, CONTENT[50:])
+        with pytest.raises(EmployeeControllerException, match='missing'):
+            controller.commit(status['uploadId'], 2)
+
+        self._put(controller, status['uploadId'], 0, CONTENT[:50])
+        with pytest.raises(EmployeeControllerException, match='missing'):
+            controller.commit(status['uploadId'], 1)
+        assert controller.commit(status['uploadId'], 2)['status'] == UploadStatus.COMMITTED
+
+    def test_create_already_processed(self, tmp_path):
+        """ Test case for UploadController::create with a report that was already processed """
+        with self.app.app_context():
+            self.session.add(EmployeeWorkReport(id=21))
+            self.session.commit()
+
+        with pytest.raises(EmployeeControllerException):
+            self._create(tmp_path)
+
+    @pytest.mark.parametrize('upload_id', ['unknown', '0' * 32, '../uploads'])
+    def test_get_status_not_found(self, tmp_path, upload_id):
+        """ Test case for UploadController::get_status with unknown ids """
+        assert UploadController(self.app, str(tmp_path)).get_status(upload_id) is None
@@ -0,0 +1,66 @@
+"""
+Test module for the work unit partitions.
+"""
+import datetime
+import pytest
+
+from contextlib import contextmanager
+
+from app.models import partitions
+from app.models.partitions import ensure_work_unit_partitions, get_month_bounds, get_partition_ddl
+
+
+@pytest.mark.parametrize('date, expected_result', [
+    (datetime.date(2021, 10, 1), (datetime.date(2021, 10, 1), datetime.date(2021, 11, 1))),
+    (datetime.date(2021, 12, 31), (datetime.date(2021, 12, 1), datetime.date(2022, 1, 1))),
+    (datetime.date(2020, 2, 29), (datetime.date(2020, 2, 1), datetime.date(2020, 3, 1))),
+])
+def test_get_month_bounds(date, expected_result):
+    """ Default test case for get_month_bounds """
+    assert get_month_bounds(date) == expected_result
+
+
+def test_get_partition_ddl():
+    """ Default test case for get_partition_ddl """
+    assert get_partition_ddl(datetime.date(2021, 12, 1)) == (
+        'CREATE TABLE IF NOT EXISTS employee_work_units_2021_12 PARTITION OF employee_work_units '
+        "FOR VALUES FROM ('2021-12-01') TO ('2022-01-01')"
+    )
+
+
+class _RecordingEngine(object):
+    """ Engine recording the statements executed, instead of running them """
+    def __init__(self):
+        self.statements = []
+        self.engine = self
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, *_):
+        self.statements.append(str(statement))
+
+
+def test_ensure_work_unit_partitions(monkeypatch):
+    """ Default test case for ensure_work_unit_partitions """
+    engine = _RecordingEngine()
+    ensure_work_unit_partitions(engine, [datetime.date(2021, 10, 4)])
+    assert engine.statements == []  # Not partitioned on SQLite
+
+    monkeypatch.setattr(partitions, 'WORK_UNITS_PARTITIONED', True)
+    monkeypatch.setattr(partitions, '_KNOWN_MONTHS', set())
+    ensure_work_unit_partitions(engine, [datetime.date(2021, 10, 4), datetime.date(2021, 9, 30),
+                                         datetime.date(2021, 10, 20)])
+    assert engine.statements == [
+        'SELECT pg_advisory_xact_lock(:key)',
+        get_partition_ddl(datetime.date(2021, 9, 1)),
+        get_partition_ddl(datetime.date(2021, 10, 1)),
+    ]
+
+    # Known months are not created again
+    ensure_work_unit_partitions(engine, [datetime.date(2021, 10, 31), datetime.date(2021, 11, 1)])
+    assert engine.statements[3:] == [
+        'SELECT pg_advisory_xact_lock(:key)',
+        get_partition_ddl(datetime.date(2021, 11, 1)),
+    ]
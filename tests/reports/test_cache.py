@@ -0,0 +1,59 @@
+"""
+Test module for the ReportCache.
+"""
+import os
+
+from app.reports.cache import ReportCache
+
+
+def test_make_etag():
+    """ Default test case for ReportCache::make_etag """
+    assert ReportCache.make_etag('1.1', 'totals') == ReportCache.make_etag('1.1', 'totals')
+    assert ReportCache.make_etag('1.1', 'totals') != ReportCache.make_etag('2.2', 'totals')
+    assert ReportCache.make_etag('1.1', 'totals') != ReportCache.make_etag('1.1', 'sql')
+
+
+def test_get_and_set(tmp_path):
+    """ Default test case for ReportCache::get and ReportCache::set """
+    cache = ReportCache(str(tmp_path), max_entries=4)
+    assert cache.get('1.1', 'abc') is None
+
+    cache.set('1.1', 'abc', b'{}')
+    assert cache.get('1.1', 'abc') == b'{}'
+    assert cache.get('2.2', 'abc') is None
+
+
+def test_evict(tmp_path):
+    """ Default test case for ReportCache::evict """
+    cache = ReportCache(str(tmp_path), max_entries=2)
+    cache.set('1.1', 'old', b'1')
+    for index, etag in enumerate(['a', 'b', 'c']):
+        cache.set('2.2', etag, b'2')
+        os.utime(cache._path('2.2', etag), (index, index))
+    cache.evict('2.2')
+
+    assert cache.get('1.1', 'old') is None
+    assert cache.get('2.2', 'a') is None
+    assert cache.get('2.2', 'b') == b'2'
+    assert cache.get('2.2', 'c') == b'2'
+
+    cache.evict()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_tee_and_iter_content(tmp_path):
+    """ Default test case for ReportCache::tee and ReportCache::iter_content """
+    cache = ReportCache(str(tmp_path), max_entries=4)
+    assert cache.iter_content('1.1', 'abc') is None
+
+    chunks = cache.tee('1.1', 'abc', [b'{"a"', b': 1}'])
+    assert next(chunks) == b'{"a"'
+    assert cache.get('1.1', 'abc') is None  # Not visible until every chunk is consumed
+    assert list(chunks) == [b': 1}']
+    assert list(cache.iter_content('1.1', 'abc', chunk_size=3)) == [b'{"a', b'": ', b'1}']
+
+    abandoned = cache.tee('1.1', 'def', [b'{', b'}'])
+    next(abandoned)
+    abandoned.close()
+    assert cache.get('1.1', 'def') is None
+    assert sorted(os.listdir(str(tmp_path))) == ['1.1-abc.json']
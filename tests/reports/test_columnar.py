@@ -0,0 +1,58 @@
+"""
+Test module for the ColumnarStore.
+"""
+import datetime
+import os
+
+from app.reports.columnar import ColumnarStore
+
+
+def test_commit_and_read(tmp_path):
+    """ Default test case for ColumnarWriter::commit and ColumnarStore::read """
+    store = ColumnarStore(str(tmp_path))
+    assert store.read() is None
+
+    writer = store.writer()
+    writer.append([(1, datetime.date(2021, 10, 4), 2.5, 'B'), (2, datetime.date(2021, 10, 5), 1, 'A')])
+    writer.commit([1])
+    writer = store.writer()
+    writer.append([(3, datetime.date(2021, 10, 6), 4, 'A')])
+    writer.commit([5])
+
+    columns = store.read()
+    assert columns['meta']['groups'] == ['B', 'A']
+    assert store.get_version(columns['meta']) == '2.5'
+    assert columns['employee_id'].tolist() == [1, 2, 3]
+    assert columns['date'].tolist() == [738067, 738068, 738069]
+    assert columns['hours_worked'].tolist() == [2.5, 1, 4]
+    assert columns['job_group'].tolist() == [0, 1, 1]
+    assert [name for name in os.listdir(str(tmp_path)) if name.startswith('staging-')] == []
+
+
+def test_commit_drops_uncommitted_rows(tmp_path):
+    """ Test case for ColumnarWriter::commit after an interrupted commit left rows behind """
+    store = ColumnarStore(str(tmp_path))
+    writer = store.writer()
+    writer.append([(1, datetime.date(2021, 10, 4), 2.5, 'A')])
+    writer.commit([1])
+    with open(os.path.join(str(tmp_path), 'employee_id.bin'), 'ab') as column_file:
+        column_file.write(b'\0' * 8)
+
+    writer = store.writer()
+    writer.append([(2, datetime.date(2021, 10, 4), 1, 'A')])
+    writer.commit([2])
+    assert store.read()['employee_id'].tolist() == [1, 2]
+
+
+def test_rebuild(tmp_path):
+    """ Default test case for ColumnarStore::rebuild """
+    store = ColumnarStore(str(tmp_path))
+    writer = store.writer()
+    writer.append([(1, datetime.date(2021, 10, 4), 2.5, 'A')])
+    writer.commit([1])
+
+    store.rebuild([[(7, datetime.date(2021, 1, 1), 3, 'B')], [(8, datetime.date(2021, 1, 2), 1, 'B')]], 2, 9)
+    columns = store.read()
+    assert columns['employee_id'].tolist() == [7, 8]
+    assert columns['meta']['groups'] == ['B']
+    assert store.get_version(columns['meta']) == '2.9'
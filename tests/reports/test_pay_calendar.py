@@ -0,0 +1,77 @@
+"""
+Test module for the pay calendar.
+"""
+import datetime
+import pytest
+
+import numpy as np
+from sqlalchemy import Date, literal
+
+from app.config import Config
+from app.database import DATABASE
+from app.reports.pay_calendar import get_pay_calendar, PayCalendarException
+from app.setup import create_app
+
+
+@pytest.mark.parametrize('schedule, date, expected_bounds', [
+    ('weekly', datetime.date(2021, 10, 6), (datetime.date(2021, 10, 4), datetime.date(2021, 10, 10))),
+    ('weekly', datetime.date(1969, 12, 31), (datetime.date(1969, 12, 29), datetime.date(1970, 1, 4))),
+    ('bi-weekly', datetime.date(2021, 10, 6), (datetime.date(2021, 10, 4), datetime.date(2021, 10, 17))),
+    ('semi-monthly', datetime.date(2021, 8, 5), (datetime.date(2021, 8, 1), datetime.date(2021, 8, 15))),
+    ('semi-monthly', datetime.date(2021, 2, 18), (datetime.date(2021, 2, 16), datetime.date(2021, 2, 28))),
+    ('semi-monthly', datetime.date(2021, 2, 15), (datetime.date(2021, 2, 1), datetime.date(2021, 2, 15))),
+    ('semi-monthly', datetime.date(2021, 2, 16), (datetime.date(2021, 2, 16), datetime.date(2021, 2, 28))),
+    ('monthly', datetime.date(2020, 2, 3), (datetime.date(2020, 2, 1), datetime.date(2020, 2, 29))),
+])
+def test_get_key(monkeypatch, schedule, date, expected_bounds):
+    """ Default test case for PayCalendar::get_key and PayCalendar::get_bounds """
+    monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', schedule)
+    pay_calendar = get_pay_calendar()
+    key = pay_calendar.get_key(date)
+
+    assert pay_calendar.get_bounds(key) == expected_bounds
+    assert pay_calendar.schedule.get_key(date) == key
+    assert pay_calendar.get_strings(key) == tuple(bound.isoformat() for bound in expected_bounds)
+
+
+def test_get_keys():
+    """ Default test case for PayCalendar::get_keys, growing the lookup table on demand """
+    pay_calendar = get_pay_calendar()
+    dates = [datetime.date(2021, 10, 4), datetime.date(2021, 10, 15), datetime.date(1990, 1, 20),
+             datetime.date(2045, 6, 30)]
+    keys = pay_calendar.get_keys(np.array([date.toordinal() for date in dates]))
+    assert keys.tolist() == [pay_calendar.schedule.get_key(date) for date in dates]
+
+
+def test_get_pay_calendar_invalid(monkeypatch):
+    """ Test case for get_pay_calendar when the configured schedule is invalid """
+    monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'daily')
+    with pytest.raises(PayCalendarException):
+        get_pay_calendar()
+
+    monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', 'weekly')
+    monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE_ANCHOR', 'monday')
+    with pytest.raises(PayCalendarException):
+        get_pay_calendar()
+
+
+@pytest.mark.parametrize('schedule', ['weekly', 'bi-weekly', 'semi-monthly', 'monthly'])
+def test_sql_key(monkeypatch, schedule):
+    """ Test case for PaySchedule::sql_key matching PaySchedule::get_key, around the middle and end of the month """
+    monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', schedule)
+    pay_schedule = get_pay_calendar().schedule
+    dates = [datetime.date(2021, 2, day) for day in (1, 14, 15, 16, 28)] + [datetime.date(2020, 12, 31)]
+    with create_app().app_context():
+        keys = [DATABASE.session.query(pay_schedule.sql_key(literal(date, Date))).scalar() for date in dates]
+    assert keys == [pay_schedule.get_key(date) for date in dates]
+
+
+@pytest.mark.parametrize('schedule', ['weekly', 'bi-weekly', 'semi-monthly', 'monthly'])
+def test_get_bounds_contain_date(monkeypatch, schedule):
+    """ Test case for PayCalendar::get_bounds always containing the date its key was resolved from """
+    monkeypatch.setattr(Config.Report, 'PAY_SCHEDULE', schedule)
+    pay_calendar = get_pay_calendar()
+    first_day = datetime.date(2020, 1, 1)
+    for date in (first_day + datetime.timedelta(days=offset) for offset in range(2 * 366)):
+        start, end = pay_calendar.get_bounds(pay_calendar.get_key(date))
+        assert start <= date <= end
@@ -0,0 +1,62 @@
+"""
+Test module for the report query helpers.
+"""
+import datetime
+import pytest
+
+from app.reports.query import get_next_cursor, parse_report_query, ReportQuery, ReportQueryException
+
+
+@pytest.mark.parametrize('args, expected_result', [
+    ({}, ReportQuery()),
+    (
+        {'employeeId': '3', 'startDate': '2021-10-04', 'endDate': '2021-10-20', 'cursor': '2_2021-10-16', 'limit': '5'},
+        ReportQuery(
+            employee_id=3,
+            start_date=datetime.date(2021, 10, 4),
+            end_date=datetime.date(2021, 10, 20),
+            after=(2, datetime.date(2021, 10, 16)),
+            limit=5,
+        ),
+    ),
+    ({'since': '0'}, ReportQuery(since=0)),
+    ({'since': '12'}, ReportQuery(since=12)),
+])
+def test_parse_report_query(args, expected_result):
+    """ Default test case for parse_report_query """
+    assert parse_report_query(args, max_limit=10) == expected_result
+
+
+@pytest.mark.parametrize('args', [
+    {'employeeId': 'abc'},
+    {'startDate': '04/10/2021'},
+    {'startDate': '2021-10-20', 'endDate': '2021-10-04'},
+    {'cursor': '2021-10-16'},
+    {'limit': '0'},
+    {'limit': '11'},
+    {'limit': 'abc'},
+    {'since': '-1'},
+    {'since': 'abc'},
+])
+def test_parse_report_query_fails(args):
+    """ Test case for parse_report_query when arguments are invalid """
+    with pytest.raises(ReportQueryException):
+        parse_report_query(args, max_limit=10)
+
+
+def test_date_bounds():
+    """ Default test case for ReportQuery::date_bounds """
+    assert ReportQuery().date_bounds() == (None, None)
+    report_query = ReportQuery(start_date=datetime.date(2021, 10, 4), end_date=datetime.date(2021, 10, 20))
+    assert report_query.date_bounds() == (datetime.date(2021, 10, 1), datetime.date(2021, 10, 31))
+
+
+@pytest.mark.parametrize('last_entry, count, limit, expected_result', [
+    (None, 0, 2, None),
+    ({'employeeId': '1', 'payPeriod': {'startDate': '2021-10-01'}}, 2, None, None),
+    ({'employeeId': '1', 'payPeriod': {'startDate': '2021-10-01'}}, 1, 2, None),
+    ({'employeeId': '1', 'payPeriod': {'startDate': '2021-10-01'}}, 2, 2, '1_2021-10-01'),
+])
+def test_get_next_cursor(last_entry, count, limit, expected_result):
+    """ Default test case for get_next_cursor """
+    assert get_next_cursor(last_entry, count, limit) == expected_result
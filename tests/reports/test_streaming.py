@@ -0,0 +1,39 @@
+"""
+Test module for the report streaming helpers.
+"""
+import json
+import pytest
+
+from app.reports.streaming import iter_report_json
+
+
+@pytest.mark.parametrize('entries, chunk_size, expected_chunks', [
+    ([], 2, 1),
+    ([{'employeeId': '1'}], 2, 1),
+    ([{'employeeId': str(index)} for index in range(5)], 2, 3),
+])
+def test_iter_report_json(entries, chunk_size, expected_chunks):
+    """ Default test case for iter_report_json """
+    chunks = list(iter_report_json(iter(entries), chunk_size))
+    content = b''.join(chunks)
+
+    assert len(chunks) == expected_chunks
+    assert json.loads(content) == {'payrollReport': {'employeeReports': entries}}
+    assert content.decode('UTF-8') == json.dumps({'payrollReport': {'employeeReports': entries}})
+
+
+def test_iter_report_json_paginated():
+    """ Test case for iter_report_json when a page size is informed """
+    entries = [{'employeeId': '1', 'payPeriod': {'startDate': '2021-10-01'}}]
+    content = b''.join(iter_report_json(iter(entries), 10, limit=1))
+    expected_result = {'payrollReport': {'employeeReports': entries, 'nextCursor': '1_2021-10-01'}}
+    assert content.decode('UTF-8') == json.dumps(expected_result, sort_keys=True)
+
+    content = b''.join(iter_report_json(iter(entries), 10, limit=2))
+    assert json.loads(content)['payrollReport']['nextCursor'] is None
+
+
+def test_iter_report_json_watermark():
+    """ Test case for iter_report_json when a delta report watermark is informed """
+    content = b''.join(iter_report_json(iter([]), 10, watermark=7))
+    assert content.decode('UTF-8') == json.dumps({'payrollReport': {'employeeReports': [], 'watermark': 7}})
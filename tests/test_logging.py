@@ -0,0 +1,106 @@
+"""
+Test module for the logging setup.
+"""
+import json
+import logging
+import pytest
+import structlog
+
+from flask import Request, Response
+
+from app import logging as app_logging
+from app.config import Config
+from app.setup import create_app
+
+
+@pytest.mark.parametrize('response, expected_body', [
+    (Response('{"a": 1}', content_type='application/json'), {'a': 1}),
+    (Response('<p></p>', content_type='text/html'), '<not printable>'),
+    (Response(iter(['{}']), content_type='application/json'), '<streamed>'),
+    (Response('[' + '1, ' * 2000 + '1]', content_type='application/json'), '<6003 bytes>'),
+])
+def test_get_loggable_body(response, expected_body):
+    """ Default test case for get_loggable_body """
+    assert app_logging.get_loggable_body(response) == expected_body
+
+
+def test_get_loggable_body_sampled(monkeypatch):
+    """ Test case for get_loggable_body when bodies are not sampled """
+    monkeypatch.setattr(Config, 'LOG_BODY_SAMPLE_RATE', 0)
+    response = Response('{"a": 1}', content_type='application/json')
+    assert app_logging.get_loggable_body(response) == '<not sampled>'
+
+
+def test_queued_json_logging(monkeypatch, capsys):
+    """ Test case for the production logging mode: JSON records written by the queue listener """
+    monkeypatch.setattr(Config, 'LOG_QUEUE', True)
+    monkeypatch.setattr(Config, 'LOG_FORMAT', 'json')
+    app = create_app()
+    try:
+        with app.test_request_context('/employees/report'):
+            structlog.get_logger('test').info('queued', answer=42)
+        with app.test_request_context('/health'):
+            structlog.get_logger('test').info('health')
+        app_logging._stop_listener()
+
+        records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+        assert [(record['event'], record.get('answer')) for record in records] == [('queued', 42)]
+    finally:
+        monkeypatch.undo()
+        app_logging.configure_logging()
+
+
+def test_queued_logging_level(monkeypatch, capsys):
+    """ Test case for the queue handler dropping the records below `Config.LOG_LEVEL` before enriching them """
+    monkeypatch.setattr(Config, 'LOG_QUEUE', True)
+    monkeypatch.setattr(Config, 'LOG_FORMAT', 'json')
+    monkeypatch.setattr(Config, 'LOG_LEVEL', 'INFO')
+    app = create_app()
+    try:
+        prepared = []
+        queue_handler = logging.getLogger().handlers[0]
+        prepare = queue_handler.prepare
+        monkeypatch.setattr(queue_handler, 'prepare', lambda record: prepared.append(record) or prepare(record))
+        with app.test_request_context('/employees/report'):
+            structlog.get_logger('test').debug('dropped')
+            structlog.get_logger('test').info('kept')
+        app_logging._stop_listener()
+
+        assert len(prepared) == 1
+        assert [json.loads(line)['event'] for line in capsys.readouterr().err.splitlines()] == ['kept']
+    finally:
+        monkeypatch.undo()
+        app_logging.configure_logging()
+
+
+def test_restart_log_listener(monkeypatch, capsys):
+    """ Test case for restart_log_listener, as called in forked workers """
+    monkeypatch.setattr(Config, 'LOG_QUEUE', True)
+    monkeypatch.setattr(Config, 'LOG_FORMAT', 'json')
+    create_app()
+    try:
+        listener = app_logging._LISTENER
+        app_logging.restart_log_listener()
+        assert app_logging._LISTENER is not listener
+        assert app_logging._LISTENER.handlers == listener.handlers
+
+        structlog.get_logger('test').info('restarted')
+        app_logging._stop_listener()
+        records = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+        assert [record['event'] for record in records] == ['restarted']
+    finally:
+        monkeypatch.undo()
+        app_logging.configure_logging()
+
+
+def test_request_context():
+    """ Test case for RequestContext copying the request details, without keeping the request """
+    app = create_app()
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', None, None)
+    with app.test_request_context('/employees/report', method='POST', environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        app.preprocess_request()
+        assert app_logging.RequestContext().filter(record)
+
+    assert record.request[:3] == ('10.0.0.1', 'POST', '/employees/report')
+    assert record.request.elapsed >= 0
+    assert not any(isinstance(value, Request) for value in record.request)
@@ -0,0 +1,60 @@
+"""
+Test module for the Prometheus metrics.
+"""
+import os
+import re
+import subprocess
+import sys
+
+from app.metrics import generate_metrics, record_ingest
+from app.setup import create_app
+
+
+def _get_sample(metrics: str, name: str, labels: str = '') -> float:
+    """ Reads a sample value from metrics in the Prometheus text format """
+    match = re.search(rf'^{re.escape(name)}{re.escape(labels)} (\S+)$', metrics, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_request_metrics():
+    """ Default test case for the request metrics, exposed by the metrics view """
+    client = create_app().test_client()
+    labels = '{method="GET",route="/employees/report",status="200"}'
+    before = _get_sample(generate_metrics().decode(), 'http_request_duration_seconds_count', labels)
+
+    assert client.get('/employees/report').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+
+    metrics = response.get_data(as_text=True)
+    assert _get_sample(metrics, 'http_request_duration_seconds_count', labels) == before + 1
+    assert _get_sample(metrics, 'http_requests_in_flight', '{method="GET",route="/employees/report"}') == 0
+    assert _get_sample(metrics, 'http_request_db_queries_sum', '{route="/employees/report"}') > 0
+    assert _get_sample(metrics, 'db_query_duration_seconds_count') > 0
+
+
+def test_record_ingest():
+    """ Default test case for record_ingest """
+    before = generate_metrics().decode()
+    record_ingest(10, 200, 0.5)
+    after = generate_metrics().decode()
+
+    assert _get_sample(after, 'ingest_rows_total') == _get_sample(before, 'ingest_rows_total') + 10
+    assert _get_sample(after, 'ingest_bytes_total') == _get_sample(before, 'ingest_bytes_total') + 200
+    assert _get_sample(after, 'ingest_rows_per_second_count') == _get_sample(before, 'ingest_rows_per_second_count') + 1
+
+
+def test_metrics_disabled(tmp_path):
+    """ Test case for the metrics leaving the environment and file system untouched when disabled """
+    script = (
+        'import os, sys\n'
+        'from app.setup import create_app\n'
+        'create_app()\n'
+        'print("PROMETHEUS_MULTIPROC_DIR" in os.environ, "prometheus_client" in sys.modules)\n'
+    )
+    env = {key: value for key, value in os.environ.items() if key != 'PROMETHEUS_MULTIPROC_DIR'}
+    env.update(METRICS_ENABLED='false', METRICS_DIRECTORY=str(tmp_path / 'metrics'))
+    output = subprocess.run([sys.executable, '-c', script], env=env, check=True, stdout=subprocess.PIPE).stdout
+
+    assert output.decode().split() == ['False', 'False']
+    assert not (tmp_path / 'metrics').exists()
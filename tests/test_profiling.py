@@ -0,0 +1,80 @@
+"""
+Test module for the request profiling hook.
+"""
+import json
+import os
+
+from app.config import Config
+from app.database import get_db_uri
+from app.profiling import ProfilerMiddleware
+from app.setup import create_app
+
+
+def test_profiling_disabled():
+    """ Test case for the hook being disabled: nothing is installed """
+    app = create_app()
+
+    assert not isinstance(app.wsgi_app, ProfilerMiddleware)
+    assert app.test_client().get('/employees/report', headers={'X-Profile': 'inline'}).status_code == 200
+
+
+def test_profiling_to_directory(monkeypatch, tmp_path):
+    """ Test case for requests profiled to the configured directory """
+    monkeypatch.setattr(Config.Profiling, 'ENABLED', True)
+    monkeypatch.setattr(Config.Profiling, 'DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(Config.Profiling, 'TOKEN', '')
+    monkeypatch.setattr(Config, 'DEBUG', True)
+    client = create_app().test_client()
+
+    assert client.get('/employees/report').status_code == 200
+    assert os.listdir(tmp_path) == []
+
+    response = client.get('/employees/report?profile=1')
+    assert response.status_code == 200
+    assert 'payrollReport' in response.get_json()
+    assert sorted(os.path.splitext(name)[1] for name in os.listdir(tmp_path)) == ['.json', '.prof']
+
+    with open(next(tmp_path.glob('*.json'))) as result_file:
+        result = json.load(result_file)
+    assert result['path'] == '/employees/report'
+    assert result['status'] == '200 OK'
+    assert result['queries'] and all('statement' in query for query in result['queries'])
+
+    # Inline results are only returned to callers sending the token
+    response = client.get('/employees/report', headers={'X-Profile': 'inline'})
+    assert 'payrollReport' in response.get_json()
+
+
+def test_profiling_without_token(monkeypatch, tmp_path):
+    """ Test case for profiling being refused in production when no token is configured """
+    monkeypatch.setattr(Config.Profiling, 'ENABLED', True)
+    monkeypatch.setattr(Config.Profiling, 'DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(Config.Profiling, 'TOKEN', '')
+    monkeypatch.setattr(Config.Database, 'URI', get_db_uri())
+    monkeypatch.setattr(Config, 'DEBUG', False)
+    client = create_app().test_client()
+
+    assert 'payrollReport' in client.get('/employees/report?profile=1').get_json()
+    assert 'payrollReport' in client.get('/employees/report', headers={'X-Profile': 'inline'}).get_json()
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiling_inline(monkeypatch, tmp_path):
+    """ Test case for profiling results returned inline to authorized callers """
+    monkeypatch.setattr(Config.Profiling, 'ENABLED', True)
+    monkeypatch.setattr(Config.Profiling, 'DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(Config.Profiling, 'TOKEN', 'secret')
+    client = create_app().test_client()
+
+    response = client.get('/employees/report', headers={'X-Profile': 'inline', 'X-Profile-Token': 'wrong'})
+    assert 'payrollReport' in response.get_json()
+    response = client.get('/employees/report?profile=1')
+    assert 'payrollReport' in response.get_json()
+    assert os.listdir(tmp_path) == []
+
+    response = client.get('/employees/report', headers={'X-Profile': 'inline', 'X-Profile-Token': 'secret'})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['status'] == '200 OK'
+    assert 'cumulative' in result['stats']
+    assert result['queries']
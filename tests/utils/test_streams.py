@@ -0,0 +1,58 @@
+"""
+Test module for the stream helpers.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import pytest
+
+from app.utils.streams import iter_gzip, iter_text_lines, open_decompressed
+
+
+@pytest.mark.parametrize('data, chunk_size, expected_result', [
+    (b'', 4, []),
+    (b'a,b\nc,d\n', 3, ['a,b\n', 'c,d\n']),
+    (b'a,b\r\nc,d', 4, ['a,b\r\n', 'c,d']),
+    (b'a,b\r\nc,d\r\n', 1, ['a,b\r\n', 'c,d\r\n']),
+    ('é,ç\n'.encode('UTF-8'), 1, ['é,ç\n']),
+])
+def test_iter_text_lines(data, chunk_size, expected_result):
+    """ Default test case for iter_text_lines """
+    assert list(iter_text_lines(io.BytesIO(data), chunk_size=chunk_size)) == expected_result
+
+
+class _NonSeekableStream(io.RawIOBase):
+    """ Readable stream that can not be rewound, like a request body """
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.data.readinto(buffer)
+
+
+@pytest.mark.parametrize('compress', [gzip.compress, bz2.compress, lzma.compress, lambda data: data])
+@pytest.mark.parametrize('seekable', [True, False])
+def test_open_decompressed(compress, seekable):
+    """ Default test case for open_decompressed, detecting the compression from the content """
+    data = b'date,hours worked,employee id,job group\n' * 100
+    stream = io.BytesIO(compress(data)) if seekable else _NonSeekableStream(compress(data))
+    assert open_decompressed(stream).read() == data
+
+
+def test_open_decompressed_encoding():
+    """ Test case for open_decompressed with an informed encoding """
+    assert open_decompressed(io.BytesIO(gzip.compress(b'a,b\n')), 'application/gzip').read() == b'a,b\n'
+    assert open_decompressed(io.BytesIO(b'a,b\n'), 'identity').read() == b'a,b\n'
+    with pytest.raises(ValueError):
+        open_decompressed(io.BytesIO(b'a,b\n'), 'br')
+
+
+def test_iter_gzip():
+    """ Default test case for iter_gzip """
+    chunks = [b'{"payrollReport": ', b'{"employeeReports": []}', b'}']
+    assert gzip.decompress(b''.join(iter_gzip(iter(chunks)))) == b''.join(chunks)
+    assert gzip.decompress(b''.join(iter_gzip([]))) == b''
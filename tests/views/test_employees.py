@@ -0,0 +1,78 @@
+"""
+Test module for the employee views.
+"""
+import gzip
+import hashlib
+import io
+import json
+import pytest
+
+from app.config import Config
+from app.setup import create_app
+
+
+@pytest.mark.parametrize('stream', [True, False])
+def test_process_report_gzip(monkeypatch, stream):
+    """ Test case for the report view compressing responses for clients accepting gzip """
+    monkeypatch.setattr(Config.Report, 'STREAM', stream)
+    client = create_app().test_client()
+
+    plain = client.get('/employees/report')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get('/employees/report', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+    not_modified = client.get('/employees/report', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag'],
+    })
+    assert not_modified.status_code == 304
+
+    monkeypatch.setattr(Config.Report, 'GZIP_LEVEL', 0)
+    assert 'Content-Encoding' not in client.get('/employees/report', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+@pytest.mark.parametrize('stream', [True, False])
+def test_process_report_since(monkeypatch, stream):
+    """ Test case for the report view returning a watermark with delta reports """
+    monkeypatch.setattr(Config.Report, 'STREAM', stream)
+    client = create_app().test_client()
+
+    assert 'watermark' not in client.get('/employees/report').get_json()['payrollReport']
+    assert client.get('/employees/report?since=0').get_json()['payrollReport']['watermark'] == 0
+    assert client.get('/employees/report?since=abc').status_code == 400
+
+
+def test_process_employees_csv_invalid_rows():
+    """ Test case for the CSV view rejecting files with invalid rows, detailing them """
+    content = b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n31/02/2021,-1,3,Z\n\n13/10/2021,2,x,B\n'
+    response = create_app().test_client().post('/employees/csv', data={
+        'source': (io.BytesIO(content), 'time-report-97.csv'),
+    })
+
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data['invalidRows'] == 2
+    assert [(error['line'], error['field']) for error in data['errors']] == [
+        (3, 'date'), (3, 'hours worked'), (3, 'job group'), (5, 'employee id'),
+    ]
+
+
+def test_put_upload_chunk_invalid_rows(monkeypatch, tmp_path):
+    """ Test case for the upload chunk view rejecting invalid rows, detailing them """
+    monkeypatch.setattr(Config.Ingest, 'SPOOL_DIRECTORY', str(tmp_path))
+    client = create_app().test_client()
+    upload_id = client.post('/employees/csv/uploads', json={'filename': 'time-report-96.csv'}).get_json()['uploadId']
+
+    content = b'date,hours worked,employee id,job group\n12/10/2021,3.5,3,A\n13/10/2021,2,3,B\n'
+    response = client.put(f'/employees/csv/uploads/{upload_id}/chunks/0', data=content, headers={
+        'X-Chunk-SHA256': hashlib.sha256(content).hexdigest(),
+    })
+
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data['invalidRows'] == 1
+    assert [(error['line'], error['field']) for error in data['errors']] == [(3, 'job group')]